@@ -15,6 +15,7 @@ PyInstaller.__main__.run([
     '--hidden-import=PyQt6',
     '--hidden-import=pymata4',
     '--hidden-import=serial',
+    '--hidden-import=numpy',
     '--noconsole',
     '--icon=resources/icon.ico'
 ]) 
\ No newline at end of file
@@ -0,0 +1,349 @@
+// ZMotion.h - Extensión de FirmataExpress para mover el eje Z desde la placa.
+//
+// El host envía cada movimiento como una serie de tramos "N pasos con velocidad
+// de R0 a R1 pasos/s" y la placa genera los pulsos STEP por sí misma,
+// deteniéndose en los finales de carrera. Al terminar cada movimiento se envía
+// un informe Z_DONE al host.
+//
+// Z_LAYER ejecuta el ciclo completo de una capa con un solo mensaje: UV
+// encendido durante la exposición (medida con micros()), elevación y retorno
+// con rampas trapezoidales calculadas en la placa. Se informa del fin de cada
+// fase: Z_EXPOSED al apagar el UV y Z_DONE al terminar la elevación y el retorno.
+//
+// Integración en FirmataExpress.ino:
+//   1. #include "ZMotion.h" junto al resto de includes.
+//   2. En sysexCallback(): case Z_MOTION: zMotionSysex(argc, argv); break;
+//   3. Al principio de loop(): zMotionUpdate();
+
+#ifndef ZMOTION_H
+#define ZMOTION_H
+
+#include <Arduino.h>
+
+// Comando sysex de usuario (Firmata reserva 0x01-0x0F para uso propio)
+#define Z_MOTION            0x01
+
+// Subcomandos host -> placa
+#define Z_QUERY             0x00
+#define Z_CONFIG            0x01
+#define Z_MOVE              0x02
+#define Z_ABORT             0x03
+#define Z_LAYER             0x04
+
+// Respuestas placa -> host
+#define Z_VERSION           0x10
+#define Z_DONE              0x11
+#define Z_EXPOSED           0x12
+
+// Motivo de fin de movimiento
+#define Z_DONE_OK           0
+#define Z_DONE_ABORTED      1
+#define Z_DONE_LIMIT        2
+
+#define Z_PROTOCOL_VERSION  3
+#define Z_QUEUE_SIZE        16
+#define Z_NO_PIN            0x7F
+#define Z_PULSE_US          4
+
+struct ZSegment {
+  byte moveId;
+  byte flags;                 // bit0: informar al terminar
+  byte dir;                   // 1 = subir, 0 = bajar
+  unsigned long steps;
+  float rateStart;            // pasos/s al inicio del tramo
+  float rateEnd;              // pasos/s al final del tramo (de crucero si accel > 0)
+  float accel;                // pasos/s²; > 0 = rampa trapezoidal completa en la placa
+};
+
+static byte zStepPin = Z_NO_PIN;
+static byte zDirPin = Z_NO_PIN;
+static byte zHomePin = Z_NO_PIN;
+static byte zEndPin = Z_NO_PIN;
+static byte zUvPin = Z_NO_PIN;
+
+static ZSegment zQueue[Z_QUEUE_SIZE];
+static byte zHead = 0;
+static byte zCount = 0;
+
+static bool zActive = false;
+static ZSegment zCurrent;
+static unsigned long zSegmentDone = 0;  // pasos dados en el segmento actual
+static unsigned long zMoveDone = 0;     // pasos acumulados del movimiento actual
+static byte zRejectedId = 0;            // movimiento rechazado (el host no usa el id 0)
+static unsigned long zLastStepUs = 0;
+static unsigned long zIntervalUs = 0;
+
+// Ciclo de capa en curso: exposición pendiente y movimientos que la siguen
+static bool zExposing = false;
+static byte zLayerId = 0;
+static unsigned long zExposeUs = 0;
+static unsigned long zExposeStartUs = 0;
+static unsigned long zExposeStartMs = 0;
+static ZSegment zLayerLift;
+static ZSegment zLayerReturn;
+
+static unsigned long zRead7(byte *argv, byte count) {
+  unsigned long value = 0;
+  for (byte i = 0; i < count; i++) {
+    value |= ((unsigned long)(argv[i] & 0x7F)) << (7 * i);
+  }
+  return value;
+}
+
+static void zWrite7(unsigned long value, byte count) {
+  for (byte i = 0; i < count; i++) {
+    Firmata.write((byte)(value & 0x7F));
+    value >>= 7;
+  }
+}
+
+static void zReportVersion() {
+  Firmata.write(START_SYSEX);
+  Firmata.write(Z_MOTION);
+  Firmata.write(Z_VERSION);
+  Firmata.write(Z_PROTOCOL_VERSION);
+  Firmata.write(END_SYSEX);
+}
+
+static void zReportDone(byte moveId, byte reason, unsigned long steps) {
+  Firmata.write(START_SYSEX);
+  Firmata.write(Z_MOTION);
+  Firmata.write(Z_DONE);
+  Firmata.write(moveId & 0x7F);
+  Firmata.write(reason);
+  zWrite7(steps, 4);
+  zWrite7(millis(), 4);
+  Firmata.write(END_SYSEX);
+}
+
+static void zReportExposed(byte layerId, byte reason) {
+  Firmata.write(START_SYSEX);
+  Firmata.write(Z_MOTION);
+  Firmata.write(Z_EXPOSED);
+  Firmata.write(layerId & 0x7F);
+  Firmata.write(reason);
+  zWrite7(zExposeStartMs, 4);
+  zWrite7(millis(), 4);
+  Firmata.write(END_SYSEX);
+}
+
+static bool zLimitHit(byte dir) {
+  byte pin = dir ? zEndPin : zHomePin;
+  if (pin == Z_NO_PIN) {
+    return false;
+  }
+  // Sensores con pull-up: activos a nivel bajo
+  return digitalRead(pin) == LOW;
+}
+
+// Descarta los segmentos en cola que pertenecen al movimiento indicado
+static void zDropMove(byte moveId) {
+  while (zCount > 0 && zQueue[zHead].moveId == moveId) {
+    zHead = (zHead + 1) % Z_QUEUE_SIZE;
+    zCount--;
+  }
+}
+
+static void zFinishMove(byte reason) {
+  zActive = false;
+  if (reason != Z_DONE_OK) {
+    zDropMove(zCurrent.moveId);
+  }
+  if (reason != Z_DONE_OK || (zCurrent.flags & 0x01)) {
+    zReportDone(zCurrent.moveId, reason, zMoveDone);
+    zMoveDone = 0;
+  }
+}
+
+// Movimiento que no se puede encolar: se descartan sus tramos (el host los
+// envía seguidos, así que están al final de la cola) y se informa para que el
+// host no espere en vano. Los tramos que lleguen después se ignoran.
+static void zRejectMove(byte moveId) {
+  zRejectedId = moveId;
+  while (zCount > 0 && zQueue[(zHead + zCount - 1) % Z_QUEUE_SIZE].moveId == moveId) {
+    zCount--;
+  }
+  if (zActive && zCurrent.moveId == moveId) {
+    zFinishMove(Z_DONE_ABORTED);
+  } else {
+    // Con los pasos ya dados por sus primeros tramos, si los hubo
+    zReportDone(moveId, Z_DONE_ABORTED, zMoveDone);
+    zMoveDone = 0;
+  }
+}
+
+// La velocidad varía linealmente con cada paso dentro del tramo; en los
+// tramos trapezoidales acelera y frena con aceleración constante
+static void zUpdateInterval() {
+  float rate;
+  if (zCurrent.accel > 0) {
+    float start = zCurrent.rateStart * zCurrent.rateStart;
+    float up = sqrt(start + 2.0 * zCurrent.accel * zSegmentDone);
+    float down = sqrt(start + 2.0 * zCurrent.accel * (zCurrent.steps - zSegmentDone));
+    rate = min(zCurrent.rateEnd, min(up, down));
+  } else {
+    rate = zCurrent.rateStart +
+           (zCurrent.rateEnd - zCurrent.rateStart) * zSegmentDone / zCurrent.steps;
+  }
+  zIntervalUs = (unsigned long)(1000000.0 / rate);
+}
+
+static void zEnqueue(ZSegment *segment) {
+  zQueue[(zHead + zCount) % Z_QUEUE_SIZE] = *segment;
+  zCount++;
+}
+
+// [id, flags, dir, pasos(4x7), intervalo_inicial_us(3x7), intervalo_final_us(3x7)]
+static void zReadMove(ZSegment *segment, byte *argv) {
+  segment->moveId = argv[0];
+  segment->flags = argv[1];
+  segment->dir = argv[2];
+  segment->steps = zRead7(argv + 3, 4);
+  segment->rateStart = 1000000.0 / max(1UL, zRead7(argv + 7, 3));
+  segment->rateEnd = 1000000.0 / max(1UL, zRead7(argv + 10, 3));
+  segment->accel = 0;
+}
+
+// [pasos(4x7), intervalo_inicial_us(3x7), intervalo_crucero_us(3x7), aceleración(3x7)]
+static void zReadRamp(ZSegment *segment, byte layerId, byte dir, byte *argv) {
+  segment->moveId = layerId;
+  segment->flags = 0x01;
+  segment->dir = dir;
+  segment->steps = zRead7(argv, 4);
+  segment->rateStart = 1000000.0 / max(1UL, zRead7(argv + 4, 3));
+  segment->rateEnd = 1000000.0 / max(1UL, zRead7(argv + 7, 3));
+  segment->accel = zRead7(argv + 10, 3);
+}
+
+static void zEndExposure(byte reason) {
+  digitalWrite(zUvPin, LOW);
+  zExposing = false;
+  zReportExposed(zLayerId, reason);
+  if (reason == Z_DONE_OK) {
+    // Elevación y retorno a continuación, sin esperar al host
+    zEnqueue(&zLayerLift);
+    zEnqueue(&zLayerReturn);
+  }
+}
+
+static bool zStartNext() {
+  if (zCount == 0) {
+    return false;
+  }
+  zCurrent = zQueue[zHead];
+  zHead = (zHead + 1) % Z_QUEUE_SIZE;
+  zCount--;
+  zSegmentDone = 0;
+  if (zCurrent.steps > 0) {
+    zUpdateInterval();
+  }
+  digitalWrite(zDirPin, zCurrent.dir ? HIGH : LOW);
+  zLastStepUs = micros();
+  zActive = true;
+  return true;
+}
+
+void zMotionSysex(byte argc, byte *argv) {
+  if (argc < 1) {
+    return;
+  }
+  switch (argv[0]) {
+    case Z_QUERY:
+      zReportVersion();
+      break;
+
+    case Z_CONFIG:
+      // [step, dir, home, end, uv]
+      if (argc >= 5) {
+        zStepPin = argv[1];
+        zDirPin = argv[2];
+        zHomePin = argv[3];
+        zEndPin = argv[4];
+      }
+      if (argc >= 6) {
+        zUvPin = argv[5];
+      }
+      break;
+
+    case Z_MOVE:
+      // [id, flags, dir, pasos(4x7), intervalo_inicial_us(3x7), intervalo_final_us(3x7)]
+      if (argc < 2 || argv[1] == zRejectedId) {
+        break;
+      }
+      if (argc < 14 || zCount >= Z_QUEUE_SIZE || zStepPin == Z_NO_PIN) {
+        zRejectMove(argv[1]);
+        break;
+      }
+      zRejectedId = 0;
+      zReadMove(&zQueue[(zHead + zCount) % Z_QUEUE_SIZE], argv + 1);
+      zCount++;
+      break;
+
+    case Z_LAYER:
+      // [id, exposición_ms(4x7), elevación(13x7), retorno(13x7)]
+      if (argc < 32) {
+        break;
+      }
+      if (zExposing || zActive || zCount > 0 || zStepPin == Z_NO_PIN || zUvPin == Z_NO_PIN) {
+        // Solo con el eje parado: se rechaza para que el host no espere en vano
+        zExposeStartMs = millis();
+        zReportExposed(argv[1], Z_DONE_ABORTED);
+        break;
+      }
+      zLayerId = argv[1];
+      zExposeUs = zRead7(argv + 2, 4) * 1000UL;
+      zReadRamp(&zLayerLift, zLayerId, 1, argv + 6);
+      zReadRamp(&zLayerReturn, zLayerId, 0, argv + 19);
+      zExposeStartMs = millis();
+      zExposeStartUs = micros();
+      digitalWrite(zUvPin, HIGH);
+      zExposing = true;
+      break;
+
+    case Z_ABORT:
+      zCount = 0;
+      if (zExposing) {
+        zEndExposure(Z_DONE_ABORTED);
+      }
+      if (zActive) {
+        zFinishMove(Z_DONE_ABORTED);
+      }
+      break;
+  }
+}
+
+void zMotionUpdate() {
+  if (zExposing && micros() - zExposeStartUs >= zExposeUs) {
+    zEndExposure(Z_DONE_OK);
+  }
+  if (!zActive && !zStartNext()) {
+    return;
+  }
+
+  if (zSegmentDone >= zCurrent.steps) {
+    zFinishMove(Z_DONE_OK);
+    return;
+  }
+
+  unsigned long now = micros();
+  if (now - zLastStepUs < zIntervalUs) {
+    return;
+  }
+
+  if (zLimitHit(zCurrent.dir)) {
+    zFinishMove(Z_DONE_LIMIT);
+    return;
+  }
+
+  zLastStepUs = now;
+  digitalWrite(zStepPin, HIGH);
+  delayMicroseconds(Z_PULSE_US);
+  digitalWrite(zStepPin, LOW);
+  zSegmentDone++;
+  zMoveDone++;
+  if (zSegmentDone < zCurrent.steps) {
+    zUpdateInterval();
+  }
+}
+
+#endif
@@ -1,9 +1,14 @@
 from PyQt6.QtWidgets import QApplication
 from ui.main_window import MainWindow
+import multiprocessing
 import sys
 
 if __name__ == '__main__':
+    # Necesario para los procesos de decodificación en el ejecutable de PyInstaller
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
+    # Nombre usado para las rutas de datos y caché (QStandardPaths)
+    app.setApplicationName("3DPrinter")
     window = MainWindow()
     window.show()
     sys.exit(app.exec()) 
\ No newline at end of file
@@ -0,0 +1,250 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from pymata4 import pymata4
+import queue
+import threading
+import time
+from .motion import create_motion_backend, host_ms, LayerCycleResult, MOVE_OK, MOVE_ABORTED
+from .limits import LimitSwitches
+from .z_axis import ZAxis
+from .sim_board import SimulatedBoard, SIMULATOR_PORT
+
+
+def create_board(port, pins, travel_steps):
+    if port == SIMULATOR_PORT:
+        return SimulatedBoard(pins, travel_steps)
+    return pymata4.Pymata4(arduino_instance_id=1, com_port=port)
+
+
+# Hilo dueño de la placa: toda la E/S con el Arduino pasa por aquí.
+# La interfaz envía comandos con submit() y recibe los resultados por señales,
+# así la ventana sigue respondiendo durante los movimientos.
+#
+# emergency_stop() puede llamarse desde cualquier hilo: apaga el UV en el acto,
+# aborta el movimiento en curso, interrumpe la espera de exposición y descarta
+# todos los comandos encolados antes de la parada (cada parada abre una nueva
+# "época" y los comandos de épocas anteriores no se ejecutan).
+class PrinterController(QThread):
+    command_done = pyqtSignal(str, object)
+    command_failed = pyqtSignal(str, str)
+    command_cancelled = pyqtSignal(str)
+    position_changed = pyqtSignal(object)
+    emergency_stopped = pyqtSignal(float, float)
+    # UV apagado al terminar la exposición de una capa (time.monotonic() del PC)
+    exposure_done = pyqtSignal(float)
+
+    def __init__(self, board_factory=None):
+        super().__init__()
+        # board_factory(port, pins, travel_steps) permite inyectar otra placa (pruebas)
+        self.board_factory = board_factory or create_board
+        self.commands = queue.Queue()
+        self.board = None
+        self.limits = None
+        self.motion = None
+        self.z_axis = None
+        self.pin_uv = None
+        self._stop = threading.Event()
+        self._stop_lock = threading.Lock()
+        self._epoch = 0
+        self._busy = False
+        self._stop_time = None
+        self._uv_off_ms = 0.0
+
+    def submit(self, name, *args):
+        self.commands.put((self._epoch, name, args))
+
+    def shutdown(self):
+        self.emergency_stop()
+        self.commands.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            command = self.commands.get()
+            if command is None:
+                break
+
+            epoch, name, args = command
+            self._busy = True
+            self._stop.clear()
+            if self.motion:
+                self.motion.reset()
+            # Comprobar la época después de limpiar el aviso para no perder
+            # una parada que llegue justo ahora
+            if epoch != self._epoch:
+                self._busy = False
+                self.command_cancelled.emit(name)
+                continue
+
+            try:
+                result = getattr(self, "_cmd_" + name)(*args)
+                self.command_done.emit(name, result)
+            except Exception as e:
+                if epoch != self._epoch:
+                    self.command_cancelled.emit(name)
+                else:
+                    self.command_failed.emit(name, str(e))
+            finally:
+                self._busy = False
+                self._report_stop()
+                if self.z_axis:
+                    self.position_changed.emit(self.z_axis.position_mm)
+
+        self._close_board()
+
+    def emergency_stop(self):
+        # No espera a la cola de comandos: actúa directamente sobre la placa
+        with self._stop_lock:
+            stop_time = time.monotonic()
+            self._epoch += 1
+            self._stop.set()
+            if self._stop_time is None:
+                self._stop_time = stop_time
+
+            if self.board:
+                try:
+                    # Primero el UV, después el movimiento
+                    self.board.digital_write(self.pin_uv, 0)
+                    self._uv_off_ms = (time.monotonic() - stop_time) * 1000
+                    self.motion.abort()
+                except Exception as e:
+                    print(f"Error al detener: {str(e)}")
+
+        if not self._busy:
+            self._report_stop()
+
+    def _report_stop(self):
+        # Latencias desde la parada hasta apagar el UV y hasta que terminó el comando en curso
+        with self._stop_lock:
+            stop_time = self._stop_time
+            self._stop_time = None
+        if stop_time is not None:
+            self.emergency_stopped.emit(self._uv_off_ms, (time.monotonic() - stop_time) * 1000)
+
+    def _close_board(self):
+        if self.board:
+            try:
+                self.board.shutdown()
+            except:
+                pass
+            self.board = None
+
+    def _cmd_connect(self, port, pins, steps_per_mm, travel_mm):
+        self.board = self.board_factory(port, pins, int(travel_mm * steps_per_mm))
+        self.pin_uv = pins["uv"]
+
+        # Configurar pines
+        self.board.set_pin_mode_digital_output(pins["step"])
+        self.board.set_pin_mode_digital_output(pins["dir"])
+        # Configurar pines de sensores con pull-up y avisos por callback
+        self.limits = LimitSwitches(self.board, pins["home"], pins["end"])
+        self.board.set_pin_mode_digital_output(self.pin_uv)
+
+        # Generación de pasos en la placa si el firmware lo permite
+        self.motion = create_motion_backend(self.board, pins["step"], pins["dir"], self.limits,
+                                            self.pin_uv)
+        print(f"Generación de pasos: {self.motion.name}"
+              f"{' (ciclo de capa en la placa)' if self.motion.layer_cycle_supported else ''}")
+        self.z_axis = ZAxis(self.motion, steps_per_mm, travel_mm)
+        return self.motion.name
+
+    def _cmd_move(self, steps, rate):
+        return self.z_axis.move(steps, rate)
+
+    def _cmd_home(self, fast, slow_speed, backoff_mm, force):
+        return self.z_axis.home(fast, slow_speed, backoff_mm, force)
+
+    def _cmd_go_end(self, settings):
+        return self.z_axis.go_end(settings)
+
+    def _cmd_reference(self, settings):
+        # Posición del sensor END en mm, referencia para reanudar una impresión
+        return self.z_axis.measure_end(settings) / self.z_axis.steps_per_mm
+
+    def _cmd_reapproach(self, target_mm, clearance_mm, end_mm, fast, slow):
+        return self.z_axis.reapproach(target_mm, clearance_mm, end_mm, fast, slow)
+
+    def _cmd_set_uv(self, state):
+        if state:
+            self._uv_on()
+        else:
+            self.board.digital_write(self.pin_uv, 0)
+        return state
+
+    def _uv_on(self):
+        # Bajo el mismo lock que emergency_stop: el UV nunca se enciende después de una parada
+        with self._stop_lock:
+            if self._stop.is_set():
+                raise RuntimeError("Parada de emergencia activa")
+            self.board.digital_write(self.pin_uv, 1)
+
+    def _cmd_layer(self, exposure_time, lift_distance, layer_height, peel, retract):
+        # Exposición, elevación y retorno de una capa completa.
+        # Devuelve un LayerCycleResult con las marcas de tiempo de cada fase.
+        if self.motion.layer_cycle_supported and not peel.jerk and not retract.jerk:
+            return self._board_layer_cycle(exposure_time, lift_distance, layer_height,
+                                           peel, retract)
+
+        self._uv_on()
+        host_on = time.monotonic()
+        uv_on_ms = host_ms()
+        try:
+            if self._stop.wait(exposure_time):
+                raise RuntimeError("Exposición interrumpida")
+        finally:
+            self.board.digital_write(self.pin_uv, 0)
+        host_off = time.monotonic()
+        uv_off_ms = host_ms()
+        self.exposure_done.emit(host_off)
+
+        steps_per_mm = self.z_axis.steps_per_mm
+        lift = self.z_axis.run(peel.plan(lift_distance, steps_per_mm), 1)
+        lift.board_ms = lift.board_ms if lift.board_ms is not None else host_ms()
+        # Un final de carrera a mitad de ciclo también es un fallo de la capa
+        if lift.reason != MOVE_OK:
+            raise RuntimeError(self._move_error("Elevación", lift.reason))
+
+        down = retract.plan(lift_distance - layer_height, steps_per_mm)
+        back = self.z_axis.run(down, 0)
+        back.board_ms = back.board_ms if back.board_ms is not None else host_ms()
+        if back.reason != MOVE_OK:
+            raise RuntimeError(self._move_error("Retorno", back.reason))
+        cycle = LayerCycleResult(MOVE_OK, uv_on_ms, uv_off_ms, lift, back, clock="PC")
+        cycle.exposure = exposure_time
+        cycle.host_on = host_on
+        cycle.host_off = host_off
+        return cycle
+
+    def _board_layer_cycle(self, exposure_time, lift_distance, layer_height, peel, retract):
+        # Un solo mensaje por capa: la placa cronometra la exposición y mueve el
+        # eje sin esperar al PC. Se comprueba la parada justo antes de enviar
+        # (bajo el lock del backend): una parada posterior envía Z_ABORT detrás
+        # del ciclo y la placa apaga el UV al recibirlo.
+        def check_stop():
+            if self._stop.is_set():
+                raise RuntimeError("Parada de emergencia activa")
+
+        def exposed(report):
+            if report.reason == MOVE_OK:
+                self.exposure_done.emit(report.host_off)
+
+        cycle = self.z_axis.layer_cycle(exposure_time, lift_distance, peel,
+                                        lift_distance - layer_height, retract, check_stop,
+                                        exposed)
+        if cycle.reason != MOVE_OK:
+            if cycle.lift is None:
+                raise RuntimeError("Exposición interrumpida")
+            raise RuntimeError(self._move_error("Elevación o retorno", cycle.reason))
+        return cycle
+
+    @staticmethod
+    def _move_error(phase, reason):
+        if reason == MOVE_ABORTED:
+            return f"{phase}: movimiento interrumpido"
+        return f"{phase}: detenido por un final de carrera"
+
+    def _cmd_advance(self, distance, profile):
+        # Subida sin exposición (capas vacías agrupadas en un solo movimiento)
+        result = self.z_axis.run(profile.plan(distance, self.z_axis.steps_per_mm), 1)
+        if result.reason != MOVE_OK:
+            raise RuntimeError(self._move_error("Avance", result.reason))
+        return result
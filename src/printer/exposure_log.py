@@ -0,0 +1,142 @@
+import json
+import math
+import os
+
+EXPOSURE_REPORT_VERSION = 1
+# Ancho de cada barra del histograma de errores, en ms
+HISTOGRAM_BIN_MS = 1
+
+
+def exposure_report_path(job_path):
+    # Junto al trabajo: "carpeta.exposure.json" o "trabajo.ctb.exposure.json"
+    return os.path.normpath(job_path) + ".exposure.json"
+
+
+def percentile(sorted_values, fraction):
+    # Percentil por rango más cercano de una lista ya ordenada
+    if not sorted_values:
+        return None
+    # Sin el redondeo 0.07 * 100 da 7.000000000000001 y el rango pasaría a 8
+    rank = max(1, math.ceil(round(fraction * len(sorted_values), 9)))
+    return sorted_values[rank - 1]
+
+
+class ExposureRecord:
+    def __init__(self, layer, requested, actual, clock, host_on, host_off, presented=None):
+        # Tiempos en segundos; host_on/host_off son los flancos del UV y
+        # presented el fin del pintado de la imagen, según time.monotonic() del PC
+        # (presented None si la capa reutilizó la imagen anterior)
+        self.layer = layer
+        self.requested = requested
+        self.actual = actual
+        self.clock = clock
+        self.host_on = host_on
+        self.host_off = host_off
+        self.presented = presented
+
+    @property
+    def error_ms(self):
+        # Positivo si el UV estuvo encendido más de lo pedido
+        return (self.actual - self.requested) * 1000
+
+    @property
+    def latency_ms(self):
+        # Desde la imagen pintada hasta el encendido del UV
+        if self.presented is None or self.host_on is None:
+            return None
+        return (self.host_on - self.presented) * 1000
+
+
+# Exposición real frente a la pedida de cada capa de una impresión. Con la
+# placa el tiempo real es el que cronometró la placa (resolución de 1 ms);
+# sin ella, el que pasa entre los dos digital_write del UV en el PC.
+class ExposureLog:
+    def __init__(self):
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, layer, cycle, presented=None):
+        # cycle: LayerCycleResult del comando "layer"
+        actual = cycle.measured_exposure()
+        if actual is None or cycle.exposure is None:
+            return None
+        record = ExposureRecord(layer, cycle.exposure, actual, cycle.clock,
+                                cycle.host_on, cycle.host_off, presented)
+        self.records.append(record)
+        return record
+
+    def stats(self):
+        # (p50, p95, máx) del error absoluto en ms; None sin capas
+        errors = sorted(abs(record.error_ms) for record in self.records)
+        if not errors:
+            return None
+        return percentile(errors, 0.5), percentile(errors, 0.95), errors[-1]
+
+    def latency_stats(self):
+        # (p50, p95, máx) en ms de la latencia imagen pintada -> UV; None sin datos
+        latencies = sorted(record.latency_ms for record in self.records
+                           if record.latency_ms is not None)
+        if not latencies:
+            return None
+        return percentile(latencies, 0.5), percentile(latencies, 0.95), latencies[-1]
+
+    def mean_error(self):
+        # Error medio con signo en ms (sesgo sistemático del temporizado)
+        if not self.records:
+            return None
+        return sum(record.error_ms for record in self.records) / len(self.records)
+
+    def histogram(self, bin_ms=HISTOGRAM_BIN_MS):
+        # {inicio de la barra en ms: capas} con el error con signo
+        bins = {}
+        for record in self.records:
+            start = math.floor(round(record.error_ms, 3) / bin_ms) * bin_ms
+            bins[start] = bins.get(start, 0) + 1
+        return dict(sorted(bins.items()))
+
+    def summary(self):
+        stats = self.stats()
+        if stats is None:
+            return "sin capas expuestas"
+        p50, p95, worst = stats
+        text = (f"error p50 {p50:.1f} ms, p95 {p95:.1f} ms, máx {worst:.1f} ms "
+                f"(media {self.mean_error():+.1f} ms, {len(self.records)} capas)")
+        latency = self.latency_stats()
+        if latency:
+            text += (f"; imagen a UV p50 {latency[0]:.1f} ms, p95 {latency[1]:.1f} ms, "
+                     f"máx {latency[2]:.1f} ms")
+        return text
+
+    def save(self, path, job_name):
+        # Errores en ms redondeados a microsegundos
+        def ms(value):
+            return round(value, 3) if value is not None else None
+
+        p50, p95, worst = self.stats() or (None, None, None)
+        latency = self.latency_stats() or (None, None, None)
+        data = {
+            "version": EXPOSURE_REPORT_VERSION,
+            "job": job_name,
+            "layers": len(self.records),
+            "p50_ms": ms(p50),
+            "p95_ms": ms(p95),
+            "max_ms": ms(worst),
+            "mean_ms": ms(self.mean_error()),
+            "latency_p50_ms": ms(latency[0]),
+            "latency_p95_ms": ms(latency[1]),
+            "latency_max_ms": ms(latency[2]),
+            "histogram_bin_ms": HISTOGRAM_BIN_MS,
+            "histogram": {str(start): count for start, count in self.histogram().items()},
+            "records": [
+                {"layer": record.layer, "requested": record.requested, "actual": record.actual,
+                 "clock": record.clock, "host_on": record.host_on, "host_off": record.host_off,
+                 "presented": record.presented}
+                for record in self.records
+            ],
+        }
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(temp_path, path)
@@ -0,0 +1,85 @@
+import math
+from .planner import ProfileSettings
+
+# Reglas por defecto: "área máxima %: distancia mm @ velocidad mm/s".
+# Las secciones pequeñas se despegan casi sin esfuerzo; las grandes
+# necesitan más altura y más lentitud para no arrancar la pieza.
+DEFAULT_RULES = "5: 3 @ 6, 20: 5 @ 4, 100: 8 @ 2"
+
+
+class LiftRule:
+    def __init__(self, max_fraction, distance, speed):
+        # max_fraction entre 0 y 1; distance en mm; speed en mm/s
+        self.max_fraction = max_fraction
+        self.distance = distance
+        self.speed = speed
+
+    def __repr__(self):
+        return f"{self.max_fraction * 100:g}: {self.distance:g} @ {self.speed:g}"
+
+
+def parse_rules(text):
+    # "5: 3 @ 6, 20: 5 @ 4" -> reglas ordenadas por área; ValueError si no es válido
+    rules = []
+    for item in text.replace(";", ",").split(","):
+        if not item.strip():
+            continue
+        try:
+            area, move = item.split(":")
+            distance, speed = move.split("@")
+            # El % del área es opcional ("5%: 3 @ 6")
+            area = area.strip().removesuffix("%")
+            rule = LiftRule(float(area) / 100, float(distance), float(speed))
+        except ValueError:
+            raise ValueError(f"Regla no válida: '{item.strip()}' (formato: área%: mm @ mm/s)")
+        # Las comparaciones con nan son falsas; inf se descarta aparte
+        if (not 0 < rule.max_fraction <= 1 or not 0 < rule.distance < math.inf or
+                not 0 < rule.speed < math.inf):
+            raise ValueError(f"Regla fuera de rango: '{item.strip()}'")
+        # Dos reglas con la misma área: no se sabría cuál aplicar
+        if any(other.max_fraction == rule.max_fraction for other in rules):
+            raise ValueError(f"Área repetida: '{item.strip()}'")
+        rules.append(rule)
+    if not rules:
+        raise ValueError("No hay reglas de elevación")
+    rules.sort(key=lambda rule: rule.max_fraction)
+    return rules
+
+
+# Elige distancia y velocidad de elevación de cada capa según la fracción de
+# la pantalla iluminada. Sin datos de área (análisis en curso) o por encima
+# de la última regla se usa la elevación fija de siempre.
+class LiftPolicy:
+    def __init__(self, rules, distance, peel):
+        self.rules = rules
+        self.distance = distance
+        self.peel = peel
+
+    def select(self, fraction):
+        # Devuelve (distancia mm, ProfileSettings de elevación)
+        if fraction is not None:
+            for rule in self.rules:
+                if fraction <= rule.max_fraction:
+                    # Misma aceleración y jerk que la elevación fija
+                    profile = ProfileSettings(rule.speed, self.peel.accel, self.peel.jerk,
+                                              self.peel.start_speed)
+                    return rule.distance, profile
+        return self.distance, self.peel
+
+    def for_layer(self, analysis, index):
+        return self.select(analysis.fraction(index) if analysis else None)
+
+
+def estimate_lift_time(policy, analysis, total_layers, layer_height, steps_per_mm, retract):
+    # Tiempo total de elevación y retorno con la política adaptativa; los
+    # perfiles se planifican una vez por cada combinación distinta
+    durations = {}
+    total = 0.0
+    for index in range(total_layers):
+        distance, peel = policy.for_layer(analysis, index)
+        key = (distance, peel.max_speed)
+        if key not in durations:
+            durations[key] = (peel.plan(distance, steps_per_mm).duration +
+                              retract.plan(distance - layer_height, steps_per_mm).duration)
+        total += durations[key]
+    return total
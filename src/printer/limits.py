@@ -0,0 +1,64 @@
+import threading
+import time
+
+# Espera máxima del primer informe de los sensores al conectar
+REPORT_TIMEOUT = 2.0
+
+
+# Finales de carrera HOME/END atendidos por callbacks de pymata4.
+# El hilo lector de pymata4 activa un Event por sensor y el bucle de
+# movimiento solo consulta ese indicador local, sin digital_read ni locks.
+class LimitSwitches:
+    def __init__(self, board, pin_home, pin_end):
+        self.board = board
+        self.pin_home = pin_home
+        self.pin_end = pin_end
+        self.home = threading.Event()
+        self.end = threading.Event()
+        self.trigger_time = {pin_home: None, pin_end: None}
+        self._listeners = []
+
+        # Sensores con pull-up: activos a nivel bajo
+        self.board.set_pin_mode_digital_input_pullup(pin_home, callback=self._on_change)
+        self.board.set_pin_mode_digital_input_pullup(pin_end, callback=self._on_change)
+
+        # Estado inicial (el callback solo se dispara en los cambios)
+        self._update(pin_home, self._first_report(pin_home))
+        self._update(pin_end, self._first_report(pin_end))
+
+    def _first_report(self, pin):
+        # pymata4 da valor 0 (= sensor activo) hasta recibir el primer informe
+        # del puerto, que se distingue por su marca de tiempo. Sin él el
+        # estado es desconocido y no se puede proteger ningún movimiento.
+        deadline = time.monotonic() + REPORT_TIMEOUT
+        while True:
+            value, timestamp = self.board.digital_read(pin)
+            if timestamp:
+                return value
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"El final de carrera del pin {pin} no informa de su estado")
+            time.sleep(0.01)
+
+    def _on_change(self, data):
+        # data = [tipo_pin, pin, valor, marca_de_tiempo]
+        self._update(data[1], data[2])
+
+    def _update(self, pin, value):
+        flag = self.home if pin == self.pin_home else self.end
+        if value == 0:
+            self.trigger_time[pin] = time.monotonic()
+            flag.set()
+            for listener in self._listeners:
+                listener(pin)
+        else:
+            flag.clear()
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def flag(self, direction):
+        # Sensor que limita el movimiento en la dirección indicada (1 = subir)
+        return self.end if direction else self.home
+
+    def active(self, direction):
+        return self.flag(direction).is_set()
@@ -0,0 +1,358 @@
+import threading
+import time
+from .planner import constant_profile
+
+# Comando sysex de usuario definido en firmware/ZMotion/ZMotion.h
+Z_MOTION = 0x01
+
+# Subcomandos host -> placa
+Z_QUERY = 0x00
+Z_CONFIG = 0x01
+Z_MOVE = 0x02
+Z_ABORT = 0x03
+Z_LAYER = 0x04
+
+# Respuestas placa -> host
+Z_VERSION = 0x10
+Z_DONE = 0x11
+Z_EXPOSED = 0x12
+
+# Motivo de fin de movimiento
+MOVE_OK = 0
+MOVE_ABORTED = 1
+MOVE_LIMIT = 2
+
+MAX_STEPS = (1 << 28) - 1
+MAX_INTERVAL_US = (1 << 21) - 1
+MAX_ACCEL = (1 << 21) - 1
+BOARD_MS_MASK = (1 << 28) - 1
+QUERY_TIMEOUT = 0.5
+
+# Primera versión del firmware con el ciclo de capa (Z_LAYER)
+LAYER_CYCLE_VERSION = 3
+
+
+def encode_7bit(value, count):
+    return [(value >> (7 * i)) & 0x7f for i in range(count)]
+
+
+def decode_7bit(data):
+    value = 0
+    for i, byte in enumerate(data):
+        value |= (byte & 0x7f) << (7 * i)
+    return value
+
+
+class MoveResult:
+    def __init__(self, steps, reason, board_ms=None, overshoot=0):
+        # Pasos realmente dados, motivo de fin, marca de tiempo de la placa y
+        # pasos dados después de que se activara el final de carrera
+        self.steps = steps
+        self.reason = reason
+        self.board_ms = board_ms
+        self.overshoot = overshoot
+
+    def __repr__(self):
+        return (f"MoveResult(steps={self.steps}, reason={self.reason}, "
+                f"board_ms={self.board_ms}, overshoot={self.overshoot})")
+
+
+class LayerCycleResult:
+    def __init__(self, reason, uv_on_ms, uv_off_ms, lift=None, back=None, clock="placa"):
+        # Marcas de tiempo en ms de cada fase: encendido y apagado del UV y fin
+        # de la elevación y del retorno (lift.board_ms, back.board_ms).
+        # clock indica de dónde salen: reloj de la placa o del PC.
+        self.reason = reason
+        self.uv_on_ms = uv_on_ms
+        self.uv_off_ms = uv_off_ms
+        self.lift = lift
+        self.back = back
+        self.clock = clock
+        # Exposición pedida (s) y flancos del UV vistos desde el PC con
+        # time.monotonic(): con la placa, envío del ciclo y llegada de Z_EXPOSED
+        self.exposure = None
+        self.host_on = None
+        self.host_off = None
+
+    def phases(self):
+        # Duración en ms de (exposición, elevación, retorno); None si no llegó a hacerse
+        def elapsed(start, end):
+            if start is None or end is None:
+                return None
+            return (end - start) & BOARD_MS_MASK
+
+        lift_ms = self.lift.board_ms if self.lift else None
+        back_ms = self.back.board_ms if self.back else None
+        return (elapsed(self.uv_on_ms, self.uv_off_ms), elapsed(self.uv_off_ms, lift_ms),
+                elapsed(lift_ms, back_ms))
+
+    def measured_exposure(self):
+        # Exposición real en segundos según el reloj que la cronometró
+        # (None si el UV no llegó a encenderse)
+        if self.clock == "PC":
+            if self.host_on is None or self.host_off is None:
+                return None
+            return self.host_off - self.host_on
+        exposure_ms = self.phases()[0]
+        return exposure_ms / 1000 if exposure_ms is not None else None
+
+    def __repr__(self):
+        return (f"LayerCycleResult(reason={self.reason}, phases={self.phases()}, "
+                f"clock={self.clock})")
+
+
+def host_ms():
+    return int(time.monotonic() * 1000) & BOARD_MS_MASK
+
+
+# Genera los pulsos STEP desde el PC con digital_write (FirmataExpress sin ZMotion)
+class HostStepBackend:
+    name = "host"
+    layer_cycle_supported = False
+
+    def __init__(self, board, pin_step, pin_dir, limits):
+        self.board = board
+        self.pin_step = pin_step
+        self.pin_dir = pin_dir
+        self.limits = limits
+        self._abort = threading.Event()
+        self._limit_pin = None
+        self._steps_done = 0
+        self._trigger_step = None
+        limits.add_listener(self._on_limit)
+
+    def _on_limit(self, pin):
+        # Se ejecuta en el hilo lector de pymata4: anotar en qué paso llegó el aviso
+        if pin == self._limit_pin and self._trigger_step is None:
+            self._trigger_step = self._steps_done
+
+    def _result(self, reason):
+        overshoot = 0
+        if self._trigger_step is not None:
+            overshoot = self._steps_done - self._trigger_step
+        self._limit_pin = None
+        return MoveResult(self._steps_done, reason, overshoot=overshoot)
+
+    def move(self, steps, rate):
+        return self.run(constant_profile(steps, rate), 1 if steps > 0 else 0)
+
+    def run(self, profile, direction):
+        self._steps_done = 0
+        self._trigger_step = None
+        self._limit_pin = self.limits.pin_end if direction else self.limits.pin_home
+        self.board.digital_write(self.pin_dir, direction)
+
+        # Indicadores locales: el bucle no toca el puerto serie para leer sensores.
+        # Las esperas entre pulsos se interrumpen en cuanto se pide abortar.
+        aborted = self._abort.is_set
+        wait = self._abort.wait
+        limit_hit = self.limits.flag(direction).is_set
+
+        for interval in profile.intervals():
+            if aborted():
+                return self._result(MOVE_ABORTED)
+            if limit_hit():
+                return self._result(MOVE_LIMIT)
+
+            half_period = max(0.0001, interval / 2)
+            self.board.digital_write(self.pin_step, 1)
+            wait(half_period)
+            self.board.digital_write(self.pin_step, 0)
+            self._steps_done += 1
+            wait(half_period)
+
+        return self._result(MOVE_OK)
+
+    def abort(self):
+        # Queda activo hasta reset(): los movimientos posteriores también se abortan
+        self._abort.set()
+
+    def reset(self):
+        self._abort.clear()
+
+
+# Informes pendientes de un movimiento o ciclo de capa: termina al recibir
+# todos los esperados o el primero que no sea MOVE_OK
+class _Pending:
+    def __init__(self, expected, on_exposed=None):
+        self.expected = expected
+        self.on_exposed = on_exposed
+        self.reports = []
+        self.done = threading.Event()
+
+    def add(self, report):
+        # Aviso del fin de la exposición en cuanto llega, sin esperar al ciclo
+        if self.on_exposed and isinstance(report, LayerCycleResult):
+            self.on_exposed(report)
+        self.reports.append(report)
+        if len(self.reports) >= self.expected or report.reason != MOVE_OK:
+            self.done.set()
+
+
+# Envía cada movimiento como un único comando sysex; la placa genera los pulsos
+class FirmwareStepBackend:
+    name = "firmware"
+
+    def __init__(self, board, pin_step, pin_dir, limits, pin_uv=None, version=2):
+        self.board = board
+        self.limits = limits
+        self.version = version
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._move_id = 0
+        self._aborted = False
+
+        install_sysex_handler(board, self._handle_report)
+        # pymata4 no expone los comandos sysex de usuario; se usa su envío interno
+        # La placa comprueba el sensor antes de cada pulso: el sobrepaso es nulo
+        config = [Z_CONFIG, pin_step, pin_dir, limits.pin_home, limits.pin_end]
+        if pin_uv is not None:
+            config.append(pin_uv)
+        self.board._send_sysex(Z_MOTION, config)
+        self.layer_cycle_supported = pin_uv is not None and version >= LAYER_CYCLE_VERSION
+
+    def _handle_report(self, data):
+        if not data or data[0] not in (Z_DONE, Z_EXPOSED) or len(data) < 11:
+            return
+        move_id = data[1]
+        if data[0] == Z_DONE:
+            report = MoveResult(decode_7bit(data[3:7]), data[2], decode_7bit(data[7:11]))
+        else:
+            report = LayerCycleResult(data[2], decode_7bit(data[3:7]), decode_7bit(data[7:11]))
+            report.host_off = time.monotonic()
+        with self._lock:
+            pending = self._pending.get(move_id)
+        if pending:
+            pending.add(report)
+
+    def _next_id(self):
+        self._move_id = self._move_id % 127 + 1
+        return self._move_id
+
+    def move(self, steps, rate):
+        count = min(abs(steps), MAX_STEPS)
+        return self.run(constant_profile(count, rate), 1 if steps > 0 else 0)
+
+    def run(self, profile, direction):
+        if not profile.segments:
+            return MoveResult(0, MOVE_OK)
+
+        with self._lock:
+            move_id = self._next_id()
+            pending = _Pending(1)
+            self._pending[move_id] = pending
+
+        try:
+            # Un mensaje por tramo; solo el último pide informe de fin.
+            # Con el lock, un abort() llega a la placa antes o después de todo el movimiento.
+            last = len(profile.segments) - 1
+            with self._lock:
+                if self._aborted:
+                    return MoveResult(0, MOVE_ABORTED)
+                for index, (steps, rate_start, rate_end) in enumerate(profile.segments):
+                    data = [Z_MOVE, move_id, 0x01 if index == last else 0x00, direction]
+                    data += encode_7bit(steps, 4)
+                    data += encode_7bit(rate_to_interval_us(rate_start), 3)
+                    data += encode_7bit(rate_to_interval_us(rate_end), 3)
+                    self.board._send_sysex(Z_MOTION, data)
+
+            # Margen para la latencia del puerto serie
+            timeout = profile.duration * 1.5 + 2.0
+            if not pending.done.wait(timeout):
+                self.abort()
+                raise TimeoutError("La placa no confirmó el fin del movimiento")
+            return pending.reports[0]
+        finally:
+            with self._lock:
+                self._pending.pop(move_id, None)
+
+    def layer_cycle(self, exposure, lift_steps, lift_ramp, return_steps, return_ramp,
+                    duration, before_send=None, on_exposed=None):
+        # Exposición, elevación y retorno con un solo mensaje; la placa
+        # cronometra la exposición y genera las rampas (inicio, crucero y
+        # aceleración en pasos/s y pasos/s²). duration es la estimación de los
+        # dos movimientos, para el tiempo máximo de espera.
+        # before_send() se llama justo antes de enviar (puede impedir el envío)
+        # y on_exposed(informe) desde el hilo lector al llegar Z_EXPOSED
+        with self._lock:
+            move_id = self._next_id()
+            pending = _Pending(3, on_exposed)
+            self._pending[move_id] = pending
+
+        try:
+            data = [Z_LAYER, move_id] + encode_7bit(min(MAX_STEPS, int(exposure * 1000)), 4)
+            for steps, (start, cruise, accel) in ((lift_steps, lift_ramp),
+                                                  (return_steps, return_ramp)):
+                data += encode_7bit(min(abs(int(steps)), MAX_STEPS), 4)
+                data += encode_7bit(rate_to_interval_us(start), 3)
+                data += encode_7bit(rate_to_interval_us(cruise), 3)
+                data += encode_7bit(min(MAX_ACCEL, max(1, int(accel))), 3)
+            with self._lock:
+                if self._aborted:
+                    return LayerCycleResult(MOVE_ABORTED, None, None)
+                if before_send:
+                    before_send()
+                self.board._send_sysex(Z_MOTION, data)
+                sent = time.monotonic()
+
+            timeout = exposure + duration * 1.5 + 2.0
+            if not pending.done.wait(timeout):
+                self.abort()
+                raise TimeoutError("La placa no confirmó el fin del ciclo de capa")
+
+            cycle, moves = pending.reports[0], pending.reports[1:]
+            if not isinstance(cycle, LayerCycleResult):
+                raise RuntimeError("Informe de ciclo de capa inesperado")
+            cycle.host_on = sent
+            cycle.exposure = exposure
+            cycle.lift = moves[0] if moves else None
+            cycle.back = moves[1] if len(moves) > 1 else None
+            for report in moves:
+                if report.reason != MOVE_OK:
+                    cycle.reason = report.reason
+            return cycle
+        finally:
+            with self._lock:
+                self._pending.pop(move_id, None)
+
+    def abort(self):
+        # Queda activo hasta reset(): los movimientos posteriores también se abortan
+        with self._lock:
+            self._aborted = True
+            self.board._send_sysex(Z_MOTION, [Z_ABORT])
+
+    def reset(self):
+        with self._lock:
+            self._aborted = False
+
+
+def rate_to_interval_us(rate):
+    return min(MAX_INTERVAL_US, max(1, int(1000000 / rate)))
+
+
+def install_sysex_handler(board, handler):
+    # Registrar el manejador en la tabla de despacho del hilo lector de pymata4
+    board.report_dispatch.update({Z_MOTION: [handler, 0]})
+
+
+def query_firmware(board, timeout=QUERY_TIMEOUT):
+    # Versión del protocolo ZMotion, o None si el firmware no lo incluye
+    reply = threading.Event()
+    version = []
+
+    def handle_version(data):
+        if data and data[0] == Z_VERSION:
+            version.append(data[1] if len(data) > 1 else 1)
+            reply.set()
+
+    install_sysex_handler(board, handle_version)
+    board._send_sysex(Z_MOTION, [Z_QUERY])
+    return version[0] if reply.wait(timeout) else None
+
+
+def create_motion_backend(board, pin_step, pin_dir, limits, pin_uv=None):
+    # Usar la generación de pasos en la placa si el firmware incluye ZMotion
+    version = query_firmware(board)
+    if version is not None:
+        return FirmwareStepBackend(board, pin_step, pin_dir, limits, pin_uv, version)
+    return HostStepBackend(board, pin_step, pin_dir, limits)
@@ -0,0 +1,189 @@
+import math
+
+# Número de tramos en que se divide cada rampa; con la velocidad de crucero
+# el perfil completo cabe en la cola de 16 segmentos del firmware ZMotion
+RAMP_SEGMENTS = 7
+INTEGRATION_SAMPLES = 400
+
+
+class MotionProfile:
+    def __init__(self, segments):
+        # Lista de tramos (pasos, velocidad_inicial, velocidad_final) en pasos/s;
+        # la velocidad varía linealmente con cada paso dentro del tramo
+        self.segments = segments
+
+    @property
+    def steps(self):
+        return sum(segment[0] for segment in self.segments)
+
+    @property
+    def duration(self):
+        total = 0.0
+        for steps, rate_start, rate_end in self.segments:
+            total += segment_duration(steps, rate_start, rate_end)
+        return total
+
+    def intervals(self):
+        # Intervalo en segundos de cada paso, igual que lo calcula el firmware
+        for steps, rate_start, rate_end in self.segments:
+            for i in range(steps):
+                yield 1.0 / (rate_start + (rate_end - rate_start) * i / steps)
+
+    def __repr__(self):
+        return f"MotionProfile(steps={self.steps}, duration={self.duration:.3f}s, segments={len(self.segments)})"
+
+
+class ProfileSettings:
+    def __init__(self, max_speed, accel, jerk=0, start_speed=0.5):
+        # Unidades en mm: mm/s, mm/s², mm/s³ (jerk 0 = perfil trapezoidal)
+        self.max_speed = max_speed
+        self.accel = accel
+        self.jerk = jerk
+        self.start_speed = min(start_speed, max_speed)
+
+    def plan(self, distance_mm, steps_per_mm):
+        # Al paso más cercano: int() convertiría 0.29 mm a 100 pasos/mm en 28 pasos
+        return self.plan_steps(round(abs(distance_mm) * steps_per_mm), steps_per_mm)
+
+    def plan_steps(self, steps, steps_per_mm):
+        # Número exacto de pasos (movimientos absolutos en pasos)
+        return plan_move(
+            steps,
+            self.max_speed * steps_per_mm,
+            self.accel * steps_per_mm,
+            self.jerk * steps_per_mm,
+            self.start_speed * steps_per_mm
+        )
+
+    def ramp(self, steps_per_mm):
+        # (inicio, crucero, aceleración) en pasos/s y pasos/s² para las rampas
+        # trapezoidales que genera el firmware en el ciclo de capa
+        max_rate = self.max_speed * steps_per_mm
+        start_rate = max(1.0, min(self.start_speed * steps_per_mm, max_rate))
+        return start_rate, max_rate, self.accel * steps_per_mm
+
+
+def segment_duration(steps, rate_start, rate_end):
+    if steps <= 0:
+        return 0.0
+    if abs(rate_end - rate_start) < 1e-9:
+        return steps / rate_start
+    # Suma de 1/v con v lineal en los pasos, aproximada por su integral
+    return steps * math.log(rate_end / rate_start) / (rate_end - rate_start)
+
+
+def _ramp_timing(delta_v, accel, jerk):
+    # Devuelve (tiempo con jerk, tiempo a aceleración constante, aceleración pico)
+    if delta_v <= 0:
+        return 0.0, 0.0, accel
+    if jerk <= 0:
+        return 0.0, delta_v / accel, accel
+    if delta_v >= accel * accel / jerk:
+        t_jerk = accel / jerk
+        return t_jerk, delta_v / accel - t_jerk, accel
+    peak = math.sqrt(delta_v * jerk)
+    return peak / jerk, 0.0, peak
+
+
+def _ramp_velocity(t, v0, v1, t_jerk, t_accel, peak, jerk):
+    total = 2 * t_jerk + t_accel
+    if t_jerk == 0:
+        return v0 + (v1 - v0) * t / total if total > 0 else v1
+    if t < t_jerk:
+        return v0 + jerk * t * t / 2
+    if t < t_jerk + t_accel:
+        return v0 + jerk * t_jerk * t_jerk / 2 + peak * (t - t_jerk)
+    remaining = total - t
+    return v1 - jerk * remaining * remaining / 2
+
+
+def _ramp_distance(v0, v1, accel, jerk):
+    t_jerk, t_accel, _ = _ramp_timing(v1 - v0, accel, jerk)
+    # La rampa es simétrica en velocidad: la media es el punto medio
+    return (v0 + v1) / 2 * (2 * t_jerk + t_accel)
+
+
+def _ramp_segments(steps, v0, v1, accel, jerk):
+    # Tramos de aceleración de v0 a v1 repartidos en tiempos iguales
+    t_jerk, t_accel, peak = _ramp_timing(v1 - v0, accel, jerk)
+    total = 2 * t_jerk + t_accel
+    if steps <= 0 or total <= 0:
+        return []
+
+    # Integración numérica de la posición a lo largo de la rampa
+    dt = total / INTEGRATION_SAMPLES
+    positions = [0.0]
+    velocities = [v0]
+    for i in range(1, INTEGRATION_SAMPLES + 1):
+        v = _ramp_velocity(i * dt, v0, v1, t_jerk, t_accel, peak, jerk)
+        positions.append(positions[-1] + (velocities[-1] + v) / 2 * dt)
+        velocities.append(v)
+    scale = steps / positions[-1]
+
+    segments = []
+    done = 0
+    # Un tramo que se queda sin pasos se une al siguiente (o al anterior si es
+    # el último) para que la velocidad no salte entre tramos
+    start = 0
+    per_segment = INTEGRATION_SAMPLES // RAMP_SEGMENTS
+    for k in range(RAMP_SEGMENTS):
+        end = INTEGRATION_SAMPLES if k == RAMP_SEGMENTS - 1 else (k + 1) * per_segment
+        target = int(round(positions[end] * scale))
+        count = target - done
+        if count > 0:
+            segments.append((count, velocities[start], velocities[end]))
+            done = target
+            start = end
+        elif k == RAMP_SEGMENTS - 1 and segments:
+            count, rate_start, _ = segments[-1]
+            segments[-1] = (count, rate_start, velocities[end])
+    return segments
+
+
+def plan_move(steps, max_rate, accel, jerk=0, start_rate=40):
+    steps = abs(int(steps))
+    start_rate = max(1.0, min(start_rate, max_rate))
+    if steps == 0:
+        return MotionProfile([])
+    if accel <= 0 or max_rate <= start_rate or steps < 4:
+        return MotionProfile([(steps, start_rate, start_rate)])
+
+    # Reducir la velocidad de crucero si no hay recorrido para acelerar y frenar
+    peak_rate = max_rate
+    if 2 * _ramp_distance(start_rate, peak_rate, accel, jerk) > steps:
+        low, high = start_rate, max_rate
+        for _ in range(40):
+            mid = (low + high) / 2
+            if 2 * _ramp_distance(start_rate, mid, accel, jerk) > steps:
+                high = mid
+            else:
+                low = mid
+        peak_rate = low
+
+    ramp_steps = min(steps // 2, int(_ramp_distance(start_rate, peak_rate, accel, jerk)))
+    cruise_steps = steps - 2 * ramp_steps
+
+    accel_segments = _ramp_segments(ramp_steps, start_rate, peak_rate, accel, jerk)
+    decel_segments = [(count, end, start) for count, start, end in reversed(accel_segments)]
+
+    segments = list(accel_segments)
+    if cruise_steps > 0:
+        segments.append((cruise_steps, peak_rate, peak_rate))
+    segments.extend(decel_segments)
+    return MotionProfile(segments)
+
+
+def constant_profile(steps, rate):
+    steps = abs(int(steps))
+    return MotionProfile([(steps, rate, rate)] if steps else [])
+
+
+def estimate_print_time(total_layers, primary_layers, primary_time, normal_time,
+                        lift_distance, layer_height, steps_per_mm, peel, retract):
+    # Estimación offline con los mismos perfiles que se ejecutan en la impresión
+    lift_time = peel.plan(lift_distance, steps_per_mm).duration
+    return_time = retract.plan(lift_distance - layer_height, steps_per_mm).duration
+
+    primary = min(primary_layers, total_layers)
+    exposure = primary * primary_time + (total_layers - primary) * normal_time
+    return exposure + total_layers * (lift_time + return_time)
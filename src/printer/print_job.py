@@ -0,0 +1,199 @@
+import time
+
+# Estados de la impresión
+IDLE = "idle"
+PREFLIGHT = "preflight"
+HOMING = "homing"
+SETTLING = "settling"
+EXPOSING = "exposing"
+PEELING = "peeling"
+PAUSED = "paused"
+FINISHED = "finished"
+ABORTED = "aborted"
+
+STATE_LABELS = {
+    IDLE: "Inactiva",
+    PREFLIGHT: "Verificando capas",
+    HOMING: "Buscando home",
+    SETTLING: "Estabilizando imagen",
+    EXPOSING: "Exponiendo",
+    PEELING: "Despegando",
+    PAUSED: "En pausa",
+    FINISHED: "Finalizada",
+    ABORTED: "Cancelada",
+}
+
+
+# Máquina de estados de una impresión, sin dependencias de Qt.
+#
+# El trabajo real lo hace el driver (la ventana principal, o un objeto de
+# prueba) con estos métodos:
+#   job_preflight()          empieza la verificación previa
+#   job_home()               prepara la impresión y hace el homing
+#   job_skip(capa)           capas que se saltan con un solo movimiento (0 = ninguna)
+#   job_present(capa)        muestra la imagen de la capa; devuelve cuándo
+#                            terminó de pintarse (reloj de clock) o None si
+#                            la pantalla ya la mostraba
+#   job_expose(capa)         lanza exposición, elevación y retorno
+#   job_prepare(capa)        adelanta trabajo de la capa siguiente (decodificar)
+#   job_schedule(s, fn)      llama a fn pasados s segundos
+#   job_state_changed(estado)
+#   job_finished() y job_aborted(mensaje)
+# y avisa de los resultados con preflight_done(), homed(), exposed() (la
+# placa o el PC apagaron el UV) y layer_done().
+#
+# La estabilización usa job_schedule; un temporizador que vence después de
+# cambiar de estado se ignora. El despegue empieza con el aviso real del fin
+# de la exposición, no con una estimación del PC. El UV no
+# se enciende hasta settle_time segundos después de pintada la imagen, para
+# que la pantalla haya terminado de mostrarla. Un error del driver en
+# cualquier paso de una capa cancela la impresión con su mensaje.
+class PrintJob:
+    def __init__(self, driver, total_layers, preflight=False, settle_time=0.0,
+                 first_layer=0, clock=time.monotonic):
+        # first_layer > 0 al reanudar una impresión interrumpida
+        self.driver = driver
+        self.total_layers = total_layers
+        self.preflight = preflight
+        self.settle_time = settle_time
+        self.clock = clock
+        self.state = IDLE
+        self.layer = first_layer
+        self.message = None
+        self.pause_requested = False
+        # Momento en que se pintó la imagen de la capa en curso
+        self.presented_at = None
+        # Segundos acumulados en cada estado
+        self.state_times = {}
+        self._entered = None
+        # Capas que completa el ciclo en curso (más de una al saltar capas
+        # vacías) y si es un salto, sin exposición ni despegue
+        self.cycle_layers = 1
+        self.cycle_skipped = False
+        self._timer = 0
+
+    @property
+    def active(self):
+        return self.state not in (IDLE, FINISHED, ABORTED)
+
+    def start(self):
+        if self.state != IDLE:
+            raise RuntimeError("La impresión ya se ha iniciado")
+        if self.preflight:
+            self._set_state(PREFLIGHT)
+            self.driver.job_preflight()
+        else:
+            self._home()
+
+    # Avisos del driver
+
+    def preflight_done(self):
+        if self.state == PREFLIGHT:
+            self._home()
+
+    def homed(self):
+        if self.state == HOMING:
+            self._run(self._next_layer)
+
+    def exposed(self):
+        # UV apagado: empieza la elevación
+        if self.state == EXPOSING:
+            self._run(self._peel)
+
+    def layer_done(self):
+        # Fin del ciclo de la capa (o del movimiento que salta capas vacías)
+        if self.state in (EXPOSING, PEELING):
+            self.layer += self.cycle_layers
+            self._run(self._next_layer)
+
+    # Órdenes del usuario
+
+    def pause(self):
+        # Se detiene al terminar el ciclo de la capa en curso
+        if self.active and self.state != PAUSED:
+            self.pause_requested = True
+            self.driver.job_state_changed(self.state)
+
+    def resume(self):
+        self.pause_requested = False
+        if self.state == PAUSED:
+            self._run(self._next_layer)
+        elif self.active:
+            self.driver.job_state_changed(self.state)
+
+    def abort(self, message=None):
+        if not self.active:
+            return
+        self.message = message
+        self._set_state(ABORTED)
+        self.driver.job_aborted(message)
+
+    # Transiciones
+
+    def _set_state(self, state):
+        now = self.clock()
+        if self._entered is not None:
+            self.state_times[self.state] = self.state_times.get(self.state, 0.0) + now - self._entered
+        self._entered = now
+        self.state = state
+        # Los temporizadores pendientes del estado anterior dejan de valer
+        self._timer += 1
+        self.driver.job_state_changed(state)
+
+    def _run(self, step):
+        try:
+            step()
+        except Exception as e:
+            self.abort(f"Error en capa {self.layer + 1}: {e}")
+
+    def _after(self, delay, callback):
+        token = self._timer
+
+        def fire():
+            if token == self._timer and self.active:
+                self._run(callback)
+
+        if delay > 0:
+            self.driver.job_schedule(delay, fire)
+        else:
+            fire()
+
+    def _home(self):
+        self._set_state(HOMING)
+        self.driver.job_home()
+
+    def _next_layer(self):
+        if self.layer >= self.total_layers:
+            self._set_state(FINISHED)
+            self.driver.job_finished()
+            return
+        if self.pause_requested:
+            self._set_state(PAUSED)
+            return
+
+        skipped = self.driver.job_skip(self.layer)
+        if skipped:
+            # Solo movimiento, sin imagen ni exposición
+            self.cycle_layers = skipped
+            self.cycle_skipped = True
+            self._set_state(PEELING)
+            return
+
+        self.cycle_layers = 1
+        self.cycle_skipped = False
+        self.presented_at = self.driver.job_present(self.layer)
+        self._set_state(SETTLING)
+        if self.presented_at is None:
+            # Misma imagen que la capa anterior: ya está estable en pantalla
+            self._after(0, self._expose)
+        else:
+            self._after(self.presented_at + self.settle_time - self.clock(), self._expose)
+
+    def _expose(self):
+        self._set_state(EXPOSING)
+        self.driver.job_expose(self.layer)
+
+    def _peel(self):
+        # UV apagado: mientras se despega se adelanta la capa siguiente
+        self._set_state(PEELING)
+        self.driver.job_prepare(self.layer + 1)
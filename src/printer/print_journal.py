@@ -0,0 +1,165 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+JOURNAL_VERSION = 1
+# fsync cada tantas capas o segundos (lo primero que ocurra)
+SYNC_LAYERS = 10
+SYNC_SECONDS = 5.0
+
+
+def journal_path(job_path):
+    # Junto al trabajo: "carpeta.journal" o "trabajo.ctb.journal"
+    return os.path.normpath(job_path) + ".journal"
+
+
+class JournalState:
+    def __init__(self, header, last_layer, status, resumed):
+        # header: registro "job"; last_layer: último registro "layer" (None si
+        # no se completó ninguna capa); status: el del registro "close" si la
+        # impresión terminó de forma ordenada
+        self.header = header
+        self.last_layer = last_layer
+        self.status = status
+        self.resumed = resumed
+
+    @property
+    def next_layer(self):
+        return self.last_layer["next"] if self.last_layer else 0
+
+    @property
+    def z(self):
+        return self.last_layer["z"] if self.last_layer else 0.0
+
+    def resumable(self, fingerprint, total_layers, layer_height):
+        # Solo impresiones interrumpidas (no terminadas ni canceladas por el
+        # usuario) de la misma versión del trabajo con la misma geometría de capas
+        header = self.header
+        return (self.status not in ("finished", "cancelled") and self.last_layer is not None
+                and self.next_layer < total_layers
+                and header.get("fingerprint") == fingerprint
+                and header.get("total_layers") == total_layers
+                and header.get("layer_height") == layer_height)
+
+
+def read_journal(path):
+    # None si no existe o no es un diario válido. Una última línea cortada
+    # (el programa se cerró mientras escribía) se ignora.
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    header = None
+    last_layer = None
+    status = None
+    resumed = 0
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        kind = record.get("type")
+        if kind == "job":
+            if record.get("version") != JOURNAL_VERSION:
+                return None
+            header = record
+        elif kind == "layer":
+            last_layer = record
+            status = None
+        elif kind == "resume":
+            resumed += 1
+            status = None
+        elif kind == "close":
+            status = record.get("status")
+    if header is None:
+        return None
+    return JournalState(header, last_layer, status, resumed)
+
+
+# Diario de solo añadir de una impresión: una línea JSON por capa completada.
+# Cada registro se vuelca al sistema operativo al escribirlo (sobrevive a un
+# cierre del programa) y el fsync, que puede tardar milisegundos, se hace por
+# lotes en un hilo aparte para no frenar el hilo de la interfaz.
+class PrintJournal:
+    def __init__(self, path, header=None, resume_layer=None,
+                 sync_layers=SYNC_LAYERS, sync_seconds=SYNC_SECONDS):
+        # Diario nuevo con header, o continuación de uno existente desde resume_layer
+        self.path = path
+        self.sync_layers = sync_layers
+        self.sync_seconds = sync_seconds
+        self.records = 0
+        self.syncs = 0
+        self.write_time = 0.0
+        self.max_write_time = 0.0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._sync = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        self._file = open(path, "a" if resume_layer is not None else "w")
+        if resume_layer is not None:
+            # Cerrar la línea que quedase cortada para no perder el registro siguiente
+            if self._file.tell() and not self._ends_with_newline(path):
+                self._file.write("\n")
+            self._write({"type": "resume", "layer": resume_layer, "time": time.time()})
+        else:
+            self._write(dict(header, type="job", version=JOURNAL_VERSION, time=time.time()))
+        self._fsync()
+
+    def layer(self, index, next_layer, z, **params):
+        # Capa (o grupo de capas vacías) completada; z en mm es la altura de
+        # la plataforma para exponer next_layer
+        start = time.perf_counter()
+        self._write(dict(params, type="layer", layer=index, next=next_layer, z=round(z, 6)))
+        self._unsynced += 1
+        if (self._unsynced >= self.sync_layers
+                or time.monotonic() - self._last_sync >= self.sync_seconds):
+            self._request_sync()
+        elapsed = time.perf_counter() - start
+        self.records += 1
+        self.write_time += elapsed
+        self.max_write_time = max(self.max_write_time, elapsed)
+
+    def overhead(self):
+        # (media, máximo) en ms de cada registro de capa en el hilo que escribe
+        if not self.records:
+            return None
+        return self.write_time / self.records * 1000, self.max_write_time * 1000
+
+    def close(self, status):
+        # status: "finished", "cancelled" o "failed"
+        if self._file is None:
+            return
+        self._executor.shutdown(wait=True)
+        overhead = self.overhead()
+        self._write({"type": "close", "status": status, "time": time.time(),
+                     "layers": self.records,
+                     "write_ms": round(overhead[0], 4) if overhead else None,
+                     "max_write_ms": round(overhead[1], 4) if overhead else None})
+        self._fsync()
+        self._file.close()
+        self._file = None
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def _request_sync(self):
+        # Si el fsync anterior sigue en curso, este lote irá en el siguiente
+        if self._sync is not None and not self._sync.done():
+            return
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._sync = self._executor.submit(self._fsync)
+
+    def _fsync(self):
+        os.fsync(self._file.fileno())
+        self.syncs += 1
@@ -0,0 +1,228 @@
+import math
+import threading
+import time
+from .motion import (Z_MOTION, Z_QUERY, Z_CONFIG, Z_MOVE, Z_ABORT, Z_LAYER, Z_VERSION, Z_DONE,
+                     Z_EXPOSED, MOVE_OK, MOVE_ABORTED, MOVE_LIMIT, BOARD_MS_MASK,
+                     encode_7bit, decode_7bit)
+
+# Puerto especial para usar la placa simulada desde la interfaz
+SIMULATOR_PORT = "Simulador"
+
+FIRMWARE_PROTOCOL_VERSION = 3
+
+
+def board_ms():
+    # millis() de la placa (28 bits, como en los informes)
+    return int(time.monotonic() * 1000) & BOARD_MS_MASK
+
+
+# Placa simulada con la parte de la API de pymata4 que usa el controlador.
+# Modela la posición del eje Z, los finales de carrera y, opcionalmente, el
+# firmware ZMotion. Registra cuándo se apagó el UV y cuándo se dio el último
+# paso para medir latencias de parada.
+class SimulatedBoard:
+    def __init__(self, pins, travel_steps=16000, position=None, firmware=True,
+                 report_latency=0.002):
+        self.pins = pins
+        self.travel_steps = travel_steps
+        self.position = travel_steps // 2 if position is None else position
+        self.firmware = firmware
+        self.report_latency = report_latency
+        self.report_dispatch = {}
+
+        self.uv = 0
+        self.uv_off_time = None
+        self.last_step_time = None
+        self.step_count = 0
+
+        self._direction = 0
+        self._step_level = 0
+        self._callbacks = {}
+        self._lock = threading.Lock()
+
+        # Estado del firmware ZMotion simulado
+        self._segments = []
+        self._layer = None
+        self._fw_uv_pin = None
+        self._fw_active = False
+        self._fw_abort = threading.Event()
+        self._fw_wake = threading.Event()
+        self._running = True
+        self._fw_thread = None
+        if firmware:
+            self._fw_thread = threading.Thread(target=self._firmware_loop, daemon=True)
+            self._fw_thread.start()
+
+    # API de pymata4
+
+    def set_pin_mode_digital_output(self, pin_number):
+        pass
+
+    def set_pin_mode_digital_input_pullup(self, pin_number, callback=None):
+        self._callbacks[pin_number] = callback
+
+    def digital_read(self, pin):
+        return [self._pin_value(pin), time.time()]
+
+    def digital_write(self, pin, value):
+        if pin == self.pins["dir"]:
+            self._direction = value
+        elif pin == self.pins["step"]:
+            if value and not self._step_level:
+                self._step(self._direction)
+            self._step_level = value
+        elif pin == self.pins["uv"]:
+            self.uv = value
+            if not value:
+                self.uv_off_time = time.monotonic()
+
+    def _send_sysex(self, sysex_command, sysex_data=None):
+        if not self.firmware or sysex_command != Z_MOTION or not sysex_data:
+            return
+        command = sysex_data[0]
+        if command == Z_QUERY:
+            self._report([Z_VERSION, FIRMWARE_PROTOCOL_VERSION])
+        elif command == Z_CONFIG:
+            if len(sysex_data) >= 6:
+                self._fw_uv_pin = sysex_data[5]
+        elif command == Z_MOVE:
+            with self._lock:
+                self._segments.append((
+                    sysex_data[1], sysex_data[2], sysex_data[3],
+                    decode_7bit(sysex_data[4:8]),
+                    1000000 / max(1, decode_7bit(sysex_data[8:11])),
+                    1000000 / max(1, decode_7bit(sysex_data[11:14])),
+                    0
+                ))
+            self._fw_wake.set()
+        elif command == Z_LAYER:
+            layer_id = sysex_data[1]
+            with self._lock:
+                busy = self._layer or self._segments or self._fw_active or self._fw_uv_pin is None
+                if not busy:
+                    ramps = [self._read_ramp(layer_id, direction, sysex_data[first:first + 13])
+                             for direction, first in ((1, 6), (0, 19))]
+                    self._layer = (layer_id, decode_7bit(sysex_data[2:6]) / 1000, ramps)
+            if busy:
+                self._report([Z_EXPOSED, layer_id, MOVE_ABORTED] + encode_7bit(board_ms(), 4) * 2)
+            self._fw_wake.set()
+        elif command == Z_ABORT:
+            with self._lock:
+                self._segments = []
+                if self._fw_active or self._layer:
+                    self._fw_abort.set()
+
+    def shutdown(self):
+        self._running = False
+        self._fw_wake.set()
+
+    @staticmethod
+    def _read_ramp(layer_id, direction, data):
+        # Igual que zReadRamp: tramo trapezoidal completo con informe al terminar
+        return (layer_id, 0x01, direction, decode_7bit(data[0:4]),
+                1000000 / max(1, decode_7bit(data[4:7])),
+                1000000 / max(1, decode_7bit(data[7:10])),
+                decode_7bit(data[10:13]))
+
+    # Simulación
+
+    def _pin_value(self, pin):
+        # Sensores con pull-up: activos a nivel bajo
+        if pin == self.pins["home"]:
+            return 0 if self.position <= 0 else 1
+        if pin == self.pins["end"]:
+            return 0 if self.position >= self.travel_steps else 1
+        return 0
+
+    def _step(self, direction):
+        with self._lock:
+            home_before = self._pin_value(self.pins["home"])
+            end_before = self._pin_value(self.pins["end"])
+            self.position += 1 if direction else -1
+            self.step_count += 1
+            self.last_step_time = time.monotonic()
+            home_after = self._pin_value(self.pins["home"])
+            end_after = self._pin_value(self.pins["end"])
+
+        if home_after != home_before:
+            self._notify(self.pins["home"], home_after)
+        if end_after != end_before:
+            self._notify(self.pins["end"], end_after)
+
+    def _notify(self, pin, value):
+        # Los cambios de los sensores llegan con la latencia del puerto serie
+        callback = self._callbacks.get(pin)
+        if callback:
+            message = [11, pin, value, time.time()]
+            threading.Timer(self.report_latency, callback, args=(message,)).start()
+
+    def _report(self, data):
+        handler = self.report_dispatch.get(Z_MOTION)
+        if handler:
+            threading.Timer(self.report_latency, handler[0], args=(data,)).start()
+
+    def _expose(self, layer):
+        # Exposición cronometrada por la placa; después encola elevación y retorno
+        layer_id, exposure, ramps = layer
+        uv_on_ms = board_ms()
+        self.digital_write(self._fw_uv_pin, 1)
+        aborted = self._fw_abort.wait(exposure)
+        self.digital_write(self._fw_uv_pin, 0)
+        with self._lock:
+            self._layer = None
+            if aborted:
+                self._fw_abort.clear()
+            else:
+                self._segments.extend(ramps)
+        reason = MOVE_ABORTED if aborted else MOVE_OK
+        self._report([Z_EXPOSED, layer_id, reason] + encode_7bit(uv_on_ms, 4)
+                     + encode_7bit(board_ms(), 4))
+
+    def _firmware_loop(self):
+        move_steps = 0
+        while self._running:
+            with self._lock:
+                layer = self._layer
+                segment = self._segments.pop(0) if self._segments and not layer else None
+                self._fw_active = segment is not None
+            if layer:
+                self._expose(layer)
+                continue
+            if segment is None:
+                self._fw_wake.wait(0.01)
+                self._fw_wake.clear()
+                continue
+
+            move_id, flags, direction, steps, rate_start, rate_end, accel = segment
+            reason = MOVE_OK
+            for i in range(steps):
+                if self._fw_abort.is_set():
+                    reason = MOVE_ABORTED
+                    break
+                limit = self.pins["end"] if direction else self.pins["home"]
+                if self._pin_value(limit) == 0:
+                    reason = MOVE_LIMIT
+                    break
+                if accel:
+                    # Rampa trapezoidal generada en la placa (zUpdateInterval)
+                    rate = min(rate_end, math.sqrt(rate_start ** 2 + 2 * accel * i),
+                               math.sqrt(rate_start ** 2 + 2 * accel * (steps - i)))
+                else:
+                    rate = rate_start + (rate_end - rate_start) * i / steps
+                self._fw_abort.wait(1.0 / rate)
+                if self._fw_abort.is_set():
+                    reason = MOVE_ABORTED
+                    break
+                self._step(direction)
+                move_steps += 1
+
+            with self._lock:
+                self._fw_active = False
+                if reason != MOVE_OK:
+                    # Igual que el firmware: se descarta el resto del movimiento
+                    self._segments = [s for s in self._segments if s[0] != move_id]
+                self._fw_abort.clear()
+            if reason != MOVE_OK or flags & 0x01:
+                self._report([Z_DONE, move_id, reason] + encode_7bit(move_steps, 4)
+                             + encode_7bit(board_ms(), 4))
+                move_steps = 0
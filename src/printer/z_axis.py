@@ -0,0 +1,168 @@
+from .motion import MOVE_OK, MOVE_ABORTED, MOVE_LIMIT
+from .planner import constant_profile
+
+
+# Eje Z con posición absoluta en pasos (0 = sensor HOME, positivo = subir).
+# La posición solo es válida tras un homing y se invalida ante cualquier
+# movimiento abortado o error, ya que entonces pueden haberse perdido pasos.
+class ZAxis:
+    def __init__(self, motion, steps_per_mm, travel_mm):
+        self.motion = motion
+        self.steps_per_mm = steps_per_mm
+        self.max_steps = int(travel_mm * steps_per_mm)
+        self.position = None
+        self.end_position = None
+
+    @property
+    def homed(self):
+        return self.position is not None
+
+    @property
+    def position_mm(self):
+        return None if self.position is None else self.position / self.steps_per_mm
+
+    def invalidate(self):
+        self.position = None
+
+    def run(self, profile, direction):
+        try:
+            result = self.motion.run(profile, direction)
+        except Exception:
+            self.invalidate()
+            raise
+        return self._track(result, direction)
+
+    def layer_cycle(self, exposure, lift_distance, peel, return_distance, retract,
+                    before_send=None, on_exposed=None):
+        # Ciclo de capa ejecutado por el firmware (requiere motion.layer_cycle_supported)
+        lift_steps = round(abs(lift_distance) * self.steps_per_mm)
+        return_steps = round(abs(return_distance) * self.steps_per_mm)
+        duration = (peel.plan(lift_distance, self.steps_per_mm).duration +
+                    retract.plan(return_distance, self.steps_per_mm).duration)
+        try:
+            cycle = self.motion.layer_cycle(
+                exposure, lift_steps, peel.ramp(self.steps_per_mm),
+                return_steps, retract.ramp(self.steps_per_mm), duration, before_send,
+                on_exposed
+            )
+        except Exception:
+            self.invalidate()
+            raise
+
+        # Si se abortó durante la exposición el eje no se ha movido
+        for result, direction in ((cycle.lift, 1), (cycle.back, 0)):
+            if result is not None:
+                self._track(result, direction)
+        return cycle
+
+    def _track(self, result, direction):
+        if result.reason == MOVE_ABORTED:
+            self.invalidate()
+        elif result.reason == MOVE_LIMIT and direction == 0:
+            # El sensor HOME vuelve a fijar el cero
+            self.position = 0
+        elif self.position is not None:
+            self.position += result.steps if direction else -result.steps
+            if result.reason == MOVE_LIMIT:
+                self.end_position = self.position
+        return result
+
+    def move(self, steps, rate):
+        return self.run(constant_profile(steps, rate), 1 if steps > 0 else 0)
+
+    def move_to(self, target, settings):
+        # Movimiento absoluto con perfil planificado (requiere posición conocida)
+        if self.position is None:
+            raise RuntimeError("Posición Z desconocida: ejecute homing primero")
+        # El límite es el sensor END si ya se midió: puede estar más allá de
+        # max_steps (se busca hasta end_search_mm)
+        limit = self.end_position if self.end_position is not None else self.max_steps
+        target = max(0, min(limit, int(target)))
+        delta = target - self.position
+        # Pasos exactos, sin pasar por mm; run() fija la posición con los
+        # pasos que se ejecutaron realmente
+        profile = settings.plan_steps(abs(delta), self.steps_per_mm)
+        return self.run(profile, 1 if delta > 0 else 0)
+
+    def home(self, fast, slow_speed, backoff_mm, force=False):
+        # Devuelve False si se omitió porque la posición sigue siendo válida
+        if self.position is not None and not force:
+            return False
+
+        # 1. Aproximación rápida hasta el sensor
+        self.position = None
+        result = self.run(fast.plan_steps(self.max_steps, self.steps_per_mm), 0)
+        if result.reason != MOVE_LIMIT:
+            raise RuntimeError("No se alcanzó el sensor HOME")
+
+        # 2. Retroceso para liberar el sensor
+        backoff = int(backoff_mm * self.steps_per_mm)
+        slow_rate = slow_speed * self.steps_per_mm
+        result = self.move(backoff, slow_rate)
+        if result.reason != MOVE_OK:
+            self.invalidate()
+            raise RuntimeError("No se pudo liberar el sensor HOME")
+
+        # 3. Aproximación lenta para fijar el cero con precisión
+        result = self.move(-2 * backoff, slow_rate)
+        if result.reason != MOVE_LIMIT:
+            self.invalidate()
+            raise RuntimeError("No se alcanzó el sensor HOME en la aproximación lenta")
+        return True
+
+    def end_search_mm(self):
+        # Algo más que el recorrido: desde el cero el sensor puede estar justo al final
+        return self.max_steps * 1.05 / self.steps_per_mm
+
+    def measure_end(self, settings):
+        # Posición del sensor END en pasos: si no se conoce se sube hasta él
+        # (requiere homing) y se vuelve a la posición de partida
+        if self.end_position is None:
+            if self.position is None:
+                raise RuntimeError("Posición Z desconocida: ejecute homing primero")
+            start = self.position
+            try:
+                result = self.run(settings.plan(self.end_search_mm(), self.steps_per_mm), 1)
+                if result.reason != MOVE_LIMIT:
+                    raise RuntimeError("No se alcanzó el sensor END")
+            finally:
+                # También si no se encontró el sensor (salvo movimiento abortado)
+                if self.position is not None:
+                    self.move_to(start, settings)
+        return self.end_position
+
+    def reapproach(self, target_mm, clearance_mm, end_mm, fast, slow):
+        # Vuelve a la altura de una capa con la pieza ya en la plataforma, sin
+        # bajar nunca a ciegas: si la posición es desconocida se sube hasta el
+        # sensor END, cuya posición (end_mm) se midió al empezar la impresión
+        if self.position is None:
+            if end_mm is None:
+                raise RuntimeError("Posición Z desconocida y sin referencia del sensor END")
+            result = self.run(fast.plan(self.end_search_mm(), self.steps_per_mm), 1)
+            if result.reason != MOVE_LIMIT:
+                self.invalidate()
+                raise RuntimeError("No se alcanzó el sensor END")
+            self.position = self.end_position = int(round(end_mm * self.steps_per_mm))
+
+        # Hasta la distancia de elevación por encima de la capa y el último
+        # tramo despacio, como la aproximación lenta del homing
+        target = int(round(target_mm * self.steps_per_mm))
+        clearance = int(round(clearance_mm * self.steps_per_mm))
+        result = self.move_to(target + clearance, fast)
+        if result.reason != MOVE_OK:
+            raise RuntimeError("Aproximación interrumpida")
+        result = self.move_to(target, slow)
+        if result.reason != MOVE_OK:
+            raise RuntimeError("Aproximación interrumpida")
+        return result
+
+    def go_end(self, settings):
+        if self.position is not None and self.end_position is not None:
+            # Posición del sensor END conocida: movimiento absoluto directo
+            return self.move_to(self.end_position, settings)
+
+        # Buscar el sensor END con el perfil planificado y memorizar su posición
+        result = self.run(settings.plan_steps(self.max_steps, self.steps_per_mm), 1)
+        if result.reason != MOVE_LIMIT:
+            raise RuntimeError("No se alcanzó el sensor END")
+        return result
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from PyQt6.QtCore import QThread, pyqtSignal
+from .slice_index import gray_array
+from . import sources
+
+# Se incrementa si cambia el contenido del archivo de análisis
+ANALYSIS_VERSION = 2
+
+
+def analysis_path(job_path, merge=1, coverage=0):
+    # Junto al trabajo: "carpeta.analysis.json" o "trabajo.ctb.analysis.json";
+    # en modo borrador, de las capas combinadas: "carpeta.borrador3-0.5.analysis.json"
+    draft = f".borrador{merge}-{coverage:g}" if merge > 1 else ""
+    return os.path.normpath(job_path) + draft + ".analysis.json"
+
+
+def layer_digest(gray):
+    # Huella del contenido para reconocer capas idénticas
+    return hashlib.blake2b(np.ascontiguousarray(gray), digest_size=16).hexdigest()
+
+
+def layer_stats(gray, previous_mask):
+    # Área iluminada (en píxeles, los grises del antialiasing cuentan en
+    # proporción), caja envolvente, centroide ponderado, píxeles que cambian
+    # respecto a la capa anterior y huella. Devuelve (estadísticas, máscara).
+    mask = gray > 0
+    digest = layer_digest(gray)
+    column_sums = gray.sum(axis=0, dtype=np.uint64)
+    row_sums = gray.sum(axis=1, dtype=np.uint64)
+    total = int(column_sums.sum())
+    area = total / 255
+
+    if previous_mask is None:
+        changed = int(np.count_nonzero(mask))
+    else:
+        changed = int(np.count_nonzero(mask != previous_mask))
+
+    if total == 0:
+        return (area, None, None, changed, digest), mask
+
+    columns = np.flatnonzero(column_sums)
+    rows = np.flatnonzero(row_sums)
+    bbox = [int(columns[0]), int(rows[0]), int(columns[-1]), int(rows[-1])]
+    centroid = [
+        float(column_sums @ np.arange(gray.shape[1], dtype=np.float64) / total),
+        float(row_sums @ np.arange(gray.shape[0], dtype=np.float64) / total),
+    ]
+    return (area, bbox, centroid, changed, digest), mask
+
+
+# Resultados por capa, consultables por índice mientras se van calculando
+class LayerAnalysis:
+    def __init__(self, fingerprint, total_layers):
+        self.fingerprint = fingerprint
+        self.total_layers = total_layers
+        self.width = 0
+        self.height = 0
+        self.areas = []
+        self.bboxes = []
+        self.centroids = []
+        self.changes = []
+        self.digests = []
+
+    def __len__(self):
+        return len(self.areas)
+
+    @property
+    def complete(self):
+        return len(self.areas) == self.total_layers
+
+    def append(self, stats):
+        area, bbox, centroid, changed, digest = stats
+        # La lista de áreas se amplía la última: len() solo cuenta capas completas
+        self.bboxes.append(bbox)
+        self.centroids.append(centroid)
+        self.changes.append(changed)
+        self.digests.append(digest)
+        self.areas.append(area)
+
+    def _get(self, values, index):
+        return values[index] if 0 <= index < len(self.areas) else None
+
+    def area(self, index):
+        return self._get(self.areas, index)
+
+    def fraction(self, index):
+        # Fracción de la pantalla iluminada (0-1)
+        area = self.area(index)
+        if area is None or not self.width or not self.height:
+            return None
+        return area / (self.width * self.height)
+
+    def bbox(self, index):
+        return self._get(self.bboxes, index)
+
+    def centroid(self, index):
+        return self._get(self.centroids, index)
+
+    def changed(self, index):
+        return self._get(self.changes, index)
+
+    def digest(self, index):
+        return self._get(self.digests, index)
+
+    def empty(self, index):
+        # False también si la capa aún no se ha analizado
+        return self.area(index) == 0
+
+    def same_as_previous(self, index):
+        digest = self.digest(index)
+        return digest is not None and index > 0 and digest == self.digest(index - 1)
+
+    def save(self, path):
+        data = {
+            "version": ANALYSIS_VERSION,
+            "fingerprint": self.fingerprint,
+            "total_layers": self.total_layers,
+            "width": self.width,
+            "height": self.height,
+            "area": self.areas,
+            "bbox": self.bboxes,
+            "centroid": self.centroids,
+            "changed": self.changes,
+            "digest": self.digests,
+        }
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, fingerprint, total_layers):
+        # None si no existe o es de otra versión del trabajo
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (data.get("version") != ANALYSIS_VERSION or data.get("fingerprint") != fingerprint
+                or data.get("total_layers") != total_layers):
+            return None
+        analysis = cls(fingerprint, total_layers)
+        analysis.width = data["width"]
+        analysis.height = data["height"]
+        analysis.bboxes = data["bbox"]
+        analysis.centroids = data["centroid"]
+        analysis.changes = data["changed"]
+        analysis.digests = data["digest"]
+        analysis.areas = data["area"]
+        return analysis
+
+
+# Recorre todas las capas en segundo plano (una pasada, capa a capa) y va
+# llenando un LayerAnalysis; al terminar lo guarda junto al trabajo. En modo
+# borrador (merge > 1) analiza las capas combinadas que se proyectarán.
+class AnalysisThread(QThread):
+    progress = pyqtSignal(int, int)
+    completed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, analysis, merge=1, coverage=0):
+        super().__init__()
+        self.path = path
+        self.analysis = analysis
+        self.merge = merge
+        self.coverage = coverage
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        analysis = self.analysis
+        start = time.perf_counter()
+        previous_mask = None
+        source = None
+        try:
+            # Fuente propia: no compite con la de la impresión ni se cierra con ella
+            source = sources.open_slice_source(self.path, self.merge, self.coverage)
+            if len(source) != analysis.total_layers:
+                raise ValueError("El trabajo ha cambiado durante el análisis")
+            for index in range(analysis.total_layers):
+                if self._cancelled:
+                    return
+                if hasattr(source, "decode"):
+                    # Formatos RLE: directamente a array sin pasar por QImage
+                    gray = source.decode(index)
+                else:
+                    gray = gray_array(source.load_image(index))
+                analysis.height, analysis.width = gray.shape
+                stats, previous_mask = layer_stats(gray, previous_mask)
+                analysis.append(stats)
+                if index % 16 == 0:
+                    self.progress.emit(len(analysis), analysis.total_layers)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        finally:
+            if source is not None:
+                source.close()
+
+        print(f"Análisis: {len(analysis)} capas en {time.perf_counter() - start:.1f} s")
+        try:
+            analysis.save(analysis_path(self.path, self.merge, self.coverage))
+        except OSError as e:
+            print(f"No se pudo guardar el análisis: {e}")
+        self.completed.emit(analysis)
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import zipfile
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QImage, QImageReader
+from .slice_index import IMAGE_EXTENSIONS, SliceFile, build_sequence, inspect_image, layer_number
+
+ARCHIVE_EXTENSIONS = ('.zip', '.sl1', '.sl1s')
+
+
+# Slices dentro de un .zip/.sl1 sin extraerlos: el directorio central se lee
+# una sola vez al abrir el archivo y cada capa se descomprime bajo demanda
+# desde los hilos de precarga.
+class ArchiveSource:
+    def __init__(self, path):
+        self.path = path
+        self.layers = []
+        self.settings = None
+        self.scans = 0
+        self._archive = None
+        self._mtime = None
+        self.refresh()
+
+    def refresh(self):
+        # Solo se vuelve a abrir si el archivo ha cambiado en disco
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return False
+
+        archive = zipfile.ZipFile(self.path)
+        directories = {}
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            directory, file_name = os.path.split(info.filename)
+            number = layer_number(file_name)
+            if number is not None:
+                directories.setdefault(directory, []).append(
+                    SliceFile(number, info.filename, info.file_size, info.date_time)
+                )
+
+        # Las miniaturas de los .sl1 van en su propio directorio: las capas son
+        # las del directorio con la secuencia más larga
+        sequences = [build_sequence(files) for files in directories.values()]
+        if self._archive is not None:
+            self._archive.close()
+        self._archive = archive
+        self.layers = max(sequences, key=len, default=[])
+        self._mtime = mtime
+        self.scans += 1
+        return True
+
+    def __len__(self):
+        return len(self.layers)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def fingerprint(self):
+        # El CRC32 de cada miembro identifica el contenido sin descomprimirlo
+        digest = hashlib.sha1()
+        for slice_file in self.layers:
+            crc = self._archive.getinfo(slice_file.name).CRC
+            digest.update(f"{slice_file.name}:{slice_file.size}:{crc:08x}\n".encode())
+        return digest.hexdigest()
+
+    def read(self, index):
+        # ZipFile admite lecturas concurrentes de distintos miembros
+        return self._archive.read(self.layers[index].name)
+
+    def load_image(self, index):
+        image = QImage.fromData(self.read(index))
+        if image.isNull():
+            raise ValueError(f"No se pudo leer la capa {self.layers[index].name} de {self.name}")
+        return image
+
+    def _reader(self, index):
+        buffer = QBuffer()
+        buffer.setData(QByteArray(self.read(index)))
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        # El lector no se queda con el buffer: se guarda con él para que no se libere
+        reader = QImageReader(buffer)
+        reader.buffer = buffer
+        return reader
+
+    def image_size(self, index):
+        return self._reader(index).size()
+
+    def inspect(self, index, expected=None):
+        return inspect_image(self._reader(index), expected)
+
+    def close(self):
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
@@ -0,0 +1,89 @@
+import math
+import numpy as np
+from PyQt6.QtGui import QImage
+from .slice_index import gray_array
+
+
+def merge_layers(arrays, coverage=0):
+    # Combina varias capas (arrays alto x ancho uint8) en una sola.
+    # coverage 0 = unión; si no, un píxel se ilumina cuando lo está en al menos
+    # esa fracción de las capas, con el valor más alto que tenga entre ellas.
+    merged = np.maximum.reduce(arrays)
+    if coverage > 0 and len(arrays) > 1:
+        needed = max(1, math.ceil(coverage * len(arrays)))
+        lit = np.zeros(merged.shape, dtype=np.uint8)
+        for gray in arrays:
+            lit += gray > 0
+        merged[lit < needed] = 0
+    return merged
+
+
+def array_image(gray):
+    # QImage Grayscale8 con su propia copia de los datos
+    gray = np.ascontiguousarray(gray)
+    height, width = gray.shape
+    return QImage(gray.data, width, height, width, QImage.Format.Format_Grayscale8).copy()
+
+
+# Modo borrador: cada capa es la combinación de `merge` capas seguidas del
+# trabajo original. Se decodifican al pedirlas (en los hilos o procesos de
+# precarga), así que funciona como una etapa más delante de la proyección.
+class DraftSource:
+    def __init__(self, source, merge, coverage=0):
+        self.source = source
+        self.merge = merge
+        self.coverage = coverage
+        self.settings = source.settings
+
+    def __len__(self):
+        return math.ceil(len(self.source) / self.merge)
+
+    @property
+    def name(self):
+        return self.source.name
+
+    def refresh(self):
+        return self.source.refresh()
+
+    def layers(self, index):
+        # Índices del trabajo original que forman la capa combinada
+        first = index * self.merge
+        return range(first, min(first + self.merge, len(self.source)))
+
+    def thickness(self, index):
+        # Número de capas originales (la última puede ser más fina)
+        return len(self.layers(index))
+
+    def decode(self, index):
+        arrays = []
+        for layer in self.layers(index):
+            if hasattr(self.source, "decode"):
+                gray = self.source.decode(layer)
+            else:
+                gray = gray_array(self.source.load_image(layer))
+            if arrays and gray.shape != arrays[0].shape:
+                raise ValueError(f"La capa {layer + 1} no tiene la misma resolución que la "
+                                 f"capa {self.layers(index)[0] + 1}")
+            arrays.append(gray)
+        return merge_layers(arrays, self.coverage)
+
+    def load_image(self, index):
+        return array_image(self.decode(index))
+
+    def image_size(self, index):
+        return self.source.image_size(self.layers(index)[0])
+
+    def inspect(self, index, expected=None):
+        # Se verifica la capa combinada, que es la que se proyecta
+        size = self.image_size(index)
+        if expected is not None and size.isValid() and size != expected:
+            return size.width(), size.height(), 0, True, None, None
+        merged = self.decode(index)
+        height, width = merged.shape
+        return width, height, 8, True, int(merged.min()), int(merged.max())
+
+    def fingerprint(self):
+        return f"{self.source.fingerprint()}:borrador{self.merge}:{self.coverage:g}"
+
+    def close(self):
+        self.source.close()
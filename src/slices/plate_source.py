@@ -0,0 +1,259 @@
+import hashlib
+import json
+import math
+import os
+import numpy as np
+from PyQt6.QtCore import QSize, QThread, pyqtSignal
+from . import analysis, sources
+from .draft_source import array_image
+from .slice_index import gray_array
+
+PLATE_EXTENSIONS = ('.plate',)
+PLATE_VERSION = 1
+
+
+class PlateJob:
+    def __init__(self, path, x=0, y=0, layer_height=0.05):
+        # Desplazamiento en píxeles de la esquina superior izquierda del trabajo
+        self.path = path
+        self.x = x
+        self.y = y
+        self.layer_height = layer_height
+
+
+def save_plate(path, jobs, layer_height, width, height):
+    # Rutas relativas al archivo de bandeja cuando es posible
+    folder = os.path.dirname(os.path.abspath(path))
+    data = {
+        "version": PLATE_VERSION,
+        "layer_height": layer_height,
+        "width": width,
+        "height": height,
+        "jobs": [
+            {"path": os.path.relpath(os.path.abspath(job.path), folder), "x": job.x, "y": job.y,
+             "layer_height": job.layer_height}
+            for job in jobs
+        ],
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def load_plate(path):
+    # (trabajos, altura de capa, ancho, alto); ValueError si no es válido
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        if data["version"] != PLATE_VERSION:
+            raise ValueError(f"versión {data['version']} no soportada")
+        folder = os.path.dirname(os.path.abspath(path))
+        jobs = [PlateJob(os.path.join(folder, job["path"]), int(job["x"]), int(job["y"]),
+                         float(job["layer_height"]))
+                for job in data["jobs"]]
+        return jobs, float(data["layer_height"]), int(data["width"]), int(data["height"])
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Bandeja no válida: {os.path.basename(path)} ({e})")
+
+
+def decode_gray(source, index):
+    if hasattr(source, "decode"):
+        return source.decode(index)
+    return gray_array(source.load_image(index))
+
+
+def footprint(source, progress=None, cancelled=None):
+    # Silueta de todas las capas de un trabajo (para detectar colisiones).
+    # progress(capas) tras cada capa; None si cancelled() lo pide.
+    mask = None
+    for index in range(len(source)):
+        if cancelled and cancelled():
+            return None
+        lit = decode_gray(source, index) > 0
+        mask = lit if mask is None else mask | lit
+        if progress:
+            progress(1)
+    return mask
+
+
+def bbox_footprint(path, source):
+    # Silueta aproximada sin decodificar: unión de las cajas envolventes de
+    # cada capa del análisis guardado junto al trabajo (None si no lo hay o
+    # es de otra versión). Contiene siempre a la silueta real.
+    saved = analysis.LayerAnalysis.load(analysis.analysis_path(path), source.fingerprint(),
+                                        len(source))
+    if saved is None or not saved.width or not saved.height:
+        return None
+    mask = np.zeros((saved.height, saved.width), dtype=bool)
+    for left, top, right, bottom in {tuple(bbox) for bbox in saved.bboxes if bbox}:
+        mask[top:bottom + 1, left:right + 1] = True
+    return mask
+
+
+def overlap(a, b):
+    # Píxeles comunes de dos siluetas (x, y, máscara) colocadas en la bandeja
+    xa, ya, mask_a = a
+    xb, yb, mask_b = b
+    left, top = max(xa, xb), max(ya, yb)
+    right = min(xa + mask_a.shape[1], xb + mask_b.shape[1])
+    bottom = min(ya + mask_a.shape[0], yb + mask_b.shape[0])
+    if left >= right or top >= bottom:
+        return 0
+    return int(np.count_nonzero(
+        mask_a[top - ya:bottom - ya, left - xa:right - xa] &
+        mask_b[top - yb:bottom - yb, left - xb:right - xb]
+    ))
+
+
+# Varios trabajos en una misma bandeja: cada capa de la bandeja se compone
+# al pedirla a partir de la capa de cada trabajo que cae a esa altura, así
+# que trabajos con distinta altura de capa se imprimen juntos sin relaminar.
+class PlateSource:
+    def __init__(self, path):
+        self.plate_path = path
+        self.jobs, self.layer_height, self.width, self.height = load_plate(path)
+        if not self.jobs:
+            raise ValueError("La bandeja no tiene trabajos")
+        self.settings = {"layer_height": self.layer_height}
+        self.sources = []
+        try:
+            for job in self.jobs:
+                self.sources.append(sources.open_slice_source(job.path))
+            self.check_bounds()
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        # Hasta la altura del trabajo más alto
+        height = max(len(source) * job.layer_height for job, source in zip(self.jobs, self.sources))
+        return math.ceil(height / self.layer_height - 1e-6)
+
+    @property
+    def name(self):
+        return os.path.basename(self.plate_path)
+
+    def refresh(self):
+        for source in self.sources:
+            source.refresh()
+
+    def job_layer(self, job_number, index):
+        # Capa del trabajo que cae a media altura de la capa de la bandeja
+        # (None si el trabajo ya ha terminado)
+        job = self.jobs[job_number]
+        layer = int((index + 0.5) * self.layer_height / job.layer_height + 1e-6)
+        return layer if layer < len(self.sources[job_number]) else None
+
+    def check_bounds(self):
+        for job, source in zip(self.jobs, self.sources):
+            if not len(source):
+                raise ValueError(f"{source.name}: no tiene capas")
+            size = source.image_size(0)
+            if (job.x < 0 or job.y < 0 or job.x + size.width() > self.width
+                    or job.y + size.height() > self.height):
+                raise ValueError(f"{source.name} ({size.width()}x{size.height()} en {job.x},{job.y}) "
+                                 f"se sale de la bandeja de {self.width}x{self.height}")
+
+    def collisions(self, progress=None, cancelled=None):
+        # Pares de trabajos cuyas siluetas se solapan en la bandeja; None si
+        # cancelled() lo pide. Con análisis guardado se compara primero la
+        # unión de cajas envolventes y solo se decodifican todas las capas de
+        # los trabajos cuyas cajas se solapan. progress(hechas, total) en capas.
+        placed = []
+        for job, source in zip(self.jobs, self.sources):
+            placed.append((job.x, job.y, bbox_footprint(job.path, source)))
+
+        # Trabajos sin análisis o con cajas que se solapan con las de otro
+        exact = {number for number, (x, y, mask) in enumerate(placed) if mask is None}
+        for a in range(len(placed)):
+            for b in range(a + 1, len(placed)):
+                if a not in exact and b not in exact and overlap(placed[a], placed[b]):
+                    exact.update((a, b))
+
+        total = sum(len(self.sources[number]) for number in exact)
+        done = [0]
+
+        def advance(layers):
+            done[0] += layers
+            if progress and (done[0] % 16 == 0 or done[0] == total):
+                progress(done[0], total)
+
+        for number in sorted(exact):
+            job = self.jobs[number]
+            mask = footprint(self.sources[number], advance, cancelled)
+            if mask is None:
+                return None
+            placed[number] = (job.x, job.y, mask)
+
+        problems = []
+        for a in range(len(placed)):
+            for b in range(a + 1, len(placed)):
+                pixels = overlap(placed[a], placed[b])
+                if pixels:
+                    problems.append(f"{self.sources[a].name} y {self.sources[b].name} "
+                                    f"se solapan en {pixels} píxeles")
+        return problems
+
+    def decode(self, index):
+        canvas = np.zeros((self.height, self.width), dtype=np.uint8)
+        for job_number, (job, source) in enumerate(zip(self.jobs, self.sources)):
+            layer = self.job_layer(job_number, index)
+            if layer is None:
+                continue
+            gray = decode_gray(source, layer)
+            height, width = gray.shape
+            if job.x + width > self.width or job.y + height > self.height:
+                raise ValueError(f"{source.name}: la capa {layer + 1} se sale de la bandeja")
+            region = canvas[job.y:job.y + height, job.x:job.x + width]
+            np.maximum(region, gray, out=region)
+        return canvas
+
+    def load_image(self, index):
+        return array_image(self.decode(index))
+
+    def image_size(self, index):
+        return QSize(self.width, self.height)
+
+    def inspect(self, index, expected=None):
+        if expected is not None and expected != QSize(self.width, self.height):
+            return self.width, self.height, 0, True, None, None
+        canvas = self.decode(index)
+        return self.width, self.height, 8, True, int(canvas.min()), int(canvas.max())
+
+    def fingerprint(self):
+        digest = hashlib.sha1(f"{self.layer_height}:{self.width}x{self.height}".encode())
+        for job, source in zip(self.jobs, self.sources):
+            digest.update(f"{job.x}:{job.y}:{job.layer_height}:{source.fingerprint()}\n".encode())
+        return digest.hexdigest()
+
+    def close(self):
+        for source in self.sources:
+            source.close()
+
+
+# Comprobación de una bandeja en segundo plano: límites y colisiones, con
+# fuentes propias para no bloquear la interfaz.
+class PlateCheckThread(QThread):
+    progress = pyqtSignal(int, int)
+    completed = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        try:
+            plate = PlateSource(self.path)
+            try:
+                problems = plate.collisions(self.progress.emit, lambda: self._cancelled)
+            finally:
+                plate.close()
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        if problems is not None:
+            self.completed.emit(problems)
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PyQt6.QtCore import QThread, QSize, pyqtSignal
+from .sources import open_slice_source
+
+# Trabajo abierto en cada proceso de trabajo
+_sources = {}
+
+
+def inspect_layers(path, indices, expected, merge=1, coverage=0):
+    # Se ejecuta en un proceso de trabajo sobre un lote de capas (combinadas
+    # si merge > 1, como en la impresión)
+    key = (path, merge, coverage)
+    source = _sources.get(key)
+    if source is None:
+        source = _sources[key] = open_slice_source(path, merge, coverage)
+    expected = QSize(*expected) if expected else None
+
+    results = []
+    for index in indices:
+        try:
+            results.append((index, source.inspect(index, expected), None))
+        except Exception as e:
+            results.append((index, None, str(e) or type(e).__name__))
+    return results
+
+
+class PreflightReport:
+    def __init__(self, total_layers, expected):
+        self.total_layers = total_layers
+        self.expected = expected
+        self.checked = 0
+        self.errors = []
+        self.warnings = []
+        self.seconds = 0.0
+        self._first_size = None
+
+    def add(self, index, info, error):
+        # Los mensajes usan el número de capa que ve el usuario (desde 1)
+        self.checked += 1
+        layer = index + 1
+        if error:
+            self.errors.append((layer, f"no se puede decodificar ({error})"))
+            return
+
+        width, height, depth, gray, low, high = info
+        size = (width, height)
+        if self.expected and size != self.expected:
+            self.errors.append((layer, f"resolución {width}x{height} distinta de la pantalla "
+                                       f"({self.expected[0]}x{self.expected[1]})"))
+            return
+        if self._first_size is None:
+            self._first_size = size
+        elif size != self._first_size:
+            self.warnings.append((layer, f"resolución {width}x{height} distinta del resto"))
+
+        if not gray:
+            self.warnings.append((layer, "imagen en color (se proyecta en escala de grises)"))
+        elif depth > 8:
+            self.warnings.append((layer, f"{depth} bits por píxel (se reduce a 8)"))
+        if high == 0:
+            self.warnings.append((layer, "capa vacía"))
+        elif low == 255:
+            self.warnings.append((layer, "capa totalmente blanca"))
+
+    def sort(self):
+        self.errors.sort()
+        self.warnings.sort()
+
+    def summary(self, limit=10):
+        lines = []
+        for title, issues in (("Errores", self.errors), ("Avisos", self.warnings)):
+            if not issues:
+                continue
+            lines.append(f"{title} ({len(issues)}):")
+            lines.extend(f"  Capa {layer}: {message}" for layer, message in issues[:limit])
+            if len(issues) > limit:
+                lines.append(f"  ... y {len(issues) - limit} más")
+        return "\n".join(lines)
+
+
+# Verificación previa de todas las capas en un pool de procesos: se ejecuta en
+# su propio hilo para no bloquear la interfaz y va informando del progreso.
+class PreflightThread(QThread):
+    progress = pyqtSignal(int, int)
+    completed = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, path, total_layers, expected=None, workers=None, merge=1, coverage=0):
+        super().__init__()
+        self.path = path
+        self.total_layers = total_layers
+        self.merge = merge
+        self.coverage = coverage
+        # Tamaño esperado (QSize) en modo 1:1; None si las capas se escalan
+        self.expected = (expected.width(), expected.height()) if expected else None
+        self.workers = workers or os.cpu_count() or 1
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        start = time.perf_counter()
+        report = PreflightReport(self.total_layers, self.expected)
+        # Lotes pequeños para repartir bien la carga, enviar progreso a menudo
+        # y que cancelar solo tenga que esperar a los lotes en curso
+        batch = max(1, min(16, self.total_layers // (self.workers * 8)))
+        batches = [range(first, min(first + batch, self.total_layers))
+                   for first in range(0, self.total_layers, batch)]
+        workers = min(self.workers, len(batches)) or 1
+
+        try:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [executor.submit(inspect_layers, self.path, list(indices), self.expected,
+                                           self.merge, self.coverage)
+                           for indices in batches]
+                for future in as_completed(futures):
+                    if self._cancelled:
+                        for pending in futures:
+                            pending.cancel()
+                        return
+                    for index, info, error in future.result():
+                        report.add(index, info, error)
+                    self.progress.emit(report.checked, self.total_layers)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+
+        report.sort()
+        report.seconds = time.perf_counter() - start
+        self.completed.emit(report)
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import re
+from collections import namedtuple
+import numpy as np
+from PyQt6.QtGui import QImage, QImageReader
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Último grupo de dígitos del nombre (sin extensión): "v2_layer0001.png" -> 1
+_LAYER_NUMBER = re.compile(r"(\d+)\D*$")
+
+SliceFile = namedtuple("SliceFile", "number name size mtime")
+
+
+def layer_number(file_name):
+    stem = os.path.splitext(file_name)[0]
+    match = _LAYER_NUMBER.search(stem)
+    return int(match.group(1)) if match else None
+
+
+def gray_array(image):
+    # Array numpy (alto x ancho) de una capa en escala de grises de 8 bits
+    if image.format() != QImage.Format.Format_Grayscale8:
+        image = image.convertToFormat(QImage.Format.Format_Grayscale8)
+    bits = image.constBits()
+    bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    # copy(): el array no depende de la vida del QImage
+    return rows[:, :image.width()].copy()
+
+
+def inspect_image(reader, expected=None):
+    # (ancho, alto, bits por píxel, en grises, mínimo, máximo) de una capa.
+    # Si la cabecera ya no coincide con la resolución esperada no se decodifica.
+    size = reader.size()
+    if expected is not None and size.isValid() and size != expected:
+        return size.width(), size.height(), 0, True, None, None
+
+    image = reader.read()
+    if image.isNull():
+        raise ValueError(reader.errorString())
+    gray = image.allGray()
+    values = gray_array(image)
+    return image.width(), image.height(), image.depth(), gray, int(values.min()), int(values.max())
+
+
+def build_sequence(files):
+    # La secuencia válida empieza en 1 (o en 0, como en los .sl1) y es
+    # continua; se corta en el primer hueco o número repetido
+    layers = []
+    ordered = sorted(files, key=lambda f: (f.number, f.name))
+    first = 0 if ordered and ordered[0].number == 0 else 1
+    for slice_file in ordered:
+        if slice_file.number != first + len(layers):
+            break
+        layers.append(slice_file)
+    return layers
+
+
+# Índice de los slices de una carpeta: se construye con una sola pasada de
+# os.scandir, guarda tamaño y fecha de cada archivo y solo vuelve a leer la
+# carpeta cuando ha cambiado (altas, bajas o renombrados).
+class SliceIndex:
+    def __init__(self, folder):
+        self.folder = folder
+        self.files = {}
+        self.layers = []
+        self.settings = None
+        self.scans = 0
+        self._folder_mtime = None
+        self.refresh()
+
+    def refresh(self):
+        # Devuelve True si la carpeta se ha vuelto a leer
+        folder_mtime = os.stat(self.folder).st_mtime_ns
+        if folder_mtime == self._folder_mtime:
+            return False
+
+        files = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith(IMAGE_EXTENSIONS) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                cached = self.files.get(entry.name)
+                if cached and cached.size == stat.st_size and cached.mtime == stat.st_mtime_ns:
+                    files[entry.name] = cached
+                    continue
+                number = layer_number(entry.name)
+                if number is not None:
+                    files[entry.name] = SliceFile(number, entry.name, stat.st_size, stat.st_mtime_ns)
+
+        self.files = files
+        self.layers = build_sequence(files.values())
+        self._folder_mtime = folder_mtime
+        self.scans += 1
+        return True
+
+    def __len__(self):
+        return len(self.layers)
+
+    @property
+    def name(self):
+        return os.path.basename(self.folder)
+
+    def path(self, index):
+        return os.path.join(self.folder, self.layers[index].name)
+
+    def fingerprint(self):
+        # Sin leer el contenido: nombre, tamaño y fecha de cada capa. Una capa
+        # sobrescrita en su sitio no cambia la fecha de la carpeta, así que
+        # aquí (y no en refresh) se vuelve a leer la de cada archivo.
+        self._update_layers()
+        digest = hashlib.sha1()
+        for slice_file in self.layers:
+            digest.update(f"{slice_file.name}:{slice_file.size}:{slice_file.mtime}\n".encode())
+        return digest.hexdigest()
+
+    def _update_layers(self):
+        for number, slice_file in enumerate(self.layers):
+            try:
+                stat = os.stat(os.path.join(self.folder, slice_file.name))
+            except OSError:
+                # Borrada: la fecha de la carpeta ha cambiado y refresh() la quitará
+                continue
+            if stat.st_size != slice_file.size or stat.st_mtime_ns != slice_file.mtime:
+                slice_file = slice_file._replace(size=stat.st_size, mtime=stat.st_mtime_ns)
+                self.layers[number] = self.files[slice_file.name] = slice_file
+
+    def load_image(self, index):
+        # Se llama desde los hilos de precarga
+        image = QImage(self.path(index))
+        if image.isNull():
+            raise ValueError(f"No se pudo leer la imagen {self.path(index)}")
+        return image
+
+    def inspect(self, index, expected=None):
+        return inspect_image(QImageReader(self.path(index)), expected)
+
+    def image_size(self, index):
+        # Solo lee la cabecera
+        return QImageReader(self.path(index)).size()
+
+    def close(self):
+        pass
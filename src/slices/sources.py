@@ -0,0 +1,34 @@
+import os
+from .archive_source import ARCHIVE_EXTENSIONS, ArchiveSource
+from .draft_source import DraftSource
+from .plate_source import PLATE_EXTENSIONS, PlateSource
+from .slice_index import SliceIndex
+from .vendor_source import VENDOR_EXTENSIONS, VendorSource
+
+JOB_EXTENSIONS = ARCHIVE_EXTENSIONS + VENDOR_EXTENSIONS + PLATE_EXTENSIONS
+
+# Todas las fuentes de slices ofrecen la misma interfaz:
+#   len(source), source.name, source.refresh(), source.load_image(indice),
+#   source.image_size(indice), source.inspect(indice, esperado),
+#   source.fingerprint(), source.close() y source.settings
+# load_image se llama desde los hilos de precarga y devuelve un QImage.
+# fingerprint identifica el contenido del trabajo sin decodificarlo.
+# inspect devuelve (ancho, alto, bits, en grises, mínimo, máximo) para la
+# verificación previa; mínimo y máximo son None si no se llegó a decodificar.
+# settings es None o un diccionario con los parámetros de impresión que trae
+# el propio archivo (layer_height, primary_time, normal_time, lift_distance...).
+
+
+def open_slice_source(path, merge=1, coverage=0):
+    # merge > 1: modo borrador, combinando cada `merge` capas en una
+    if merge > 1:
+        return DraftSource(open_slice_source(path), merge, coverage)
+    if os.path.isdir(path):
+        return SliceIndex(path)
+    if path.lower().endswith(ARCHIVE_EXTENSIONS):
+        return ArchiveSource(path)
+    if path.lower().endswith(VENDOR_EXTENSIONS):
+        return VendorSource(path)
+    if path.lower().endswith(PLATE_EXTENSIONS):
+        return PlateSource(path)
+    raise ValueError(f"Formato de trabajo no soportado: {os.path.basename(path)}")
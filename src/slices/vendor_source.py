@@ -0,0 +1,286 @@
+import hashlib
+import math
+import os
+import struct
+import threading
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QImage
+
+VENDOR_EXTENSIONS = ('.ctb', '.cbddlp', '.photon')
+
+# Firmas de la cabecera: .cbddlp y .photon comparten formato (RLE de 1 bit),
+# .ctb usa RLE de 7 bits en escala de grises
+MAGIC_CBDDLP = 0x12FD0019
+MAGIC_CTB = 0x12FD0086
+
+# Cabecera común (little endian, 112 bytes)
+_HEADER = struct.Struct("<2I3f2I5f12I2H3I")
+_HEADER_FIELDS = (
+    "magic", "version", "bed_x", "bed_y", "bed_z", "_pad1", "_pad2",
+    "total_height", "layer_height", "exposure_time", "bottom_exposure_time",
+    "light_off_time", "bottom_layers", "resolution_x", "resolution_y",
+    "preview_large", "layers_offset", "layer_count", "preview_small",
+    "print_time", "projector_type", "params_offset", "params_size",
+    "antialias", "light_pwm", "bottom_light_pwm", "encryption_key",
+    "slicer_offset", "slicer_size",
+)
+
+# Parámetros de impresión (versión >= 2): alturas en mm, velocidades en mm/min
+_PARAMS = struct.Struct("<5f")
+
+# Entrada de la tabla de capas (36 bytes): altura, exposición, espera,
+# dirección, tamaño y página (bloques de 4 GB) de los datos
+_LAYER = struct.Struct("<3f3I12x")
+
+# Longitudes RLE de .ctb: bytes que ocupan según el primero (0 = no válido)
+# y desplazamiento y máscara para sacarlas de los 4 bytes que siguen al código
+_LENGTH_BYTES = np.zeros(256, dtype=np.int32)
+_LENGTH_BYTES[:0x80] = 1
+_LENGTH_BYTES[0x80:0xC0] = 2
+_LENGTH_BYTES[0xC0:0xE0] = 3
+_LENGTH_BYTES[0xE0:0xF0] = 4
+_LENGTH_SHIFT = np.array([0, 24, 16, 8, 0], dtype=np.uint32)
+_LENGTH_MASK = np.array([0, 0x7F, 0x3FFF, 0x1FFFFF, 0x0FFFFFFF], dtype=np.uint32)
+
+
+def _decode_header(data):
+    if len(data) < _HEADER.size:
+        raise ValueError("Archivo demasiado corto")
+    return dict(zip(_HEADER_FIELDS, _HEADER.unpack_from(data)))
+
+
+def decode_bits(data, pixels):
+    # RLE de 1 bit: bit 7 = color, bits 0-6 = longitud del tramo
+    codes = np.frombuffer(data, dtype=np.uint8)
+    lengths = codes & 0x7F
+    values = np.where(codes & 0x80, 1, 0).astype(np.uint8)
+    return _fit(np.repeat(values, lengths), pixels)
+
+
+def decode_ctb(data, pixels):
+    # RLE de 7 bits: si el bit 7 del código está activo le sigue una longitud
+    # de 1 a 4 bytes (el prefijo del primero indica cuántos). Tanto la lectura
+    # de códigos y longitudes como la expansión a píxeles son vectorizadas.
+    codes = np.frombuffer(data, dtype=np.uint8)
+    size = codes.size
+    padded = np.concatenate([codes, np.zeros(5, dtype=np.uint8)])
+    long = codes >= 0x80
+    extra = _LENGTH_BYTES[padded[1:size + 1]]
+    # Dónde empezaría el tramo siguiente si en cada byte empezara uno
+    following = np.arange(1, size + 6, dtype=np.int64)
+    following[:size] += np.where(long, np.maximum(extra, 1), 0)
+    starts = np.flatnonzero(_run_starts(following, size, max(64, math.isqrt(size))))
+
+    lengths = np.ones(starts.size, dtype=np.uint32)
+    runs = long[starts]
+    first = starts[runs]
+    kind = extra[first]
+    if (kind == 0).any() or (starts.size and following[starts[-1]] > size):
+        raise ValueError("Longitud RLE no válida")
+    # Los 4 bytes tras el código como entero big endian; se recorta según el prefijo
+    words = sliding_window_view(padded, 4)[first + 1].view(">u4").ravel()
+    lengths[runs] = (words >> _LENGTH_SHIFT[kind]) & _LENGTH_MASK[kind]
+
+    gray = codes[starts] & 0x7F
+    # Gris de 7 bits a 8 bits (0 sigue siendo negro, 127 pasa a 255)
+    gray = np.where(gray > 0, (gray << 1) | 1, 0).astype(np.uint8)
+    return _fit(np.repeat(gray, lengths), pixels)
+
+
+def _run_starts(following, size, block):
+    # Un byte es código o longitud según los anteriores, así que la lectura es
+    # secuencial. Se lee cada bloque a la vez desde su inicio (un paso de
+    # numpy avanza un tramo en todos) y después se encadenan: si la lectura
+    # real entra en un bloque por otra posición, se sigue tramo a tramo hasta
+    # coincidir con la del bloque, lo que suele ocurrir en pocos bytes.
+    starts = np.zeros(size, dtype=bool)
+    begin = np.arange(0, size, block)
+    end = np.minimum(begin + block, size)
+    position = begin.copy()
+    while True:
+        inside = position < end
+        if not inside.any():
+            break
+        starts[position[inside]] = True
+        position = np.where(inside, following[position], position)
+
+    exits = position.tolist()
+    n = 0
+    for index, (first, last) in enumerate(zip(begin.tolist(), end.tolist())):
+        if n == first:
+            n = exits[index]
+            continue
+        path = []
+        while n < last and not starts[n]:
+            path.append(n)
+            n = following[n]
+        starts[first:min(n, last)] = False
+        starts[path] = True
+        if n < last:
+            n = exits[index]
+    return starts
+
+
+def decrypt_ctb(data, key, layer):
+    # Cifrado XOR de los .ctb v3 con clave: una palabra de 32 bits por cada
+    # 4 bytes, que avanza sumando init
+    if not key:
+        return data
+    init = (key * 0x2D83CDAC + 0xD8A83423) & 0xFFFFFFFF
+    start = ((layer * 0x1E1530CD + 0xEC3D47CD) * init) & 0xFFFFFFFF
+    words = (len(data) + 3) // 4
+    keys = (np.arange(words, dtype=np.uint64) * init + start) & 0xFFFFFFFF
+    stream = keys.astype("<u4").view(np.uint8)[:len(data)]
+    return (np.frombuffer(data, dtype=np.uint8) ^ stream).tobytes()
+
+
+def _fit(pixels_array, pixels):
+    # Las capas pueden quedarse cortas (el resto es negro) o pasarse por redondeo
+    if pixels_array.size >= pixels:
+        return pixels_array[:pixels]
+    return np.concatenate([pixels_array, np.zeros(pixels - pixels_array.size, dtype=np.uint8)])
+
+
+# Lector de formatos RLE de fabricante (.ctb, .cbddlp, .photon): lee la
+# cabecera y la tabla de capas al abrir y decodifica cada capa bajo demanda
+# directamente a un búfer de grises.
+class VendorSource:
+    def __init__(self, path):
+        self.path = path
+        self.header = None
+        self.levels = 1
+        self.layers = []
+        self.settings = None
+        self.scans = 0
+        self._digest = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._mtime = None
+        self.refresh()
+
+    def refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return False
+
+        file = open(self.path, "rb")
+        try:
+            header = _decode_header(file.read(_HEADER.size))
+            if header["magic"] not in (MAGIC_CBDDLP, MAGIC_CTB):
+                raise ValueError(f"Firma desconocida 0x{header['magic']:08X}")
+
+            # .cbddlp con antialiasing: una tabla de capas (un plano de bits) por nivel
+            levels = max(1, header["antialias"]) if header["magic"] == MAGIC_CBDDLP else 1
+            count = header["layer_count"]
+            file.seek(header["layers_offset"])
+            table = file.read(_LAYER.size * count * levels)
+            if len(table) < _LAYER.size * count * levels:
+                raise ValueError("Tabla de capas incompleta")
+            entries = list(_LAYER.iter_unpack(table))
+            # Cabecera y tabla de capas (tamaños y posiciones de todos los datos)
+            digest = hashlib.sha1(_HEADER.pack(*header.values()) + table).hexdigest()
+            layers = []
+            for index in range(count):
+                planes = [entries[level * count + index] for level in range(levels)]
+                # (altura, exposición, [(offset, tamaño) por nivel])
+                layers.append((planes[0][0], planes[0][1],
+                               [(plane[3] + (plane[5] << 32), plane[4]) for plane in planes]))
+
+            params = None
+            if header["version"] >= 2 and header["params_offset"]:
+                file.seek(header["params_offset"])
+                data = file.read(_PARAMS.size)
+                if len(data) == _PARAMS.size:
+                    params = _PARAMS.unpack(data)
+        except Exception:
+            file.close()
+            raise
+
+        if self._file is not None:
+            self._file.close()
+        self._file = file
+        self.header = header
+        self.levels = levels
+        self.layers = layers
+        self.settings = self._print_settings(header, params)
+        self._digest = digest
+        self._mtime = mtime
+        self.scans += 1
+        return True
+
+    @staticmethod
+    def _print_settings(header, params):
+        # Valores con las unidades de los controles de la ventana principal
+        settings = {
+            "layer_height": header["layer_height"],
+            "primary_layers": header["bottom_layers"],
+            "primary_time": header["bottom_exposure_time"],
+            "normal_time": header["exposure_time"],
+        }
+        if params:
+            bottom_lift, bottom_speed, lift_height, lift_speed, retract_speed = params
+            settings["lift_distance"] = lift_height
+            settings["lift_speed"] = lift_speed / 60
+            settings["return_speed"] = retract_speed / 60
+        # Los float32 de la cabecera traen ruido (0.05 -> 0.0500000007)
+        return {key: round(value, 4) for key, value in settings.items()}
+
+    def __len__(self):
+        return len(self.layers)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def fingerprint(self):
+        return self._digest
+
+    def _read(self, offset, size):
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(size)
+
+    def decode(self, index):
+        # Capa como array de grises (alto x ancho) de 8 bits
+        width = self.header["resolution_x"]
+        height = self.header["resolution_y"]
+        pixels = width * height
+        planes = self.layers[index][2]
+
+        if self.header["magic"] == MAGIC_CTB:
+            offset, size = planes[0]
+            data = decrypt_ctb(self._read(offset, size), self.header["encryption_key"], index)
+            gray = decode_ctb(data, pixels)
+        else:
+            # Cada nivel de antialiasing suma un plano de bits
+            total = np.zeros(pixels, dtype=np.uint16)
+            for offset, size in planes:
+                total += decode_bits(self._read(offset, size), pixels)
+            gray = (total * 255 // len(planes)).astype(np.uint8)
+        return gray.reshape(height, width)
+
+    def inspect(self, index, expected=None):
+        # La resolución es la de la cabecera; el contenido requiere expandir el RLE
+        width = self.header["resolution_x"]
+        height = self.header["resolution_y"]
+        depth = 8 if self.header["magic"] == MAGIC_CTB or self.levels > 1 else 1
+        if expected is not None and QSize(width, height) != expected:
+            return width, height, depth, True, None, None
+        gray = self.decode(index)
+        return width, height, depth, True, int(gray.min()), int(gray.max())
+
+    def load_image(self, index):
+        gray = self.decode(index)
+        height, width = gray.shape
+        # copy(): el QImage pasa a tener su propia memoria y no depende del array
+        return QImage(gray.data, width, height, width, QImage.Format.Format_Grayscale8).copy()
+
+    def image_size(self, index):
+        return QSize(self.header["resolution_x"], self.header["resolution_y"])
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
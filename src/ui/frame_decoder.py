@@ -0,0 +1,121 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QImage
+from slices.sources import open_slice_source
+from .layer_prefetcher import load_scaled_frame, load_native_frame
+
+# Estado de cada proceso de trabajo: el trabajo abierto y el bloque de memoria
+# compartida se conservan entre capas
+_sources = {}
+_blocks = {}
+
+# Bloques que no se pudieron cerrar porque algún QImage seguía apuntando a ellos
+_retired = []
+
+
+def slot_bytes(size):
+    # Un frame Grayscale8 (filas alineadas a 4 bytes) es el caso más grande;
+    # los Mono ocupan menos
+    return ((size.width() + 3) // 4 * 4) * size.height()
+
+
+def _decode_to_slot(job, index, size, native, block_name, offset, slot_size):
+    # Se ejecuta en un proceso de trabajo: decodifica la capa y la escribe
+    # directamente en su ranura de la memoria compartida.
+    # job = (ruta, capas combinadas, cobertura)
+    source = _sources.get(job)
+    if source is None:
+        source = _sources[job] = open_slice_source(*job)
+    block = _blocks.get(block_name)
+    if block is None:
+        block = _blocks[block_name] = shared_memory.SharedMemory(name=block_name)
+
+    loader = load_native_frame if native else load_scaled_frame
+    image = loader(source, index, QSize(*size))
+    length = image.sizeInBytes()
+    if length > slot_size:
+        raise ValueError(f"La capa {index + 1} no cabe en la ranura de memoria compartida")
+    block.buf[offset:offset + length] = image.constBits().asstring(length)
+    return image.width(), image.height(), image.bytesPerLine(), image.format().value, image.colorTable()
+
+
+def _close_retired():
+    for block in list(_retired):
+        try:
+            block.close()
+            _retired.remove(block)
+        except BufferError:
+            pass
+
+
+# Decodificación en procesos (sin el límite del GIL) con entrega sin copias:
+# cada capa se escribe en una ranura de un anillo de memoria compartida y el
+# proceso principal la envuelve en un QImage que apunta a esa memoria.
+# Las ranuras se asignan en rueda saltando la de la capa en pantalla (pin):
+# con capas repetidas o vacías la imagen mostrada puede ser muy anterior a
+# las que se precargan, y su ranura no se puede sobrescribir mientras se ve.
+# Hacen falta al menos tantas ranuras como capas precargadas más la mostrada.
+class ProcessFrameDecoder:
+    def __init__(self, path, size, native, workers, slots, merge=1, coverage=0):
+        _close_retired()
+        self.job = (path, merge, coverage)
+        self.size = (size.width(), size.height())
+        self.native = native
+        self.slots = slots
+        self.slot_size = slot_bytes(size)
+        # Capa escrita en cada ranura, siguiente ranura de la rueda y ranura fijada
+        self._slot_layers = [None] * slots
+        self._next_slot = 0
+        self._pinned = None
+        self._lock = threading.Lock()
+        self._block = shared_memory.SharedMemory(create=True, size=self.slot_size * slots)
+        # spawn en todas las plataformas: no se hereda el estado de Qt del proceso principal
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def pin(self, index):
+        # Capa que pasa a estar en pantalla; su ranura no se reutiliza hasta
+        # que se fije otra (None si la imagen mostrada no es de este decodificador)
+        with self._lock:
+            self._pinned = None
+            for slot, layer in enumerate(self._slot_layers):
+                if layer == index:
+                    self._pinned = slot
+
+    def _take_slot(self, index):
+        # Llamado desde los hilos de precarga
+        with self._lock:
+            slot = self._next_slot
+            if slot == self._pinned:
+                slot = (slot + 1) % self.slots
+            self._next_slot = (slot + 1) % self.slots
+            self._slot_layers[slot] = index
+            return slot
+
+    def load(self, index):
+        offset = self._take_slot(index) * self.slot_size
+        future = self._executor.submit(
+            _decode_to_slot, self.job, index, self.size, self.native,
+            self._block.name, offset, self.slot_size
+        )
+        width, height, bytes_per_line, image_format, color_table = future.result()
+
+        view = self._block.buf[offset:offset + bytes_per_line * height]
+        image = QImage(view, width, height, bytes_per_line, QImage.Format(image_format))
+        if color_table:
+            image.setColorTable(color_table)
+        return image
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._block.unlink()
+        try:
+            self._block.close()
+        except BufferError:
+            # Se cerrará cuando se liberen los frames que aún lo usan
+            _retired.append(self._block)
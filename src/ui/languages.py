@@ -32,6 +32,8 @@ TRANSLATIONS = {
         # Parámetros de Impresión
         "print_params": "Parámetros de Impresión",
         "select_folder": "Seleccionar Carpeta",
+        "select_archive": "Seleccionar Archivo",
+        "compose_plate": "Componer Bandeja",
         "layer_height": "Altura de capa:",
         "primary_layers": "Número de capas primarias:",
         "primary_time": "Tiempo capas primarias:",
@@ -39,6 +41,8 @@ TRANSLATIONS = {
         "lift_distance": "Distancia de elevación:",
         "start_print": "Iniciar Impresión",
         "cancel_print": "Cancelar Impresión",
+        "pause_print": "Pausar Impresión",
+        "resume_print": "Reanudar Impresión",
         
         # Estado de Impresión
         "print_status": "Estado de Impresión",
@@ -91,6 +95,8 @@ TRANSLATIONS = {
         
         "print_params": "Print Parameters",
         "select_folder": "Select Folder",
+        "select_archive": "Select Archive",
+        "compose_plate": "Compose Plate",
         "layer_height": "Layer height:",
         "primary_layers": "Number of primary layers:",
         "primary_time": "Primary layers time:",
@@ -98,6 +104,8 @@ TRANSLATIONS = {
         "lift_distance": "Lift distance:",
         "start_print": "Start Print",
         "cancel_print": "Cancel Print",
+        "pause_print": "Pause Print",
+        "resume_print": "Resume Print",
         
         "print_status": "Print Status",
         "current_layer": "Current layer:",
@@ -148,6 +156,8 @@ TRANSLATIONS = {
         
         "print_params": "Параметры печати",
         "select_folder": "Выбрать папку",
+        "select_archive": "Выбрать архив",
+        "compose_plate": "Собрать платформу",
         "layer_height": "Высота слоя:",
         "primary_layers": "Количество первичных слоев:",
         "primary_time": "Время первичных слоев:",
@@ -155,6 +165,8 @@ TRANSLATIONS = {
         "lift_distance": "Высота подъема:",
         "start_print": "Начать печать",
         "cancel_print": "Отменить печать",
+        "pause_print": "Приостановить печать",
+        "resume_print": "Продолжить печать",
         
         "print_status": "Статус печати",
         "current_layer": "Текущий слой:",
@@ -205,6 +217,8 @@ TRANSLATIONS = {
         
         "print_params": "Druckparameter",
         "select_folder": "Ordner wählen",
+        "select_archive": "Archiv wählen",
+        "compose_plate": "Plattform zusammenstellen",
         "layer_height": "Schichthöhe:",
         "primary_layers": "Anzahl Primärschichten:",
         "primary_time": "Zeit Primärschichten:",
@@ -212,6 +226,8 @@ TRANSLATIONS = {
         "lift_distance": "Hebehöhe:",
         "start_print": "Druck starten",
         "cancel_print": "Druck abbrechen",
+        "pause_print": "Druck pausieren",
+        "resume_print": "Druck fortsetzen",
         
         "print_status": "Druckstatus",
         "current_layer": "Aktuelle Schicht:",
@@ -262,6 +278,8 @@ TRANSLATIONS = {
         
         "print_params": "Paramètres d'Impression",
         "select_folder": "Sélectionner Dossier",
+        "select_archive": "Sélectionner Archive",
+        "compose_plate": "Composer le plateau",
         "layer_height": "Hauteur de couche:",
         "primary_layers": "Nombre de couches primaires:",
         "primary_time": "Temps couches primaires:",
@@ -269,6 +287,8 @@ TRANSLATIONS = {
         "lift_distance": "Distance de levage:",
         "start_print": "Démarrer Impression",
         "cancel_print": "Annuler Impression",
+        "pause_print": "Suspendre Impression",
+        "resume_print": "Reprendre Impression",
         
         "print_status": "État d'Impression",
         "current_layer": "Couche actuelle:",
@@ -319,6 +339,8 @@ TRANSLATIONS = {
         
         "print_params": "打印参数",
         "select_folder": "选择文件夹",
+        "select_archive": "选择压缩包",
+        "compose_plate": "组合打印平台",
         "layer_height": "层高：",
         "primary_layers": "初始层数：",
         "primary_time": "初始层时间：",
@@ -326,6 +348,8 @@ TRANSLATIONS = {
         "lift_distance": "提升距离：",
         "start_print": "开始打印",
         "cancel_print": "取消打印",
+        "pause_print": "暂停打印",
+        "resume_print": "继续打印",
         
         "print_status": "打印状态",
         "current_layer": "当前层：",
@@ -376,6 +400,8 @@ TRANSLATIONS = {
         
         "print_params": "प्रिंटिंग पैरामीटर्स",
         "select_folder": "फोल्डर चुनें",
+        "select_archive": "आर्काइव चुनें",
+        "compose_plate": "प्लेट बनाएं",
         "layer_height": "परत की ऊंचाई:",
         "primary_layers": "प्राथमिक परतों की संख्या:",
         "primary_time": "प्राथमिक परत का समय:",
@@ -383,6 +409,8 @@ TRANSLATIONS = {
         "lift_distance": "उठाने की दूरी:",
         "start_print": "प्रिंट शुरू करें",
         "cancel_print": "प्रिंट रद्द करें",
+        "pause_print": "प्रिंट रोकें",
+        "resume_print": "प्रिंट फिर शुरू करें",
         
         "print_status": "प्रिंट की स्थिति",
         "current_layer": "वर्तमान परत:",
@@ -433,6 +461,8 @@ TRANSLATIONS = {
         
         "print_params": "印刷パラメータ",
         "select_folder": "フォルダ選択",
+        "select_archive": "アーカイブ選択",
+        "compose_plate": "プレート構成",
         "layer_height": "レイヤー高さ：",
         "primary_layers": "初期レイヤー数：",
         "primary_time": "初期レイヤー時間：",
@@ -440,6 +470,8 @@ TRANSLATIONS = {
         "lift_distance": "リフト距離：",
         "start_print": "印刷開始",
         "cancel_print": "印刷キャンセル",
+        "pause_print": "印刷一時停止",
+        "resume_print": "印刷再開",
         
         "print_status": "印刷状態",
         "current_layer": "現在のレイヤー：",
@@ -490,6 +522,8 @@ TRANSLATIONS = {
         
         "print_params": "프린트 매개변수",
         "select_folder": "폴더 선택",
+        "select_archive": "압축 파일 선택",
+        "compose_plate": "플레이트 구성",
         "layer_height": "레이어 높이:",
         "primary_layers": "초기 레이어 수:",
         "primary_time": "초기 레이어 시간:",
@@ -497,6 +531,8 @@ TRANSLATIONS = {
         "lift_distance": "리프트 거리:",
         "start_print": "프린트 시작",
         "cancel_print": "프린트 취소",
+        "pause_print": "프린트 일시정지",
+        "resume_print": "프린트 재개",
         
         "print_status": "프린트 상태",
         "current_layer": "현재 레이어:",
@@ -547,6 +583,8 @@ TRANSLATIONS = {
         
         "print_params": "Parâmetros de Impressão",
         "select_folder": "Selecionar Pasta",
+        "select_archive": "Selecionar Arquivo",
+        "compose_plate": "Compor Plataforma",
         "layer_height": "Altura da camada:",
         "primary_layers": "Número de camadas primárias:",
         "primary_time": "Tempo camadas primárias:",
@@ -554,6 +592,8 @@ TRANSLATIONS = {
         "lift_distance": "Distância de elevação:",
         "start_print": "Iniciar Impressão",
         "cancel_print": "Cancelar Impressão",
+        "pause_print": "Pausar Impressão",
+        "resume_print": "Retomar Impressão",
         
         "print_status": "Estado da Impressão",
         "current_layer": "Camada atual:",
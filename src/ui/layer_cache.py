@@ -0,0 +1,208 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+from PyQt6.QtCore import QStandardPaths
+from PyQt6.QtGui import QImage
+
+# Se incrementa si cambia el formato de los frames guardados
+CACHE_VERSION = 1
+# El índice se reescribe cada tantos frames nuevos (y al cerrar): si el
+# programa se cierra de golpe solo se pierden los últimos
+INDEX_INTERVAL = 32
+
+
+def default_cache_dir():
+    location = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.CacheLocation)
+    return os.path.join(location, "layers")
+
+
+def cache_key(fingerprint, size, native):
+    # Mismo trabajo en otra pantalla o en otro modo de proyección = otra entrada
+    mode = "nativo" if native else "escalado"
+    text = f"{CACHE_VERSION}:{fingerprint}:{size.width()}x{size.height()}:{mode}"
+    return hashlib.sha1(text.encode()).hexdigest()[:20]
+
+
+def evict(directory, budget, keep=None):
+    # Borra las entradas usadas hace más tiempo hasta quedar dentro del
+    # presupuesto. El uso se marca con la fecha del índice (.json); un .frames
+    # sin índice no se puede servir y se borra siempre. Devuelve los bytes
+    # que siguen ocupando las entradas distintas de keep.
+    names = os.listdir(directory)
+    indexed = {name[:-len(".json")] for name in names if name.endswith(".json")}
+    entries = []
+    for name in names:
+        key, extension = os.path.splitext(name)
+        if key == keep:
+            continue
+        if extension == ".frames" and key not in indexed:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+            continue
+        if extension != ".json":
+            continue
+        index_path = os.path.join(directory, name)
+        data_path = os.path.join(directory, key + ".frames")
+        try:
+            size = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+            entries.append((os.path.getmtime(index_path), size, index_path, data_path))
+        except OSError:
+            continue
+
+    others = sum(entry[1] for entry in entries)
+    total = others
+    if keep:
+        keep_path = os.path.join(directory, keep + ".frames")
+        if os.path.exists(keep_path):
+            total += os.path.getsize(keep_path)
+
+    for used, size, index_path, data_path in sorted(entries):
+        if total <= budget:
+            break
+        for path in (index_path, data_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+        others -= size
+    return others
+
+
+# Caché en disco de capas ya convertidas a la resolución y formato de la
+# pantalla. Cada entrada es un único archivo .frames con los frames uno tras
+# otro y un índice .json con su posición; al reimprimir el trabajo el archivo
+# se mapea en memoria y los frames se sirven sin decodificar ni copiar.
+# El presupuesto es el total en disco: si una entrada nueva no cabe se
+# borran otras entradas antiguas para hacerle sitio.
+class LayerCache:
+    def __init__(self, directory, key, budget):
+        self.directory = directory
+        self.key = key
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self._frames = {}
+        self._map = None
+        self._writer = None
+        self._size = 0
+        self._others = 0
+        self._unsaved = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._data_path = os.path.join(directory, key + ".frames")
+        self._index_path = os.path.join(directory, key + ".json")
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+        self._others = evict(directory, budget, keep=key)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path) as f:
+                index = json.load(f)
+            size = os.path.getsize(self._data_path)
+        except (OSError, ValueError):
+            return
+        if index.get("version") != CACHE_VERSION:
+            return
+
+        # Solo se aceptan frames que estén completos en el archivo
+        for layer, entry in index["frames"].items():
+            offset, width, height, bytes_per_line, image_format, color_table = entry
+            if offset + bytes_per_line * height <= size:
+                self._frames[int(layer)] = entry
+        self._size = size
+        if self._frames:
+            with open(self._data_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Marcar la entrada como usada recientemente (LRU)
+        os.utime(self._index_path)
+
+    def __len__(self):
+        return len(self._frames)
+
+    def get(self, index):
+        entry = self._frames.get(index)
+        if entry is None or self._map is None or entry[0] >= len(self._map):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        offset, width, height, bytes_per_line, image_format, color_table = entry
+        # El QImage apunta directamente a la memoria mapeada y mantiene viva
+        # la vista mientras se use
+        view = memoryview(self._map)[offset:offset + bytes_per_line * height]
+        image = QImage(view, width, height, bytes_per_line, QImage.Format(image_format))
+        if color_table:
+            image.setColorTable(color_table)
+        with self._lock:
+            self.hits += 1
+        return image
+
+    def load(self, index, loader):
+        # Frame de la caché o, si no está, cargado con loader(indice) y guardado
+        image = self.get(index)
+        if image is None:
+            image = loader(index)
+            self.put(index, image)
+        return image
+
+    def put(self, index, image):
+        size = image.sizeInBytes()
+        with self._lock:
+            if self._closed or index in self._frames or self._size + size > self.budget:
+                return
+            if self._others + self._size + size > self.budget:
+                self._others = evict(self.directory, self.budget - size, keep=self.key)
+                if self._others + self._size + size > self.budget:
+                    return
+            if self._writer is None:
+                # El índice existe antes que los frames: el .frames nunca queda huérfano
+                if not os.path.exists(self._index_path):
+                    self._write_index()
+                self._writer = open(self._data_path, "ab")
+            self._writer.seek(0, os.SEEK_END)
+            offset = self._writer.tell()
+            self._writer.write(image.constBits().asstring(size))
+            self._frames[index] = [offset, image.width(), image.height(), image.bytesPerLine(),
+                                   image.format().value, image.colorTable()]
+            self._size = offset + size
+            self._unsaved += 1
+            if self._unsaved >= INDEX_INTERVAL:
+                self._writer.flush()
+                self._write_index()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            if self._unsaved:
+                self._write_index()
+
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Algún frame mapeado sigue en uso: se cierra al liberarse
+                pass
+            self._map = None
+
+    def _write_index(self):
+        self._unsaved = 0
+        index = {
+            "version": CACHE_VERSION,
+            "frames": {str(layer): entry for layer, entry in self._frames.items()},
+        }
+        temp_path = self._index_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(temp_path, self._index_path)
@@ -0,0 +1,92 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
+from concurrent.futures import ThreadPoolExecutor
+from .layer_store import compact_frame, frame_memory
+
+
+def load_scaled_frame(source, index, size):
+    # Se ejecuta en un hilo de trabajo: QImage (a diferencia de QPixmap) es seguro fuera del hilo GUI
+    image = source.load_image(index)
+
+    # Escalar en escala de grises: un canal en lugar de cuatro
+    gray = image.convertToFormat(QImage.Format.Format_Grayscale8)
+    scaled = gray.scaled(
+        size,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation
+    )
+    return compact_frame(scaled)
+
+
+def load_native_frame(source, index, size):
+    # Modo 1:1: sin escalado; la resolución ya se validó al iniciar el trabajo
+    image = source.load_image(index)
+    if image.size() != size:
+        raise ValueError(f"La capa {index + 1} no tiene la resolución de la pantalla")
+    return compact_frame(image)
+
+
+# Decodifica y escala las próximas capas en un pool de hilos mientras la capa
+# actual se expone o se eleva, de modo que mostrar una capa solo intercambia
+# un QImage ya preparado.
+class LayerPrefetcher:
+    def __init__(self, loader, total_layers, depth=4, workers=2, skip=None):
+        # loader(indice) -> QImage compacto (Mono o Grayscale8);
+        # skip(indice) -> True para capas que no se van a mostrar (repetidas o vacías)
+        self.loader = loader
+        self.skip = skip
+        self.total_layers = total_layers
+        self.depth = depth
+        self.hits = 0
+        self.misses = 0
+        self._frames = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    def prefetch(self, index):
+        # Descartar capas ya pasadas y encolar las siguientes hasta la profundidad
+        for stale in [i for i in self._frames if i < index]:
+            self._frames.pop(stale).cancel()
+        # La profundidad cuenta solo capas que hay que decodificar
+        queued = 0
+        for i in range(index, self.total_layers):
+            if queued == self.depth:
+                break
+            if self.skip and self.skip(i):
+                continue
+            queued += 1
+            if i not in self._frames:
+                self._frames[i] = self._executor.submit(self.loader, i)
+
+    def get(self, index):
+        future = self._frames.pop(index, None)
+        if future is not None and future.done():
+            self.hits += 1
+        else:
+            # Fallo de precarga: esperar (o decodificar ahora si ni siquiera estaba encolada)
+            self.misses += 1
+            if future is None:
+                future = self._executor.submit(self.loader, index)
+        return future.result()
+
+    @property
+    def ready(self):
+        return sum(1 for future in self._frames.values() if future.done())
+
+    def resident_memory(self):
+        # Bytes que ocupa cada capa ya decodificada y en espera de mostrarse
+        return {
+            index: frame_memory(future.result())
+            for index, future in self._frames.items()
+            if future.done() and not future.cancelled() and future.exception() is None
+        }
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def shutdown(self):
+        for future in self._frames.values():
+            future.cancel()
+        self._frames.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
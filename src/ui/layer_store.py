@@ -0,0 +1,32 @@
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QImage
+
+# Valores que puede tener un píxel de una capa puramente binaria
+_BINARY_LEVELS = b"\x00\xff"
+
+
+def is_binary(gray):
+    # True si la imagen Grayscale8 solo contiene negro (0) y blanco (255)
+    data = gray.constBits().asstring(gray.sizeInBytes())
+    return not data.translate(None, _BINARY_LEVELS)
+
+
+def compact_frame(image):
+    # Las capas de resina son monocromas o en escala de grises: se guardan como
+    # Mono (1 bit por píxel) si son binarias o como Grayscale8 en otro caso.
+    # La conversión al formato de pantalla la hace Qt al pintar.
+    gray = image
+    if gray.format() != QImage.Format.Format_Grayscale8:
+        gray = image.convertToFormat(QImage.Format.Format_Grayscale8)
+
+    if is_binary(gray):
+        return gray.convertToFormat(
+            QImage.Format.Format_Mono,
+            Qt.ImageConversionFlag.ThresholdDither | Qt.ImageConversionFlag.MonoOnly
+        )
+    return gray
+
+
+def frame_memory(image):
+    # Bytes residentes del buffer de píxeles de un frame
+    return image.sizeInBytes()
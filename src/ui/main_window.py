@@ -1,15 +1,38 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QPushButton, QComboBox, QMessageBox, QLabel, 
                             QGroupBox, QSpinBox, QDoubleSpinBox, QFileDialog,
-                            QFormLayout, QProgressBar)
+                            QFormLayout, QProgressBar, QCheckBox, QLineEdit)
 from PyQt6.QtCore import Qt, QTimer
-from pymata4 import pymata4
 import serial.tools.list_ports
+import math
 import os
-import time
+import zipfile
 from datetime import datetime
 from .projection_window import ProjectionWindow
+from .layer_prefetcher import LayerPrefetcher, load_scaled_frame, load_native_frame
+from .layer_store import frame_memory
+from .layer_cache import LayerCache, cache_key, default_cache_dir
+from .frame_decoder import ProcessFrameDecoder
+from .plate_dialog import PlateDialog
 from .languages import TRANSLATIONS
+from printer.controller import PrinterController
+from printer.sim_board import SIMULATOR_PORT
+from printer.motion import MOVE_LIMIT
+from printer.planner import ProfileSettings, estimate_print_time
+from printer.lift_policy import DEFAULT_RULES, LiftPolicy, parse_rules, estimate_lift_time
+from printer.print_job import PrintJob, PAUSED, STATE_LABELS
+from printer.exposure_log import ExposureLog, exposure_report_path
+from printer.print_journal import PrintJournal, journal_path, read_journal
+from slices.sources import JOB_EXTENSIONS, open_slice_source
+from slices.draft_source import DraftSource
+from slices.preflight import PreflightThread
+from slices.analysis import AnalysisThread, LayerAnalysis, analysis_path
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -20,8 +43,12 @@ class MainWindow(QMainWindow):
         self.translations = TRANSLATIONS[self.current_language]
         
         self.setWindowTitle(self.translations["window_title"])
-        self.board = None
-        self.selected_folder = None
+        self.connected = False
+        self.folder_layers = 0
+        self.slice_source = None
+        self.slice_path = None
+        self.layer_analysis = None
+        self.analysis_thread = None
         self.setMinimumSize(1000, 700)
         
         # Agregar selector de idioma
@@ -76,6 +103,33 @@ class MainWindow(QMainWindow):
         self.steps_per_mm.setValue(80)  # Valor típico para muchos motores
         self.steps_per_mm.setSuffix(" pasos/mm")
         
+        # Velocidad y recorrido máximo del eje Z
+        self.z_speed = QDoubleSpinBox()
+        self.z_speed.setRange(0.1, 50)
+        self.z_speed.setValue(5)
+        self.z_speed.setSuffix(" mm/s")
+        
+        self.z_travel = QDoubleSpinBox()
+        self.z_travel.setRange(10, 500)
+        self.z_travel.setValue(200)
+        self.z_travel.setSuffix(" mm")
+        
+        # Homing en dos fases: aproximación rápida, retroceso y aproximación lenta
+        self.homing_fast_speed = QDoubleSpinBox()
+        self.homing_fast_speed.setRange(0.5, 50)
+        self.homing_fast_speed.setValue(8)
+        self.homing_fast_speed.setSuffix(" mm/s")
+        
+        self.homing_slow_speed = QDoubleSpinBox()
+        self.homing_slow_speed.setRange(0.1, 10)
+        self.homing_slow_speed.setValue(0.5)
+        self.homing_slow_speed.setSuffix(" mm/s")
+        
+        self.homing_backoff = QDoubleSpinBox()
+        self.homing_backoff.setRange(0.5, 20)
+        self.homing_backoff.setValue(2)
+        self.homing_backoff.setSuffix(" mm")
+        
         # Pines Arduino
         self.pin_step = QSpinBox()
         self.pin_step.setRange(2, 13)
@@ -99,6 +153,11 @@ class MainWindow(QMainWindow):
         
         # Agregar campos al layout CNC
         cnc_layout.addRow("Pasos por mm:", self.steps_per_mm)
+        cnc_layout.addRow("Velocidad Z:", self.z_speed)
+        cnc_layout.addRow("Recorrido máximo Z:", self.z_travel)
+        cnc_layout.addRow("Homing rápido:", self.homing_fast_speed)
+        cnc_layout.addRow("Homing lento:", self.homing_slow_speed)
+        cnc_layout.addRow("Retroceso homing:", self.homing_backoff)
         cnc_layout.addRow("Pin STEP:", self.pin_step)
         cnc_layout.addRow("Pin DIR:", self.pin_dir)
         cnc_layout.addRow("Pin HOME:", self.pin_home)
@@ -180,8 +239,14 @@ class MainWindow(QMainWindow):
         self.folder_label = QLabel("No se ha seleccionado carpeta")
         self.folder_button = QPushButton("Seleccionar Carpeta")
         self.folder_button.clicked.connect(self.select_folder)
+        self.archive_button = QPushButton("Seleccionar Archivo")
+        self.archive_button.clicked.connect(self.select_archive)
+        self.plate_button = QPushButton("Componer Bandeja")
+        self.plate_button.clicked.connect(self.compose_plate)
         folder_layout.addWidget(self.folder_label)
         folder_layout.addWidget(self.folder_button)
+        folder_layout.addWidget(self.archive_button)
+        folder_layout.addWidget(self.plate_button)
         
         # Parámetros de impresión
         self.layer_height = QDoubleSpinBox()
@@ -209,6 +274,101 @@ class MainWindow(QMainWindow):
         self.lift_distance.setValue(30)
         self.lift_distance.setSuffix(" mm")
         
+        # Perfiles de movimiento para la elevación (peel) y el retorno
+        self.lift_speed = QDoubleSpinBox()
+        self.lift_speed.setRange(0.1, 50)
+        self.lift_speed.setValue(3)
+        self.lift_speed.setSuffix(" mm/s")
+        
+        self.lift_accel = QDoubleSpinBox()
+        self.lift_accel.setRange(0.1, 500)
+        self.lift_accel.setValue(10)
+        self.lift_accel.setSuffix(" mm/s²")
+        
+        self.return_speed = QDoubleSpinBox()
+        self.return_speed.setRange(0.1, 50)
+        self.return_speed.setValue(6)
+        self.return_speed.setSuffix(" mm/s")
+        
+        self.return_accel = QDoubleSpinBox()
+        self.return_accel.setRange(0.1, 500)
+        self.return_accel.setValue(20)
+        self.return_accel.setSuffix(" mm/s²")
+        
+        # Elevación adaptativa: distancia y velocidad según el área de cada capa
+        self.adaptive_lift = QCheckBox("Elevación adaptativa según el área")
+        self.lift_rules = QLineEdit(DEFAULT_RULES)
+        self.lift_rules.setToolTip(
+            "Reglas 'área máxima %: distancia mm @ velocidad mm/s' separadas por comas.\n"
+            "Se aplica la primera regla cuya área cubra la capa; el resto usa la elevación fija."
+        )
+        
+        # Capas que se decodifican por adelantado durante la exposición
+        self.prefetch_depth = QSpinBox()
+        self.prefetch_depth.setRange(1, 32)
+        self.prefetch_depth.setValue(4)
+        
+        # Procesos que decodifican las capas (0 = hilos del proceso principal)
+        self.decode_processes = QSpinBox()
+        self.decode_processes.setRange(0, 32)
+        self.decode_processes.setValue(0)
+        
+        # Caché en disco de capas ya convertidas para reimpresiones (0 = desactivada)
+        self.cache_budget = QSpinBox()
+        self.cache_budget.setRange(0, 65536)
+        self.cache_budget.setSingleStep(256)
+        self.cache_budget.setValue(2048)
+        self.cache_budget.setSuffix(" MB")
+        
+        # Comprobar todas las capas antes de la primera exposición
+        self.preflight_check = QCheckBox("Verificar capas antes de imprimir")
+        self.preflight_check.setChecked(True)
+        
+        # Modo borrador: cada N capas del trabajo se imprimen como una sola
+        # (unión o cobertura mínima de sus imágenes, N veces más gruesa)
+        self.draft_merge = QSpinBox()
+        self.draft_merge.setRange(1, 10)
+        self.draft_merge.setValue(1)
+        self.draft_merge.setSpecialValueText("Desactivado")
+        
+        self.draft_coverage = QSpinBox()
+        self.draft_coverage.setRange(0, 100)
+        self.draft_coverage.setValue(0)
+        self.draft_coverage.setSuffix(" %")
+        self.draft_coverage.setSpecialValueText("Unión")
+        
+        self.draft_exposure = QDoubleSpinBox()
+        self.draft_exposure.setRange(1, 10)
+        self.draft_exposure.setValue(2)
+        self.draft_exposure.setSuffix(" ×")
+        
+        # Capas vacías seguidas: una sola subida sin exposición ni despegue
+        self.collapse_empty = QCheckBox("Agrupar capas vacías en un solo movimiento")
+        
+        # Espera entre pintar la capa y encender el UV, además de un refresco
+        # de la pantalla de proyección (lo que tarda en mostrarse el frame)
+        self.settle_time = QSpinBox()
+        self.settle_time.setRange(0, 1000)
+        self.settle_time.setValue(0)
+        self.settle_time.setSuffix(" ms")
+        self.settle_time.setToolTip(
+            "Margen para la respuesta del LCD. El estado de impresión muestra la latencia\n"
+            "medida entre la imagen pintada y el UV encendido para ajustarlo."
+        )
+        
+        # Diario en disco de las capas completadas para reanudar tras un corte
+        self.journal_check = QCheckBox("Diario de impresión (permite reanudar)")
+        self.journal_check.setChecked(True)
+        
+        # Proyección píxel a píxel sin escalado (slices con la resolución del LCD)
+        self.native_projection = QCheckBox("Proyección 1:1 (píxel exacto)")
+        
+        # Jerk 0 = rampa trapezoidal, mayor que 0 = curva en S
+        self.z_jerk = QDoubleSpinBox()
+        self.z_jerk.setRange(0, 5000)
+        self.z_jerk.setValue(0)
+        self.z_jerk.setSuffix(" mm/s³")
+        
         # Agregar widgets al layout de parámetros
         self.print_params_layout.addRow("Carpeta de slices:", QWidget())
         self.print_params_layout.addRow(folder_layout)
@@ -217,6 +377,24 @@ class MainWindow(QMainWindow):
         self.print_params_layout.addRow("Tiempo capas primarias:", self.primary_time)
         self.print_params_layout.addRow("Tiempo capas normales:", self.normal_time)
         self.print_params_layout.addRow("Distancia de elevación:", self.lift_distance)
+        self.print_params_layout.addRow("Velocidad de elevación:", self.lift_speed)
+        self.print_params_layout.addRow("Aceleración de elevación:", self.lift_accel)
+        self.print_params_layout.addRow("Velocidad de retorno:", self.return_speed)
+        self.print_params_layout.addRow("Aceleración de retorno:", self.return_accel)
+        self.print_params_layout.addRow(self.adaptive_lift)
+        self.print_params_layout.addRow("Reglas de elevación:", self.lift_rules)
+        self.print_params_layout.addRow("Jerk:", self.z_jerk)
+        self.print_params_layout.addRow("Capas combinadas (borrador):", self.draft_merge)
+        self.print_params_layout.addRow("Cobertura mínima (borrador):", self.draft_coverage)
+        self.print_params_layout.addRow("Exposición (borrador):", self.draft_exposure)
+        self.print_params_layout.addRow("Capas precargadas:", self.prefetch_depth)
+        self.print_params_layout.addRow("Procesos de decodificación:", self.decode_processes)
+        self.print_params_layout.addRow("Caché en disco:", self.cache_budget)
+        self.print_params_layout.addRow("Espera antes de UV:", self.settle_time)
+        self.print_params_layout.addRow(self.native_projection)
+        self.print_params_layout.addRow(self.collapse_empty)
+        self.print_params_layout.addRow(self.preflight_check)
+        self.print_params_layout.addRow(self.journal_check)
         
         # Botón de inicio
         self.start_button = QPushButton("Iniciar Impresión")
@@ -238,36 +416,101 @@ class MainWindow(QMainWindow):
         self.current_layer_label = QLabel("Capa actual: -")
         self.remaining_layers_label = QLabel("Capas restantes: -")
         self.elapsed_time_label = QLabel("Tiempo transcurrido: 00:00:00")
+        self.z_position_label = QLabel("Posición Z: desconocida")
+        self.prefetch_label = QLabel("Precarga: -")
+        self.memory_label = QLabel("Memoria por capa: -")
+        self.cache_label = QLabel("Caché en disco: -")
+        self.analysis_label = QLabel("Análisis de capas: -")
+        self.area_label = QLabel("Área iluminada: -")
+        self.dedup_label = QLabel("Capas repetidas o vacías: -")
+        self.present_label = QLabel("Presentación: -")
+        self.cycle_label = QLabel("Ciclo de capa: -")
+        self.exposure_label = QLabel("Exposición real: -")
+        self.estimated_time_label = QLabel("Tiempo estimado: -")
         self.progress_bar = QProgressBar()
         self.progress_bar.setRange(0, 100)
         
         right_layout.addWidget(self.current_layer_label)
         right_layout.addWidget(self.remaining_layers_label)
         right_layout.addWidget(self.elapsed_time_label)
+        right_layout.addWidget(self.z_position_label)
+        right_layout.addWidget(self.prefetch_label)
+        right_layout.addWidget(self.memory_label)
+        right_layout.addWidget(self.cache_label)
+        right_layout.addWidget(self.analysis_label)
+        right_layout.addWidget(self.area_label)
+        right_layout.addWidget(self.dedup_label)
+        right_layout.addWidget(self.present_label)
+        right_layout.addWidget(self.cycle_label)
+        right_layout.addWidget(self.exposure_label)
+        right_layout.addWidget(self.estimated_time_label)
         right_layout.addWidget(self.progress_bar)
         right_layout.addStretch()
         right_panel.setLayout(right_layout)
         
         # Variables de impresión
         self.projection_window = None
+        self.prefetcher = None
+        self.layer_cache = None
+        self.frame_decoder = None
+        self.preflight = None
+        self.print_lift_policy = None
+        self.print_source = None
+        self.shown_layer = None
+        self.shown_frame = None
+        self.saved_decodes = 0
+        self.saved_repaints = 0
+        self.saved_seconds = 0.0
         self.print_timer = QTimer()
         self.print_timer.timeout.connect(self.update_elapsed_time)
         self.start_time = None
-        self.current_layer = 0
         self.total_layers = 0
-        self.is_printing = False
+        self.print_job = None
+        self.exposure_log = None
+        self.print_journal = None
+        self.resume_state = None
+        self.print_z = 0.0
+        self.print_native = False
+        self.print_frame_size = None
+        self.pause_button = None
         
         # Conectar botón de inicio
         self.start_button.clicked.connect(self.start_print)
         
+        # Recalcular el tiempo estimado al cambiar los parámetros
+        for spin_box in (self.steps_per_mm, self.layer_height, self.primary_layers,
+                         self.primary_time, self.normal_time, self.lift_distance,
+                         self.lift_speed, self.lift_accel, self.return_speed,
+                         self.return_accel, self.z_jerk, self.draft_merge,
+                         self.draft_exposure, self.settle_time):
+            spin_box.valueChanged.connect(self.update_time_estimate)
+        self.adaptive_lift.toggled.connect(self.update_time_estimate)
+        self.lift_rules.textChanged.connect(self.update_time_estimate)
+        # En borrador el análisis es el de las capas combinadas
+        self.draft_merge.valueChanged.connect(self.restart_analysis)
+        self.draft_coverage.valueChanged.connect(self.restart_analysis)
+        
         # Agregar paneles al layout principal
         panels_layout.addWidget(left_panel, 1)
         panels_layout.addWidget(center_panel, 2)
         panels_layout.addWidget(right_panel, 1)
 
-        # Agregar variables de estado para los límites
-        self.home_limit_active = False
-        self.end_limit_active = False
+        # Hilo que controla la placa; los resultados llegan por señales
+        self.controller = PrinterController()
+        self.controller.command_done.connect(self.on_command_done)
+        self.controller.command_failed.connect(self.on_command_failed)
+        self.controller.position_changed.connect(self.update_z_label)
+        self.controller.emergency_stopped.connect(self.on_emergency_stopped)
+        self.controller.exposure_done.connect(self.on_exposure_done)
+        self.controller.start()
+
+    @property
+    def is_printing(self):
+        return self.print_job is not None and self.print_job.active
+    
+    @property
+    def current_layer(self):
+        return self.print_job.layer if self.print_job else 0
 
     def select_folder(self):
         folder = QFileDialog.getExistingDirectory(
@@ -276,213 +519,320 @@ class MainWindow(QMainWindow):
             ""
         )
         if folder:
-            self.selected_folder = folder
-            folder_name = os.path.basename(folder)
-            self.folder_label.setText(f"Carpeta: {folder_name}")
-            
-            # Obtener solo archivos de imagen
-            all_files = os.listdir(folder)
-            image_files = []
-            
-            # Filtrar solo archivos de imagen y extraer números
-            for file in all_files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    try:
-                        # Extraer número del nombre del archivo
-                        num = int(''.join(filter(str.isdigit, file)))
-                        image_files.append((num, file))
-                    except ValueError:
-                        continue
-            
-            # Ordenar por número y verificar secuencia
-            image_files.sort(key=lambda x: x[0])
-            valid_sequence = []
-            
-            # Verificar que la secuencia empiece en 1 y sea continua
-            if image_files and image_files[0][0] == 1:
-                valid_sequence.append(image_files[0][1])
-                expected_num = 2
-                
-                for num, file in image_files[1:]:
-                    if num == expected_num:
-                        valid_sequence.append(file)
-                        expected_num += 1
-                    else:
-                        break
-            
-            if valid_sequence:
-                self.start_button.setEnabled(True)
-                self.status_label.setText(f"Estado: {len(valid_sequence)} slices en secuencia")
-            else:
-                self.start_button.setEnabled(False)
-                self.status_label.setText("Error: No se encontró secuencia válida de imágenes")
+            self.load_source(folder)
+    
+    def compose_plate(self):
+        # Varios trabajos en una bandeja: se guarda como .plate y se abre
+        # como cualquier otro trabajo
+        dialog = PlateDialog(self, self.layer_height.value())
+        if dialog.exec() and dialog.plate_path:
+            self.load_source(dialog.plate_path)
+    
+    def select_archive(self):
+        patterns = " ".join(f"*{extension}" for extension in JOB_EXTENSIONS)
+        path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Seleccionar Archivo de Slices",
+            "",
+            f"Trabajos ({patterns})"
+        )
+        if path:
+            self.load_source(path)
+    
+    def load_source(self, path):
+        self.stop_analysis()
+        if self.slice_source is not None:
+            self.slice_source.close()
+        self.folder_label.setText(f"Carpeta: {os.path.basename(path)}")
+        
+        # Carpeta o archivo comprimido; el índice de capas se reutiliza al
+        # iniciar la impresión
+        try:
+            self.slice_source = open_slice_source(path)
+            self.slice_path = path
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            self.slice_source = None
+            self.folder_layers = 0
+            self.start_button.setEnabled(False)
+            self.status_label.setText(f"Error: No se pudo abrir el trabajo ({e})")
+            return
+        
+        self.folder_layers = len(self.slice_source)
+        if self.slice_source.settings:
+            self.offer_file_settings(self.slice_source.settings)
+        self.update_time_estimate()
+        
+        if self.folder_layers:
+            self.start_button.setEnabled(True)
+            self.status_label.setText(f"Estado: {self.folder_layers} slices en secuencia")
+            self.start_analysis()
+        else:
+            self.start_button.setEnabled(False)
+            self.status_label.setText("Error: No se encontró secuencia válida de imágenes")
+    
+    def start_analysis(self):
+        # Área, caja y centroide de cada capa; se reutiliza el análisis
+        # guardado junto al trabajo si corresponde a este mismo contenido.
+        # En modo borrador se analizan las capas combinadas (área de la unión).
+        merge = self.draft_merge.value()
+        coverage = self.draft_coverage.value() / 100
+        source = self.slice_source
+        if merge > 1:
+            source = DraftSource(source, merge, coverage)
+        fingerprint = source.fingerprint()
+        total = len(source)
+        analysis = LayerAnalysis.load(analysis_path(self.slice_path, merge, coverage), fingerprint,
+                                      total)
+        if analysis:
+            self.layer_analysis = analysis
+            self.analysis_label.setText(f"Análisis de capas: {len(analysis)} capas (guardado)")
+            self.update_time_estimate()
+            return
+        
+        self.layer_analysis = LayerAnalysis(fingerprint, total)
+        self.analysis_thread = AnalysisThread(self.slice_path, self.layer_analysis, merge, coverage)
+        self.analysis_thread.progress.connect(
+            lambda done, total: self.analysis_label.setText(f"Análisis de capas: {done}/{total}")
+        )
+        self.analysis_thread.completed.connect(self.on_analysis_completed)
+        self.analysis_thread.failed.connect(
+            lambda message: self.analysis_label.setText(f"Análisis de capas: error ({message})")
+        )
+        self.analysis_thread.start()
+    
+    def on_analysis_completed(self, analysis):
+        self.analysis_label.setText(f"Análisis de capas: {len(analysis)} capas")
+        self.update_time_estimate()
+    
+    def restart_analysis(self):
+        # Cambió el modo borrador: el análisis anterior ya no corresponde
+        if self.slice_source is None or not self.folder_layers or self.is_printing:
+            return
+        self.stop_analysis()
+        self.start_analysis()
+    
+    def stop_analysis(self):
+        if self.analysis_thread:
+            self.analysis_thread.cancel()
+            self.analysis_thread.wait()
+            self.analysis_thread = None
+        self.layer_analysis = None
 
+    def offer_file_settings(self, settings):
+        # Parámetros guardados por el laminador en la cabecera del archivo
+        controls = {
+            "layer_height": (self.layer_height, "Altura de capa", "mm"),
+            "primary_layers": (self.primary_layers, "Capas primarias", ""),
+            "primary_time": (self.primary_time, "Tiempo capas primarias", "s"),
+            "normal_time": (self.normal_time, "Tiempo capas normales", "s"),
+            "lift_distance": (self.lift_distance, "Distancia de elevación", "mm"),
+            "lift_speed": (self.lift_speed, "Velocidad de elevación", "mm/s"),
+            "return_speed": (self.return_speed, "Velocidad de retorno", "mm/s"),
+        }
+        lines = [f"{label}: {settings[key]:g} {unit}".rstrip()
+                 for key, (control, label, unit) in controls.items() if key in settings]
+        answer = QMessageBox.question(
+            self,
+            "Parámetros del archivo",
+            "El archivo incluye estos parámetros de impresión:\n\n" + "\n".join(lines) +
+            "\n\n¿Desea usarlos?"
+        )
+        if answer != QMessageBox.StandardButton.Yes:
+            return
+        
+        for key, (control, label, unit) in controls.items():
+            if key in settings:
+                # Los QSpinBox ajustan solos los valores fuera de rango
+                value = settings[key]
+                control.setValue(int(value) if isinstance(control, QSpinBox) else value)
+        self.update_time_estimate()
+    
     def refresh_ports(self):
         self.port_selector.clear()
         ports = [port.device for port in serial.tools.list_ports.comports()]
         self.port_selector.addItems(ports)
+        # Placa simulada para pruebas sin hardware
+        self.port_selector.addItem(SIMULATOR_PORT)
 
     def connect_arduino(self):
-        try:
-            port = self.port_selector.currentText()
-            self.status_label.setText("Estado: Conectando...")
-            self.board = pymata4.Pymata4(arduino_instance_id=1, com_port=port)
-            
-            # Guardar los valores de configuración CNC
-            self.saved_steps_per_mm = self.steps_per_mm.value()
-            self.saved_pin_step = self.pin_step.value()
-            self.saved_pin_dir = self.pin_dir.value()
-            self.saved_pin_home = self.pin_home.value()
-            self.saved_pin_end = self.pin_end.value()
-            self.saved_pin_uv = self.pin_uv.value()
-            
-            # Configurar pines
-            self.board.set_pin_mode_digital_output(self.saved_pin_step)
-            self.board.set_pin_mode_digital_output(self.saved_pin_dir)
-            # Configurar pines de sensores con pull-up
-            self.board.set_pin_mode_digital_input_pullup(self.saved_pin_home)
-            self.board.set_pin_mode_digital_input_pullup(self.saved_pin_end)
-            self.board.set_pin_mode_digital_output(self.saved_pin_uv)
-            
-            # Deshabilitar ajustes CNC
-            self.steps_per_mm.setEnabled(False)
-            self.pin_step.setEnabled(False)
-            self.pin_dir.setEnabled(False)
-            self.pin_home.setEnabled(False)
-            self.pin_end.setEnabled(False)
-            self.pin_uv.setEnabled(False)
-            
-            self.status_label.setText("Estado: Conectado")
-            self.connect_button.setEnabled(False)
-            
-        except Exception as e:
+        port = self.port_selector.currentText()
+        self.status_label.setText("Estado: Conectando...")
+        self.connect_button.setEnabled(False)
+        
+        # Guardar los valores de configuración CNC
+        self.saved_steps_per_mm = self.steps_per_mm.value()
+        self.saved_pin_step = self.pin_step.value()
+        self.saved_pin_dir = self.pin_dir.value()
+        self.saved_pin_home = self.pin_home.value()
+        self.saved_pin_end = self.pin_end.value()
+        self.saved_pin_uv = self.pin_uv.value()
+        
+        pins = {
+            "step": self.saved_pin_step,
+            "dir": self.saved_pin_dir,
+            "home": self.saved_pin_home,
+            "end": self.saved_pin_end,
+            "uv": self.saved_pin_uv
+        }
+        self.controller.submit("connect", port, pins, self.saved_steps_per_mm,
+                               self.z_travel.value())
+
+    def on_connected(self):
+        self.connected = True
+        
+        # Deshabilitar ajustes CNC
+        self.steps_per_mm.setEnabled(False)
+        self.pin_step.setEnabled(False)
+        self.pin_dir.setEnabled(False)
+        self.pin_home.setEnabled(False)
+        self.pin_end.setEnabled(False)
+        self.pin_uv.setEnabled(False)
+        self.z_travel.setEnabled(False)
+        
+        self.status_label.setText("Estado: Conectado")
+
+    def on_command_done(self, name, result):
+        if name == "connect":
+            self.on_connected()
+        elif name == "move":
+            self.report_move(result)
+        elif name == "home":
+            print("Home encontrado" if result else "Posición Z conocida, se omite el homing")
+            if self.is_printing:
+                # Homing terminado: con diario, antes se mide la posición del
+                # sensor END (referencia para reanudar); después, la primera capa
+                if self.journal_check.isChecked():
+                    self.controller.submit("reference", self.return_profile())
+                else:
+                    self.print_job.homed()
+        elif name == "reference" and self.is_printing:
+            self.open_journal(result)
+            self.print_job.homed()
+        elif name == "reapproach" and self.is_printing:
+            print(f"Plataforma en Z = {self.print_z:.3f} mm para la capa {self.current_layer + 1}")
+            self.open_journal(None)
+            self.print_job.homed()
+        elif name == "go_end":
+            print("Ya está en final" if result.steps == 0 else
+                  f"Final encontrado (sobrepaso: {result.overshoot} pasos)")
+        elif name == "layer" and self.is_printing:
+            self.update_cycle_label(result)
+            self.record_exposure(result)
+            self.journal_layers()
+            self.print_job.layer_done()
+        elif name == "advance" and self.is_printing:
+            self.journal_layers()
+            self.print_job.layer_done()
+
+    def on_command_failed(self, name, message):
+        if name == "connect":
             self.status_label.setText("Estado: Error de conexión")
-            QMessageBox.critical(self, "Error", f"Error al conectar: {str(e)}")
-            print(f"Error al conectar: {e}")
+            self.connect_button.setEnabled(True)
+            QMessageBox.critical(self, "Error", f"Error al conectar: {message}")
+            print(f"Error al conectar: {message}")
+            return
+        
+        if name == "reference" and self.is_printing:
+            # Sin sensor END el diario sigue sirviendo mientras no se pierda la posición Z
+            print(f"Diario sin referencia del sensor END: {message}")
+            self.open_journal(None)
+            self.print_job.homed()
+        elif self.is_printing:
+            self.print_job.abort(f"Error en capa {self.current_layer + 1}: {message}")
+        elif name == "home":
+            QMessageBox.warning(self, "Error", f"Error al buscar home: {message}")
+        elif name == "go_end":
+            QMessageBox.warning(self, "Error", f"Error al buscar final: {message}")
+        elif name == "move":
+            QMessageBox.warning(self, "Error", f"Error al mover eje Z: {message}")
+        elif name == "set_uv":
+            QMessageBox.warning(self, "Error", f"Error al controlar UV: {message}")
+
+    def on_exposure_done(self, host_off):
+        # La placa (o el PC) apagó el UV: la impresión pasa a despegar
+        if self.print_job:
+            self.print_job.exposed()
+
+    def on_emergency_stopped(self, uv_off_ms, stop_ms):
+        print(f"UV apagado en {uv_off_ms:.1f} ms, movimiento detenido en {stop_ms:.1f} ms")
+        
+        # Una parada de emergencia también termina la impresión en curso
+        if self.is_printing:
+            self.print_job.abort()
+            QMessageBox.information(self, "Impresión Cancelada", 
+                                  "El proceso de impresión ha sido detenido")
 
     def closeEvent(self, event):
-        if self.board:
-            try:
-                self.board.shutdown()
-            except:
-                pass
+        self.stop_analysis()
+        self.controller.shutdown()
         super().closeEvent(event)
 
+    def z_rate(self):
+        # Velocidad de pasos en pasos/s
+        return self.z_speed.value() * self.saved_steps_per_mm
+
     def move_z(self, direction):
-        if not self.board:
+        if not self.connected:
             return
             
-        try:
-            distance_mm = self.distance_control.value()
-            steps = int(distance_mm * self.saved_steps_per_mm)
-            
-            # Verificar sensor según dirección
-            if direction == "up":
-                # Si el sensor END está presionado, no permite subir
-                if self.board.digital_read(self.saved_pin_end)[0] == 0:
-                    print("No se puede subir más")
-                    return
-                self.board.digital_write(self.saved_pin_dir, 1)
+        distance_mm = self.distance_control.value()
+        steps = int(distance_mm * self.saved_steps_per_mm)
+        if direction == "down":
+            steps = -steps
+        
+        # La placa se detiene sola en el sensor END (subir) o HOME (bajar)
+        self.last_move_direction = direction
+        self.controller.submit("move", steps, self.z_rate())
+
+    def report_move(self, result):
+        if result.reason == MOVE_LIMIT:
+            direction = self.last_move_direction
+            if result.steps == 0:
+                print("No se puede subir más" if direction == "up" else "No se puede bajar más")
             else:
-                # Si el sensor HOME está presionado, no permite bajar
-                if self.board.digital_read(self.saved_pin_home)[0] == 0:
-                    print("No se puede bajar más")
-                    return
-                self.board.digital_write(self.saved_pin_dir, 0)
-                    
-            # Generar pulsos para los pasos
-            for step in range(steps):
-                # Verificar sensor durante el movimiento
-                if step % 10 == 0:
-                    if direction == "up" and self.board.digital_read(self.saved_pin_end)[0] == 0:
-                        print("Límite superior alcanzado")
-                        break
-                    if direction == "down" and self.board.digital_read(self.saved_pin_home)[0] == 0:
-                        print("Límite inferior alcanzado")
-                        break
-                    
-                self.board.digital_write(self.saved_pin_step, 1)
-                time.sleep(0.0001)
-                self.board.digital_write(self.saved_pin_step, 0)
-                time.sleep(0.0001)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Error al mover eje Z: {str(e)}")
+                print("Límite superior alcanzado" if direction == "up" else "Límite inferior alcanzado")
+                print(f"Sobrepaso del sensor: {result.overshoot} pasos")
+
+    def home_z(self, force):
+        fast = ProfileSettings(self.homing_fast_speed.value(), self.return_accel.value(),
+                               self.z_jerk.value())
+        self.controller.submit("home", fast, self.homing_slow_speed.value(),
+                               self.homing_backoff.value(), force)
 
     def go_home(self):
-        if not self.board:
+        if not self.connected:
             return
-        try:
-            # Si ya está presionado el sensor HOME, no hace nada
-            if self.board.digital_read(self.saved_pin_home)[0] == 0:
-                print("Ya está en home")
-                return
-                
-            self.board.digital_write(self.saved_pin_dir, 0)
-            
-            while True:
-                if self.board.digital_read(self.saved_pin_home)[0] == 0:
-                    print("Home encontrado")
-                    break
-                
-                self.board.digital_write(self.saved_pin_step, 1)
-                time.sleep(0.0001)
-                self.board.digital_write(self.saved_pin_step, 0)
-                time.sleep(0.0001)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Error al buscar home: {str(e)}")
+        self.home_z(force=True)
 
     def go_end(self):
-        if not self.board:
+        if not self.connected:
             return
-        try:
-            # Si ya está presionado el sensor END, no hace nada
-            if self.board.digital_read(self.saved_pin_end)[0] == 0:
-                print("Ya está en final")
-                return
-                
-            self.board.digital_write(self.saved_pin_dir, 1)
-            
-            while True:
-                if self.board.digital_read(self.saved_pin_end)[0] == 0:
-                    print("Final encontrado")
-                    break
-                
-                self.board.digital_write(self.saved_pin_step, 1)
-                time.sleep(0.0001)
-                self.board.digital_write(self.saved_pin_step, 0)
-                time.sleep(0.0001)
-                
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Error al buscar final: {str(e)}")
+        # Movimiento absoluto si la posición del sensor END es conocida
+        self.controller.submit("go_end", self.return_profile())
+
+    def update_z_label(self, position=None):
+        if position is None:
+            self.z_position_label.setText("Posición Z: desconocida")
+        else:
+            self.z_position_label.setText(f"Posición Z: {position:.2f} mm")
 
     def emergency_stop(self):
-        if not self.board:
+        if not self.connected:
             return
-        try:
-            # Detener todos los movimientos
-            # Apagar UV
-            self.uv_state = False
-            self.btn_uv.setStyleSheet("")
-            self.board.digital_write(self.saved_pin_uv, 0)
-            print("Movimiento detenido")
-            
-        except Exception as e:
-            print(f"Error al detener: {str(e)}")
+        # Detener todos los movimientos y apagar UV sin esperar a la cola de comandos
+        self.controller.emergency_stop()
+        self.uv_state = False
+        self.btn_uv.setStyleSheet("")
 
     def toggle_uv(self):
-        if not self.board:
+        if not self.connected:
             return
-        try:
-            self.uv_state = not self.uv_state
-            self.board.digital_write(self.saved_pin_uv, 1 if self.uv_state else 0)
-            # Cambiar estilo del botón según estado
-            self.btn_uv.setStyleSheet(
-                "background-color: #44ff44;" if self.uv_state else ""
-            )
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Error al controlar UV: {str(e)}")
+        self.uv_state = not self.uv_state
+        self.controller.submit("set_uv", self.uv_state)
+        # Cambiar estilo del botón según estado
+        self.btn_uv.setStyleSheet(
+            "background-color: #44ff44;" if self.uv_state else ""
+        )
 
     def start_print(self):
         if not self.validate_print_settings():
@@ -498,140 +848,572 @@ class MainWindow(QMainWindow):
             self.cancel_button.clicked.connect(self.cancel_print)
             self.print_params_layout.addRow(self.cancel_button)
             
-            # Resto del código de inicio de impresión...
-            self.is_printing = True
-            self.current_layer = 0
-            self.start_time = datetime.now()
-            
-            # Obtener lista de imágenes en secuencia
-            all_files = os.listdir(self.selected_folder)
-            image_files = []
-            
-            for file in all_files:
-                if file.lower().endswith(('.png', '.jpg', '.jpeg')):
-                    try:
-                        num = int(''.join(filter(str.isdigit, file)))
-                        image_files.append((num, file))
-                    except ValueError:
-                        continue
+            # Pausa al terminar la capa en curso
+            self.pause_button = QPushButton(self.translations["pause_print"])
+            self.pause_button.clicked.connect(self.toggle_pause)
+            self.print_params_layout.addRow(self.pause_button)
             
-            # Ordenar y verificar secuencia
-            image_files.sort(key=lambda x: x[0])
-            self.image_files = []
+            # Índice de slices: solo se vuelve a leer si el trabajo ha cambiado
+            slice_source = self.slice_source
+            slice_source.refresh()
+            job_layers = len(slice_source)
             
-            if image_files and image_files[0][0] == 1:
-                self.image_files.append(image_files[0][1])
-                expected_num = 2
-                
-                for num, file in image_files[1:]:
-                    if num == expected_num:
-                        self.image_files.append(file)
-                        expected_num += 1
-                    else:
-                        break
-            
-            self.total_layers = len(self.image_files)
+            # Modo borrador: las capas combinadas se generan al precargarlas
+            merge = self.draft_merge.value()
+            if merge > 1:
+                slice_source = DraftSource(slice_source, merge, self.draft_coverage.value() / 100)
+            self.print_source = slice_source
+            self.total_layers = len(slice_source)
             
             if self.total_layers == 0:
                 raise Exception("No se encontró secuencia válida de imágenes")
             
+            # Impresión interrumpida del mismo trabajo: ofrecer continuarla
+            self.resume_state = self.offer_resume() if self.journal_check.isChecked() else None
+            
             # Crear ventana de proyección
-            self.projection_window = ProjectionWindow()
+            native = self.native_projection.isChecked()
+            self.projection_window = ProjectionWindow(native)
             self.projection_window.show()
             
-            # Ir a home
-            self.go_home()
-            
-            # Iniciar timer
-            self.print_timer.start(1000)  # Actualizar cada segundo
+            if native:
+                # Validar la resolución de la primera capa (solo se lee la cabecera)
+                frame_size = self.projection_window.native_size()
+                slice_size = slice_source.image_size(0)
+                error = self.projection_window.check_resolution(slice_size)
+                if error:
+                    raise Exception(error)
+            else:
+                frame_size = self.projection_window.size()
+            self.print_native = native
+            self.print_frame_size = frame_size
             
-            # Iniciar proceso de impresión
-            self.process_next_layer()
+            # Estados y tiempos de la impresión; la ventana hace el trabajo
+            # de cada paso con los métodos job_*
+            settle = self.projection_window.refresh_interval() + self.settle_time.value() / 1000
+            first_layer = self.resume_state.next_layer if self.resume_state else 0
+            self.print_job = PrintJob(self, self.total_layers, self.preflight_check.isChecked(),
+                                      settle, first_layer)
+            self.print_job.start()
             
         except Exception as e:
-            self.enable_controls()
+            self.abort_print()
             QMessageBox.critical(self, "Error", f"Error al iniciar impresión: {str(e)}")
+    
+    def offer_resume(self):
+        # Estado del diario si el usuario acepta reanudar (None si no hay nada que reanudar)
+        state = read_journal(journal_path(self.slice_path))
+        if state is None or not state.resumable(self.print_source.fingerprint(), self.total_layers,
+                                                self.layer_height.value()):
+            return None
+        started = datetime.fromtimestamp(state.header["time"]).strftime("%d/%m/%Y %H:%M")
+        answer = QMessageBox.question(
+            self, "Reanudar impresión",
+            f"La impresión de este trabajo iniciada el {started} se interrumpió tras la capa "
+            f"{state.next_layer} de {self.total_layers} (Z = {state.z:.3f} mm).\n\n"
+            f"¿Desea reanudarla desde la capa {state.next_layer + 1}? Si la posición Z es "
+            f"desconocida la plataforma subirá hasta el sensor END y bajará despacio hasta la capa."
+        )
+        return state if answer == QMessageBox.StandardButton.Yes else None
+    
+    def abort_print(self):
+        # Termina la impresión en curso (o la que no llegó a empezar)
+        if self.is_printing:
+            self.print_job.abort()
+        else:
             self.stop_print()
+            self.enable_controls()
+    
+    def job_preflight(self):
+        # Verificación previa de todas las capas en paralelo; la impresión
+        # empieza cuando termina sin errores
+        # (en borrador, las capas combinadas que se van a proyectar)
+        self.preflight = PreflightThread(
+            self.slice_path, self.total_layers,
+            self.print_frame_size if self.print_native else None,
+            merge=self.draft_merge.value(), coverage=self.draft_coverage.value() / 100
+        )
+        self.preflight.progress.connect(self.on_preflight_progress)
+        self.preflight.completed.connect(self.on_preflight_completed)
+        self.preflight.failed.connect(self.on_preflight_failed)
+        self.preflight.start()
     
-    def process_next_layer(self):
-        if not self.is_printing or self.current_layer >= self.total_layers:
-            self.finish_print()
+    def on_preflight_progress(self, checked, total):
+        self.status_label.setText(f"Estado: Verificando capas {checked}/{total}")
+        self.progress_bar.setValue(int(checked / total * 100))
+    
+    def on_preflight_completed(self, report):
+        self.preflight = None
+        self.progress_bar.setValue(0)
+        if not self.is_printing:
             return
-            
+        
+        print(f"Verificación: {report.checked} capas en {report.seconds:.1f} s, "
+              f"{len(report.errors)} errores, {len(report.warnings)} avisos")
+        self.status_label.setText(f"Estado: {report.checked} capas verificadas en {report.seconds:.1f} s")
+        if report.errors:
+            QMessageBox.critical(self, "Verificación de capas",
+                                 "El trabajo tiene capas no válidas:\n\n" + report.summary())
+            self.abort_print()
+            return
+        if report.warnings:
+            answer = QMessageBox.question(
+                self, "Verificación de capas",
+                report.summary() + "\n\n¿Desea imprimir de todos modos?"
+            )
+            if answer != QMessageBox.StandardButton.Yes:
+                self.abort_print()
+                return
+        
         try:
-            # Mostrar imagen actual
-            image_path = os.path.join(self.selected_folder, self.image_files[self.current_layer])
-            self.projection_window.show_image(image_path)
-            
-            # Actualizar estado
-            self.current_layer_label.setText(f"Capa actual: {self.current_layer + 1}")
-            self.remaining_layers_label.setText(f"Capas restantes: {self.total_layers - self.current_layer - 1}")
-            self.progress_bar.setValue(int((self.current_layer + 1) * 100 / self.total_layers))
-            
-            # Encender UV
-            self.board.digital_write(self.saved_pin_uv, 1)
-            
-            # Determinar tiempo de exposición
-            if self.current_layer < self.primary_layers.value():
-                exposure_time = int(self.primary_time.value() * 1000)  # convertir a ms entero
-            else:
-                exposure_time = int(self.normal_time.value() * 1000)  # convertir a ms entero
-            
-            # Programar siguiente paso
-            QTimer.singleShot(exposure_time, self.after_exposure)
-            
+            self.print_job.preflight_done()
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error en capa {self.current_layer + 1}: {str(e)}")
-            self.stop_print()
+            self.abort_print()
+            QMessageBox.critical(self, "Error", f"Error al iniciar impresión: {str(e)}")
     
-    def after_exposure(self):
-        # Apagar UV
-        self.board.digital_write(self.saved_pin_uv, 0)
-        
-        # Subir plataforma
-        self.move_z_distance(self.lift_distance.value())
-        
-        # Bajar plataforma menos el ancho de capa
-        down_distance = self.lift_distance.value() - self.layer_height.value()
-        self.move_z_distance(-down_distance)
-        
-        # Siguiente capa
-        self.current_layer += 1
-        self.process_next_layer()
+    def on_preflight_failed(self, message):
+        self.preflight = None
+        if not self.is_printing:
+            return
+        self.abort_print()
+        QMessageBox.critical(self, "Error", f"Error al verificar las capas: {message}")
     
-    def move_z_distance(self, distance):
-        steps = int(abs(distance) * self.saved_steps_per_mm)
-        direction = 1 if distance > 0 else 0
+    def job_home(self):
+        # Arranque de la impresión una vez verificadas las capas
+        slice_source = self.print_source
+        native = self.print_native
+        frame_size = self.print_frame_size
+        loader = load_native_frame if native else load_scaled_frame
+        self.start_time = datetime.now()
+        
+        decode = lambda index: loader(slice_source, index, frame_size)
+        processes = self.decode_processes.value()
+        if processes:
+            # Decodificación en procesos: cada capa llega por memoria compartida
+            # (una ranura por capa precargada, más la mostrada y un margen)
+            self.frame_decoder = ProcessFrameDecoder(
+                self.slice_path, frame_size, native, processes,
+                slots=self.prefetch_depth.value() + 2,
+                merge=self.draft_merge.value(), coverage=self.draft_coverage.value() / 100
+            )
+            decode = self.frame_decoder.load
         
-        self.board.digital_write(self.saved_pin_dir, direction)
+        load = decode
+        budget = self.cache_budget.value() * 1024 * 1024
+        if budget:
+            # Capas ya convertidas en impresiones anteriores del mismo trabajo
+            try:
+                cache = LayerCache(
+                    default_cache_dir(),
+                    cache_key(slice_source.fingerprint(), frame_size, native),
+                    budget
+                )
+                self.layer_cache = cache
+                load = lambda index: cache.load(index, decode)
+                print(f"Caché en disco: {len(cache)} capas disponibles")
+            except OSError as e:
+                print(f"Caché en disco desactivada: {e}")
+        
+        # Capas repetidas o vacías que no se van a mostrar
+        self.shown_layer = None
+        self.shown_frame = None
+        self.saved_decodes = 0
+        self.saved_repaints = 0
+        self.saved_seconds = 0.0
+        self.dedup_label.setText("Capas repetidas o vacías: -")
+        
+        # Exposición real de cada capa frente a la pedida
+        self.exposure_log = ExposureLog()
+        self.exposure_label.setText("Exposición real: -")
+        
+        # Empezar a decodificar las primeras capas mientras se hace el homing
+        self.prefetcher = LayerPrefetcher(
+            load, self.total_layers, self.prefetch_depth.value(), workers=max(2, processes),
+            skip=self.skip_decode
+        )
+        self.prefetcher.prefetch(self.current_layer)
+        
+        # Iniciar timer
+        self.print_timer.start(1000)  # Actualizar cada segundo
+        
+        if self.resume_state:
+            # Reanudación: sin homing, que aplastaría la pieza contra la cubeta
+            self.print_z = self.resume_state.z
+            fast = ProfileSettings(self.homing_fast_speed.value(), self.return_accel.value(),
+                                   self.z_jerk.value())
+            slow = ProfileSettings(self.homing_slow_speed.value(), self.return_accel.value(),
+                                   self.z_jerk.value())
+            self.controller.submit("reapproach", self.print_z, self.lift_distance.value(),
+                                   self.resume_state.header.get("end_mm"), fast, slow)
+            return
         
-        for _ in range(steps):
-            self.board.digital_write(self.saved_pin_step, 1)
-            time.sleep(0.0001)
-            self.board.digital_write(self.saved_pin_step, 0)
-            time.sleep(0.0001)
+        # Ir a home (se omite si la posición Z sigue siendo válida);
+        # la primera capa empieza cuando el controlador confirma el homing
+        self.print_z = 0.0
+        self.home_z(force=False)
+    
+    def open_journal(self, end_mm):
+        path = journal_path(self.slice_path)
+        try:
+            if self.resume_state:
+                self.print_journal = PrintJournal(path, resume_layer=self.current_layer)
+            else:
+                self.print_journal = PrintJournal(path, {
+                    "job": self.print_source.name,
+                    "fingerprint": self.print_source.fingerprint(),
+                    "total_layers": self.total_layers,
+                    "layer_height": self.layer_height.value(),
+                    "draft_merge": self.draft_merge.value(),
+                    "steps_per_mm": self.steps_per_mm.value(),
+                    "end_mm": end_mm,
+                })
+        except OSError as e:
+            print(f"Diario de impresión desactivado: {e}")
+            self.print_journal = None
+    
+    def journal_layers(self):
+        # Capa (o capas vacías agrupadas) completada y altura para la siguiente
+        index = self.current_layer
+        run = self.print_job.cycle_layers
+        if self.print_job.cycle_skipped:
+            # También una sola capa vacía: solo se subió, sin exponer ni despegar
+            self.print_z += run * self.layer_height.value()
+            params = {"exposure": 0, "lift": 0}
+        else:
+            self.print_z += self.layer_step(index)
+            lift_distance, peel = self.layer_lift(index)
+            params = {"exposure": self.exposure_time(index), "lift": lift_distance,
+                      "lift_speed": peel.max_speed}
+        if not self.print_journal:
+            return
+        try:
+            self.print_journal.layer(index, index + run, self.print_z, **params)
+        except OSError as e:
+            print(f"Diario de impresión desactivado: {e}")
+            self.print_journal = None
+    
+    def close_journal(self, status):
+        journal = self.print_journal
+        if not journal:
+            return
+        self.print_journal = None
+        try:
+            journal.close(status)
+        except OSError as e:
+            print(f"No se pudo cerrar el diario de impresión: {e}")
+        overhead = journal.overhead()
+        if overhead:
+            print(f"Diario de impresión: {journal.records} capas, escritura media "
+                  f"{overhead[0]:.3f} ms (máx {overhead[1]:.3f} ms), {journal.syncs} fsync")
+    
+    def update_area_label(self, index):
+        analysis = self.layer_analysis
+        fraction = analysis.fraction(index) if analysis else None
+        if fraction is None:
+            self.area_label.setText("Área iluminada: -")
+            return
+        changed = analysis.changed(index) / (analysis.width * analysis.height)
+        self.area_label.setText(
+            f"Área iluminada: {fraction:.1%} de la pantalla (cambio {changed:.1%})"
+        )
+    
+    def update_cycle_label(self, cycle):
+        # Duración de cada fase según el reloj que la midió (placa o PC)
+        exposure, lift, back = (f"{ms} ms" if ms is not None else "-" for ms in cycle.phases())
+        self.cycle_label.setText(
+            f"Ciclo de capa ({cycle.clock}): exposición {exposure}, "
+            f"elevación {lift}, retorno {back}"
+        )
+    
+    def record_exposure(self, cycle):
+        record = self.exposure_log.add(self.current_layer, cycle, self.print_job.presented_at)
+        if record is None:
+            return
+        p50, p95, worst = self.exposure_log.stats()
+        text = (f"Exposición real: {record.actual:.3f} s ({record.error_ms:+.1f} ms), "
+                f"error p50 {p50:.1f} ms, p95 {p95:.1f} ms, máx {worst:.1f} ms")
+        if record.latency_ms is not None:
+            text += f"; imagen a UV {record.latency_ms:.1f} ms"
+        self.exposure_label.setText(text)
+    
+    def update_memory_label(self, frame):
+        # Memoria residente de las capas en caché (la mostrada y las precargadas)
+        sizes = list(self.prefetcher.resident_memory().values())
+        sizes.append(frame_memory(frame))
+        total = sum(sizes)
+        self.memory_label.setText(
+            f"Memoria por capa: {total / len(sizes) / 1024:.0f} KB "
+            f"({len(sizes)} capas, {total / 1024 / 1024:.1f} MB)"
+        )
+    
+    def job_state_changed(self, state):
+        label = STATE_LABELS[state]
+        if self.print_job.pause_requested and state != PAUSED:
+            label += " (pausa al terminar la capa)"
+        self.status_label.setText(f"Estado: {label}")
+        if self.pause_button:
+            paused = state == PAUSED or self.print_job.pause_requested
+            self.pause_button.setText(self.translations["resume_print" if paused else "pause_print"])
+    
+    def job_schedule(self, delay, callback):
+        QTimer.singleShot(int(delay * 1000), callback)
+    
+    def job_skip(self, index):
+        if self.collapse_empty.isChecked():
+            return self.advance_empty_layers(index)
+        return 0
     
-    def finish_print(self):
-        # Ir a posición final
+    def job_present(self, index):
+        # Devuelve cuándo terminó de pintarse la capa (None si ya estaba en pantalla)
+        presented = None
+        if self.reuses_shown_frame(index):
+            # Misma imagen que la capa anterior: ya está en pantalla
+            self.saved_decodes += 1
+            self.saved_repaints += 1
+            stats = self.projection_window.present_stats()
+            if stats:
+                self.saved_seconds += stats[1] / 1000
+            self.update_dedup_label()
+        else:
+            # Mostrar imagen actual (ya decodificada en segundo plano)
+            frame = self.prefetcher.get(index)
+            if self.frame_decoder:
+                # Su ranura de memoria compartida no se reutiliza mientras se vea
+                self.frame_decoder.pin(index)
+            presented = self.projection_window.show_frame(frame)
+            self.shown_frame = frame
+        self.shown_layer = index
+        
+        # Decodificar las siguientes capas durante la exposición y la elevación
+        self.prefetcher.prefetch(index + 1)
+        return presented
+    
+    def job_expose(self, index):
+        # Exposición, elevación y retorno en el hilo del controlador
+        exposure_time = self.exposure_time(index)
+        lift_distance, peel = self.layer_lift(index)
+        self.controller.submit("layer", exposure_time, lift_distance,
+                               self.layer_step(index), peel, self.return_profile())
+        
+        # Actualizar estado
+        self.current_layer_label.setText(f"Capa actual: {index + 1}")
+        self.remaining_layers_label.setText(f"Capas restantes: {self.total_layers - index - 1}")
+        self.progress_bar.setValue(int((index + 1) * 100 / self.total_layers))
+        self.update_area_label(index)
+    
+    def job_prepare(self, index):
+        # UV apagado y plataforma subiendo: estadísticas y precarga de la
+        # capa siguiente fuera del camino entre mostrar la imagen y encender UV
+        if index < self.total_layers:
+            self.prefetcher.prefetch(index)
+        self.prefetch_label.setText(
+            f"Precarga: {self.prefetcher.ready}/{self.prefetcher.depth} listas, "
+            f"aciertos {self.prefetcher.hit_rate:.0%}"
+        )
+        if self.shown_frame is not None:
+            self.update_memory_label(self.shown_frame)
+        if self.layer_cache:
+            self.cache_label.setText(
+                f"Caché en disco: {self.layer_cache.hits} aciertos, "
+                f"{self.layer_cache.misses} fallos"
+            )
+        stats = self.projection_window.present_stats()
+        if stats:
+            last, mean, worst = stats
+            self.present_label.setText(
+                f"Presentación: {last:.1f} ms (media {mean:.1f}, máx {worst:.1f})"
+            )
+    
+    def exposure_time(self, index):
+        # En borrador las capas primarias se cuentan ya combinadas y la
+        # exposición se multiplica para curar el espesor mayor
+        merge = self.draft_merge.value()
+        if index < math.ceil(self.primary_layers.value() / merge):
+            exposure = self.primary_time.value()
+        else:
+            exposure = self.normal_time.value()
+        return exposure * self.draft_exposure.value() if merge > 1 else exposure
+    
+    def draft_height(self):
+        # Altura de cada capa impresa (la del trabajo por las capas combinadas)
+        return self.layer_height.value() * self.draft_merge.value()
+    
+    def layer_step(self, index):
+        # Subida tras la capa: el espesor de la siguiente (la última capa
+        # combinada puede reunir menos capas originales)
+        following = index + 1
+        if isinstance(self.print_source, DraftSource) and following < self.total_layers:
+            return self.layer_height.value() * self.print_source.thickness(following)
+        return self.draft_height()
+    
+    def print_analysis(self):
+        # Análisis de capas utilizable en la impresión en curso (None si es
+        # de otra versión del trabajo); en borrador, el de las capas combinadas
+        analysis = self.layer_analysis
+        if analysis and analysis.total_layers == self.total_layers:
+            return analysis
+        return None
+    
+    def reuses_shown_frame(self, index):
+        analysis = self.print_analysis()
+        return (analysis is not None and self.shown_layer == index - 1
+                and analysis.same_as_previous(index))
+    
+    def skip_decode(self, index):
+        # Lo consulta la precarga: capas que no hace falta decodificar
+        analysis = self.print_analysis()
+        if analysis is None:
+            return False
+        if self.collapse_empty.isChecked() and analysis.empty(index):
+            return True
+        return analysis.same_as_previous(index)
+    
+    def advance_empty_layers(self, index):
+        # Capas vacías consecutivas desde index: sin imagen, sin UV y sin
+        # despegue, solo la subida de todas sus alturas de capa juntas.
+        # Devuelve cuántas capas se saltan (0 si la capa no está vacía)
+        analysis = self.print_analysis()
+        if analysis is None:
+            return 0
+        end = index
+        while end < self.total_layers and analysis.empty(end):
+            end += 1
+        if end == index:
+            return 0
+        
+        run = end - index
+        layer_height = self.layer_height.value()
+        steps_per_mm = self.steps_per_mm.value()
+        advance = self.peel_profile().plan(run * layer_height, steps_per_mm).duration
+        cycles = 0.0
+        for layer in range(index, end):
+            lift_distance, peel = self.layer_lift(layer)
+            cycles += (self.exposure_time(layer) +
+                       peel.plan(lift_distance, steps_per_mm).duration +
+                       self.return_profile().plan(lift_distance - layer_height, steps_per_mm).duration)
+        self.saved_seconds += max(0.0, cycles - advance)
+        self.saved_decodes += run
+        self.saved_repaints += run
+        self.update_dedup_label()
+        
+        self.current_layer_label.setText(f"Capa actual: {end} (capas {index + 1}-{end} vacías)")
+        self.remaining_layers_label.setText(f"Capas restantes: {self.total_layers - end}")
+        self.progress_bar.setValue(int(end * 100 / self.total_layers))
+        self.prefetcher.prefetch(end)
+        self.controller.submit("advance", run * layer_height, self.peel_profile())
+        return run
+    
+    def update_dedup_label(self):
+        self.dedup_label.setText(
+            f"Capas repetidas o vacías: {self.saved_decodes} decodificaciones y "
+            f"{self.saved_repaints} repintados evitados, {self.saved_seconds:.1f} s ahorrados"
+        )
+    
+    def peel_profile(self):
+        return ProfileSettings(self.lift_speed.value(), self.lift_accel.value(),
+                               self.z_jerk.value())
+    
+    def lift_policy(self):
+        # None si la elevación adaptativa está desactivada; ValueError si las reglas no son válidas
+        if not self.adaptive_lift.isChecked():
+            return None
+        rules = parse_rules(self.lift_rules.text())
+        for rule in rules:
+            if rule.distance <= self.draft_height():
+                raise ValueError(f"La distancia de la regla '{rule}' no supera la altura de capa")
+        return LiftPolicy(rules, self.lift_distance.value(), self.peel_profile())
+    
+    def layer_lift(self, index):
+        policy = self.print_lift_policy
+        if policy is None:
+            return self.lift_distance.value(), self.peel_profile()
+        return policy.for_layer(self.print_analysis(), index)
+    
+    def return_profile(self):
+        return ProfileSettings(self.return_speed.value(), self.return_accel.value(),
+                               self.z_jerk.value())
+    
+    def job_finished(self):
+        # Ir a posición final (movimiento absoluto si la posición es conocida)
         self.go_end()
         
         # Limpiar
-        self.is_printing = False
         self.print_timer.stop()
         if self.projection_window:
             self.projection_window.close()
             self.projection_window = None
+        self.close_prefetcher()
+        self.close_journal("finished")
+        self.report_print()
+        self.enable_controls()
         
         QMessageBox.information(self, "Impresión Completada", 
                               "El proceso de impresión ha finalizado correctamente.")
     
+    def job_aborted(self, message):
+        # message: error que canceló la impresión (None si la canceló el usuario)
+        self.stop_print()
+        self.close_journal("failed" if message else "cancelled")
+        self.report_print()
+        self.enable_controls()
+        if message:
+            QMessageBox.critical(self, "Error", message)
+    
+    def report_print(self):
+        times = self.print_job.state_times
+        print("Tiempo por estado: " + ", ".join(
+            f"{STATE_LABELS[state]} {format_duration(seconds)}" for state, seconds in times.items()
+        ))
+        
+        # Informe de exposición junto al trabajo, para comparar entre impresiones
+        log = self.exposure_log
+        if not log:
+            return
+        print(f"Exposición real: {log.summary()}")
+        try:
+            log.save(exposure_report_path(self.slice_path), self.slice_source.name)
+        except OSError as e:
+            print(f"No se pudo guardar el informe de exposición: {e}")
+    
+    def toggle_pause(self):
+        if not self.is_printing:
+            return
+        if self.print_job.state == PAUSED or self.print_job.pause_requested:
+            self.print_job.resume()
+        else:
+            self.print_job.pause()
+    
     def stop_print(self):
-        self.is_printing = False
         self.print_timer.stop()
-        self.board.digital_write(self.saved_pin_uv, 0)
+        self.controller.emergency_stop()
         if self.projection_window:
             self.projection_window.close()
             self.projection_window = None
+        self.close_prefetcher()
+    
+    def close_prefetcher(self):
+        if self.preflight:
+            # Esperar a que terminen los lotes en curso antes de soltar el hilo
+            self.preflight.cancel()
+            self.preflight.wait()
+            self.preflight = None
+        if self.saved_decodes:
+            print(f"Capas repetidas o vacías: {self.saved_decodes} decodificaciones y "
+                  f"{self.saved_repaints} repintados evitados, {self.saved_seconds:.1f} s ahorrados")
+            self.saved_decodes = 0
+        self.shown_frame = None
+        self.print_source = None
+        if self.prefetcher:
+            print(f"Precarga: {self.prefetcher.hits} aciertos, {self.prefetcher.misses} fallos")
+            self.prefetcher.shutdown()
+            self.prefetcher = None
+        if self.layer_cache:
+            print(f"Caché en disco: {self.layer_cache.hits} aciertos, {self.layer_cache.misses} fallos")
+            self.layer_cache.close()
+            self.layer_cache = None
+        if self.frame_decoder:
+            self.frame_decoder.shutdown()
+            self.frame_decoder = None
     
     def update_elapsed_time(self):
         if self.start_time:
@@ -643,12 +1425,63 @@ class MainWindow(QMainWindow):
                 f"Tiempo transcurrido: {hours:02d}:{minutes:02d}:{seconds:02d}"
             )
     
+    def update_time_estimate(self):
+        if not self.folder_layers:
+            self.estimated_time_label.setText("Tiempo estimado: -")
+            return
+        
+        # En borrador se imprimen menos capas, más gruesas y más expuestas
+        merge = self.draft_merge.value()
+        layers = math.ceil(self.folder_layers / merge)
+        analysis = self.layer_analysis
+        fixed_total = estimate_print_time(
+            layers, math.ceil(self.primary_layers.value() / merge),
+            self.exposure_time(0), self.exposure_time(layers),
+            self.lift_distance.value(), self.draft_height(),
+            self.steps_per_mm.value(), self.peel_profile(), self.return_profile()
+        )
+        # Espera antes de encender el UV en cada capa
+        fixed_total += layers * self.settle_time.value() / 1000
+        try:
+            policy = self.lift_policy()
+        except ValueError as e:
+            self.estimated_time_label.setText(f"Tiempo estimado: {format_duration(fixed_total)} ({e})")
+            return
+        if policy is None:
+            self.estimated_time_label.setText(f"Tiempo estimado: {format_duration(fixed_total)}")
+            return
+        
+        # Misma estimación cambiando solo el tiempo de elevación y retorno
+        fixed_lift = estimate_lift_time(
+            LiftPolicy([], self.lift_distance.value(), self.peel_profile()), None,
+            layers, self.draft_height(), self.steps_per_mm.value(),
+            self.return_profile()
+        )
+        adaptive_lift = estimate_lift_time(
+            policy, analysis, layers, self.draft_height(),
+            self.steps_per_mm.value(), self.return_profile()
+        )
+        saved = fixed_lift - adaptive_lift
+        pending = ""
+        if not analysis or not analysis.complete:
+            pending = ", análisis incompleto"
+        self.estimated_time_label.setText(
+            f"Tiempo estimado: {format_duration(fixed_total - saved)} "
+            f"(ahorro {format_duration(saved)} frente a elevación fija{pending})"
+        )
+    
     def validate_print_settings(self):
-        if not self.selected_folder:
+        if self.slice_source is None:
             QMessageBox.warning(self, "Error", "Seleccione una carpeta de imágenes")
             return False
+        
+        try:
+            self.print_lift_policy = self.lift_policy()
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", f"Reglas de elevación: {e}")
+            return False
             
-        if not self.board:
+        if not self.connected:
             QMessageBox.warning(self, "Error", "Conecte el Arduino primero")
             return False
             
@@ -669,7 +1502,27 @@ class MainWindow(QMainWindow):
         self.primary_time.setEnabled(False)
         self.normal_time.setEnabled(False)
         self.lift_distance.setEnabled(False)
+        self.adaptive_lift.setEnabled(False)
+        self.lift_rules.setEnabled(False)
+        self.prefetch_depth.setEnabled(False)
+        self.cache_budget.setEnabled(False)
+        self.decode_processes.setEnabled(False)
+        self.preflight_check.setEnabled(False)
+        self.journal_check.setEnabled(False)
+        self.collapse_empty.setEnabled(False)
+        self.draft_merge.setEnabled(False)
+        self.draft_coverage.setEnabled(False)
+        self.draft_exposure.setEnabled(False)
+        self.settle_time.setEnabled(False)
+        self.native_projection.setEnabled(False)
+        self.lift_speed.setEnabled(False)
+        self.lift_accel.setEnabled(False)
+        self.return_speed.setEnabled(False)
+        self.return_accel.setEnabled(False)
+        self.z_jerk.setEnabled(False)
         self.folder_button.setEnabled(False)
+        self.archive_button.setEnabled(False)
+        self.plate_button.setEnabled(False)
         self.start_button.setEnabled(False)
 
     def enable_controls(self):
@@ -687,30 +1540,41 @@ class MainWindow(QMainWindow):
         self.primary_time.setEnabled(True)
         self.normal_time.setEnabled(True)
         self.lift_distance.setEnabled(True)
+        self.adaptive_lift.setEnabled(True)
+        self.lift_rules.setEnabled(True)
+        self.prefetch_depth.setEnabled(True)
+        self.cache_budget.setEnabled(True)
+        self.decode_processes.setEnabled(True)
+        self.preflight_check.setEnabled(True)
+        self.journal_check.setEnabled(True)
+        self.collapse_empty.setEnabled(True)
+        self.draft_merge.setEnabled(True)
+        self.draft_coverage.setEnabled(True)
+        self.draft_exposure.setEnabled(True)
+        self.settle_time.setEnabled(True)
+        self.native_projection.setEnabled(True)
+        self.lift_speed.setEnabled(True)
+        self.lift_accel.setEnabled(True)
+        self.return_speed.setEnabled(True)
+        self.return_accel.setEnabled(True)
+        self.z_jerk.setEnabled(True)
         self.folder_button.setEnabled(True)
+        self.archive_button.setEnabled(True)
+        self.plate_button.setEnabled(True)
         self.start_button.setEnabled(True)
         
         # Remover botón cancelar si existe
         if hasattr(self, 'cancel_button'):
             self.cancel_button.setParent(None)
             self.cancel_button = None
+        if self.pause_button:
+            self.pause_button.setParent(None)
+            self.pause_button = None
 
     def cancel_print(self):
         try:
-            # Detener el proceso
-            self.is_printing = False
-            self.print_timer.stop()
-            
-            # Apagar UV
-            self.board.digital_write(self.saved_pin_uv, 0)
-            
-            # Cerrar ventana de proyección
-            if self.projection_window:
-                self.projection_window.close()
-                self.projection_window = None
-            
-            # Habilitar controles
-            self.enable_controls()
+            # Interrumpir la capa en curso, apagar UV y habilitar controles
+            self.abort_print()
             
             QMessageBox.information(self, "Impresión Cancelada", 
                                   "El proceso de impresión ha sido cancelado")
@@ -727,7 +1591,7 @@ class MainWindow(QMainWindow):
         
         # Actualizar panel de conexión
         self.status_label.setText(self.translations["status"] + 
-            (self.translations["connected"] if self.board else self.translations["disconnected"]))
+            (self.translations["connected"] if self.connected else self.translations["disconnected"]))
         self.connect_button.setText(self.translations["connect"])
         
         # Actualizar grupo de ajustes CNC
@@ -745,10 +1609,15 @@ class MainWindow(QMainWindow):
         # Actualizar parámetros de impresión
         self.findChild(QGroupBox, "print_params").setTitle(self.translations["print_params"])
         self.folder_button.setText(self.translations["select_folder"])
+        self.archive_button.setText(self.translations["select_archive"])
+        self.plate_button.setText(self.translations["compose_plate"])
         self.start_button.setText(self.translations["start_print"])
         
         if hasattr(self, 'cancel_button'):
             self.cancel_button.setText(self.translations["cancel_print"])
+        if self.pause_button:
+            paused = self.print_job.state == PAUSED or self.print_job.pause_requested
+            self.pause_button.setText(self.translations["resume_print" if paused else "pause_print"])
         
         # Actualizar estado de impresión
         self.findChild(QGroupBox, "print_status").setTitle(self.translations["print_status"])
@@ -770,8 +1639,8 @@ class MainWindow(QMainWindow):
             self.elapsed_time_label.setText(f"{self.translations['elapsed_time']} 00:00:00")
         
         # Actualizar etiqueta de carpeta
-        if self.selected_folder:
-            folder_name = os.path.basename(self.selected_folder)
+        if self.slice_source is not None:
+            folder_name = self.slice_source.name
             self.folder_label.setText(f"{self.translations['select_folder']}: {folder_name}")
         else:
             self.folder_label.setText(self.translations["no_folder"])
\ No newline at end of file
@@ -0,0 +1,211 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
+                            QTableWidgetItem, QHeaderView, QSpinBox, QDoubleSpinBox,
+                            QFormLayout, QFileDialog, QMessageBox, QProgressDialog)
+from PyQt6.QtCore import Qt
+import os
+import zipfile
+from slices.sources import JOB_EXTENSIONS, open_slice_source
+from slices.plate_source import PLATE_EXTENSIONS, PlateJob, PlateCheckThread, save_plate
+
+
+# Composición de una bandeja con varios trabajos: cada uno con su
+# desplazamiento en píxeles y su altura de capa. Al guardar se comprueba que
+# todos caben en la pantalla y que sus siluetas no se solapan.
+class PlateDialog(QDialog):
+    def __init__(self, parent, layer_height):
+        super().__init__(parent)
+        self.setWindowTitle("Componer Bandeja")
+        self.resize(700, 400)
+        self.plate_path = None
+        self.check_thread = None
+        self.check_progress = None
+        layout = QVBoxLayout()
+
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(["Trabajo", "X (px)", "Y (px)", "Altura de capa"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.paths = []
+        layout.addWidget(self.table)
+
+        buttons_layout = QHBoxLayout()
+        self.add_folder_button = QPushButton("Añadir Carpeta")
+        self.add_folder_button.clicked.connect(self.add_folder)
+        self.add_file_button = QPushButton("Añadir Archivo")
+        self.add_file_button.clicked.connect(self.add_file)
+        self.remove_button = QPushButton("Quitar")
+        self.remove_button.clicked.connect(self.remove_job)
+        buttons_layout.addWidget(self.add_folder_button)
+        buttons_layout.addWidget(self.add_file_button)
+        buttons_layout.addWidget(self.remove_button)
+        layout.addLayout(buttons_layout)
+
+        # Bandeja: resolución de la pantalla y altura de capa de la impresión
+        form = QFormLayout()
+        self.plate_width = QSpinBox()
+        self.plate_width.setRange(1, 16384)
+        self.plate_width.setValue(1920)
+        self.plate_width.setSuffix(" px")
+        self.plate_height = QSpinBox()
+        self.plate_height.setRange(1, 16384)
+        self.plate_height.setValue(1080)
+        self.plate_height.setSuffix(" px")
+        self.layer_height = QDoubleSpinBox()
+        self.layer_height.setRange(0.01, 1)
+        self.layer_height.setSingleStep(0.01)
+        self.layer_height.setDecimals(3)
+        self.layer_height.setValue(layer_height)
+        self.layer_height.setSuffix(" mm")
+        form.addRow("Ancho de la bandeja:", self.plate_width)
+        form.addRow("Alto de la bandeja:", self.plate_height)
+        form.addRow("Altura de capa:", self.layer_height)
+        layout.addLayout(form)
+
+        actions_layout = QHBoxLayout()
+        self.save_button = QPushButton("Comprobar y Guardar")
+        self.save_button.clicked.connect(self.save)
+        self.cancel_button = QPushButton("Cancelar")
+        self.cancel_button.clicked.connect(self.reject)
+        actions_layout.addStretch()
+        actions_layout.addWidget(self.save_button)
+        actions_layout.addWidget(self.cancel_button)
+        layout.addLayout(actions_layout)
+
+        self.setLayout(layout)
+
+    def add_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Seleccionar Carpeta de Slices")
+        if folder:
+            self.add_job(folder)
+
+    def add_file(self):
+        patterns = " ".join(f"*{extension}" for extension in JOB_EXTENSIONS
+                            if extension not in PLATE_EXTENSIONS)
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Seleccionar Archivo de Slices", "", f"Trabajos de impresión ({patterns})"
+        )
+        if path:
+            self.add_job(path)
+
+    def add_job(self, path):
+        try:
+            source = open_slice_source(path)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            QMessageBox.warning(self, "Error", f"No se pudo abrir el trabajo: {e}")
+            return
+        try:
+            if not len(source):
+                QMessageBox.warning(self, "Error", "No se encontró secuencia válida de imágenes")
+                return
+            size = source.image_size(0)
+            settings = source.settings or {}
+        finally:
+            source.close()
+
+        # El primer trabajo fija la resolución de la bandeja
+        if not self.paths:
+            self.plate_width.setValue(size.width())
+            self.plate_height.setValue(size.height())
+
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        self.paths.append(path)
+        name = QTableWidgetItem(source.name)
+        name.setToolTip(path)
+        name.setFlags(name.flags() & ~Qt.ItemFlag.ItemIsEditable)
+        self.table.setItem(row, 0, name)
+        for column in (1, 2):
+            offset = QSpinBox()
+            offset.setRange(0, 16384)
+            offset.setSuffix(" px")
+            self.table.setCellWidget(row, column, offset)
+        job_height = QDoubleSpinBox()
+        job_height.setRange(0.01, 1)
+        job_height.setSingleStep(0.01)
+        job_height.setDecimals(3)
+        job_height.setValue(settings.get("layer_height", self.layer_height.value()))
+        job_height.setSuffix(" mm")
+        self.table.setCellWidget(row, 3, job_height)
+
+    def remove_job(self):
+        row = self.table.currentRow()
+        if row >= 0:
+            self.table.removeRow(row)
+            del self.paths[row]
+
+    def jobs(self):
+        return [
+            PlateJob(path, self.table.cellWidget(row, 1).value(), self.table.cellWidget(row, 2).value(),
+                     self.table.cellWidget(row, 3).value())
+            for row, path in enumerate(self.paths)
+        ]
+
+    def save(self):
+        if not self.paths:
+            QMessageBox.warning(self, "Error", "Añada al menos un trabajo")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Guardar Bandeja", "", "Bandejas (*.plate)")
+        if not path:
+            return
+        if not path.lower().endswith(PLATE_EXTENSIONS):
+            path += PLATE_EXTENSIONS[0]
+
+        try:
+            save_plate(path, self.jobs(), self.layer_height.value(),
+                       self.plate_width.value(), self.plate_height.value())
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"No se pudo guardar la bandeja: {e}")
+            return
+
+        # Límites (solo cabeceras) y colisiones en segundo plano: sin análisis
+        # guardado hay que decodificar todas las capas de los trabajos
+        self.save_button.setEnabled(False)
+        self.check_progress = QProgressDialog("Comprobando colisiones...", "Cancelar", 0, 0, self)
+        self.check_progress.setWindowTitle("Comprobar Bandeja")
+        self.check_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self.check_progress.setMinimumDuration(0)
+        self.check_progress.canceled.connect(self.cancel_check)
+        self.check_thread = PlateCheckThread(path)
+        self.check_thread.progress.connect(self.update_check_progress)
+        self.check_thread.completed.connect(lambda problems: self.finish_check(path, problems))
+        self.check_thread.failed.connect(lambda message: self.finish_check(path, [message]))
+        self.check_thread.start()
+
+    def update_check_progress(self, done, total):
+        if self.check_progress:
+            self.check_progress.setMaximum(total)
+            self.check_progress.setValue(done)
+
+    def stop_check(self):
+        if self.check_progress:
+            self.check_progress.canceled.disconnect(self.cancel_check)
+            self.check_progress.close()
+            self.check_progress = None
+        if self.check_thread:
+            self.check_thread.cancel()
+            self.check_thread.wait()
+            self.check_thread = None
+        self.save_button.setEnabled(True)
+
+    def cancel_check(self):
+        # Sin comprobar no se guarda la bandeja
+        path = self.check_thread.path
+        self.stop_check()
+        if os.path.exists(path):
+            os.remove(path)
+
+    def finish_check(self, path, problems):
+        if self.check_thread is None:
+            # Aviso de una comprobación ya cancelada
+            return
+        self.stop_check()
+        if problems:
+            os.remove(path)
+            QMessageBox.critical(self, "Bandeja no válida", "\n".join(problems))
+            return
+        self.plate_path = path
+        self.accept()
+
+    def reject(self):
+        if self.check_thread:
+            self.cancel_check()
+        super().reject()
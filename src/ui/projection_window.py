@@ -1,19 +1,58 @@
 from PyQt6.QtWidgets import QWidget, QLabel
-from PyQt6.QtCore import Qt, QSize
-from PyQt6.QtGui import QPixmap, QScreen, QGuiApplication
-import os
+from PyQt6.QtCore import Qt, QSize, QPointF
+from PyQt6.QtGui import QPixmap, QScreen, QGuiApplication, QPainter
+from collections import deque
+import time
+
+# Dibuja la capa a resolución nativa directamente en paintEvent, sin escalar:
+# cada píxel del slice corresponde a un píxel físico de la pantalla LCD.
+class FrameWidget(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.frame = None
+        # time.monotonic() al terminar de pintar el frame actual (None si aún no se ha pintado)
+        self.painted_at = None
+        # Se pinta todo el área en cada frame: Qt no necesita borrar el fondo
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+    
+    def set_frame(self, image):
+        image.setDevicePixelRatio(self.devicePixelRatioF())
+        self.frame = image
+        self.painted_at = None
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        frame = self.frame
+        if frame is None:
+            painter.fillRect(self.rect(), Qt.GlobalColor.black)
+            return
+        
+        size = frame.deviceIndependentSize()
+        x = (self.width() - size.width()) / 2
+        y = (self.height() - size.height()) / 2
+        if x > 0 or y > 0:
+            painter.fillRect(self.rect(), Qt.GlobalColor.black)
+        painter.drawImage(QPointF(x, y), frame)
+        painter.end()
+        self.painted_at = time.monotonic()
 
 class ProjectionWindow(QWidget):
-    def __init__(self):
+    def __init__(self, native=False):
         super().__init__()
         self.setWindowTitle("Proyección")
+        self.native = native
+        self.present_times = deque(maxlen=500)
         
         # Configurar ventana sin bordes
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
         
-        # Label para mostrar la imagen
-        self.image_label = QLabel(self)
-        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        if native:
+            # Modo 1:1: widget propio que pinta la imagen sin escalar
+            self.frame_widget = FrameWidget(self)
+        else:
+            # Label para mostrar la imagen
+            self.image_label = QLabel(self)
+            self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
         # Detectar monitores
         screens = QGuiApplication.screens()
@@ -28,18 +67,55 @@ class ProjectionWindow(QWidget):
             self.resize(800, 600)
             self.setStyleSheet("background-color: black;")
     
-    def show_image(self, image_path):
-        if not os.path.exists(image_path):
-            return
-            
-        pixmap = QPixmap(image_path)
-        
-        # Ajustar imagen al tamaño de la ventana
-        scaled_pixmap = pixmap.scaled(
-            self.size(),
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        
-        self.image_label.setPixmap(scaled_pixmap)
-        self.image_label.setGeometry(0, 0, self.width(), self.height()) 
\ No newline at end of file
+    def resizeEvent(self, event):
+        if self.native:
+            self.frame_widget.setGeometry(0, 0, self.width(), self.height())
+        super().resizeEvent(event)
+    
+    def native_size(self):
+        # Tamaño en píxeles físicos del área de proyección
+        ratio = self.devicePixelRatioF()
+        return QSize(round(self.width() * ratio), round(self.height() * ratio))
+    
+    def check_resolution(self, slice_size):
+        # Se comprueba una sola vez al iniciar el trabajo, no en cada capa
+        screen_size = self.native_size()
+        if slice_size != screen_size:
+            return (f"La resolución de los slices ({slice_size.width()}x{slice_size.height()}) "
+                    f"no coincide con la pantalla ({screen_size.width()}x{screen_size.height()})")
+        return None
+    
+    def refresh_interval(self):
+        # Segundos por refresco de la pantalla de proyección: lo que puede
+        # tardar en mostrarse un frame ya pintado (0 si no se conoce)
+        screen = self.screen()
+        rate = screen.refreshRate() if screen else 0
+        return 1 / rate if rate > 0 else 0.0
+    
+    def show_frame(self, image):
+        # Imagen compacta (Mono o Grayscale8) ya decodificada por LayerPrefetcher;
+        # la conversión al formato de pantalla se hace aquí, al pintar, y se
+        # mide cuánto tarda en quedar presentada.
+        # Devuelve time.monotonic() al terminar de pintar; RuntimeError si Qt
+        # no llegó a pintarla (el UV no debe encenderse con la imagen anterior)
+        start = time.perf_counter()
+        if self.native:
+            self.frame_widget.set_frame(image)
+            self.frame_widget.repaint()
+            painted_at = self.frame_widget.painted_at
+            if painted_at is None:
+                raise RuntimeError("La pantalla de proyección no ha pintado la capa")
+        else:
+            self.image_label.setPixmap(QPixmap.fromImage(image))
+            self.image_label.setGeometry(0, 0, self.width(), self.height())
+            self.image_label.repaint()
+            painted_at = time.monotonic()
+        self.present_times.append((time.perf_counter() - start) * 1000)
+        return painted_at
+    
+    def present_stats(self):
+        # (última, media, máxima) en ms
+        if not self.present_times:
+            return None
+        times = self.present_times
+        return times[-1], sum(times) / len(times), max(times)
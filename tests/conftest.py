@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Los módulos se importan como en la aplicación (desde src/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
@@ -0,0 +1,42 @@
+import pytest
+from printer.controller import PrinterController
+from printer.planner import ProfileSettings
+from printer.sim_board import SimulatedBoard, SIMULATOR_PORT
+
+PINS = {"step": 2, "dir": 3, "home": 4, "end": 5, "uv": 6}
+STEPS_PER_MM = 80
+TRAVEL_MM = 10
+
+
+def connect(firmware, position):
+    def factory(port, pins, travel_steps):
+        return SimulatedBoard(pins, travel_steps, position=position, firmware=firmware)
+
+    controller = PrinterController(board_factory=factory)
+    controller._cmd_connect(SIMULATOR_PORT, PINS, STEPS_PER_MM, TRAVEL_MM)
+    return controller
+
+
+@pytest.mark.parametrize("firmware", [True, False])
+def test_layer_fails_when_lift_hits_end_sensor(firmware):
+    # La elevación de 1 mm alcanza el sensor END a medio camino
+    controller = connect(firmware, TRAVEL_MM * STEPS_PER_MM - 40)
+    profile = ProfileSettings(20, 200)
+    try:
+        with pytest.raises(RuntimeError, match="final de carrera"):
+            controller._cmd_layer(0.01, 1.0, 0.05, profile, profile)
+        assert controller.board.uv == 0
+    finally:
+        controller._close_board()
+
+
+@pytest.mark.parametrize("firmware", [True, False])
+def test_layer_ok_inside_travel(firmware):
+    controller = connect(firmware, TRAVEL_MM * STEPS_PER_MM // 2)
+    profile = ProfileSettings(20, 200)
+    try:
+        cycle = controller._cmd_layer(0.01, 1.0, 0.05, profile, profile)
+        assert cycle.lift.steps == STEPS_PER_MM
+        assert cycle.back.steps == STEPS_PER_MM - 4
+    finally:
+        controller._close_board()
@@ -0,0 +1,81 @@
+import numpy as np
+from PyQt6.QtCore import QSize
+from slices.draft_source import DraftSource, merge_layers
+
+
+def layer(*lit, value=255):
+    gray = np.zeros((2, 4), dtype=np.uint8)
+    for x in lit:
+        gray[0, x] = value
+    return gray
+
+
+class FakeSource:
+    # Fuente en memoria con la interfaz de las fuentes RLE (decode)
+    settings = None
+    name = "fake"
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.refreshed = False
+
+    def __len__(self):
+        return len(self.arrays)
+
+    def decode(self, index):
+        return self.arrays[index]
+
+    def image_size(self, index):
+        return QSize(4, 2)
+
+    def refresh(self):
+        return self.refreshed
+
+    def fingerprint(self):
+        return "abc"
+
+
+def test_union_keeps_brightest_value():
+    merged = merge_layers([layer(0, 1, value=100), layer(1, 2)])
+    assert merged[0].tolist() == [100, 255, 255, 0]
+    assert not merged[1].any()
+
+
+def test_coverage_threshold():
+    arrays = [layer(0, 1, 2), layer(0, 1), layer(0), layer(3)]
+    # 50 %: un píxel necesita estar en 2 de las 4 capas
+    assert merge_layers(arrays, 0.5)[0].tolist() == [255, 255, 0, 0]
+    # 75 %: en 3 de 4
+    assert merge_layers(arrays, 0.75)[0].tolist() == [255, 0, 0, 0]
+    assert merge_layers(arrays, 1.0)[0].tolist() == [0, 0, 0, 0]
+
+
+def test_coverage_ignored_for_single_layer():
+    assert merge_layers([layer(2)], 1.0)[0].tolist() == [0, 0, 255, 0]
+
+
+def test_short_last_group():
+    source = DraftSource(FakeSource([layer(0), layer(1), layer(2), layer(3), layer(0, 3)]), 2, 1.0)
+    assert len(source) == 3
+    assert [source.thickness(index) for index in range(3)] == [2, 2, 1]
+    assert list(source.layers(2)) == [4]
+    # Con cobertura total las capas sin píxeles comunes quedan vacías...
+    assert not source.decode(0).any()
+    # ...pero la última, que es una sola capa, se proyecta entera
+    assert source.decode(2)[0].tolist() == [255, 0, 0, 255]
+
+
+def test_inspect_uses_merged_layer():
+    source = DraftSource(FakeSource([layer(), layer(), layer(1), layer()]), 2)
+    # La primera capa combinada está vacía; la segunda no, aunque empiece por una vacía
+    assert source.inspect(0) == (4, 2, 8, True, 0, 0)
+    assert source.inspect(1) == (4, 2, 8, True, 0, 255)
+    assert source.inspect(1, QSize(8, 8))[2] == 0
+
+
+def test_refresh_reports_changes():
+    fake = FakeSource([layer(0)])
+    source = DraftSource(fake, 2)
+    assert source.refresh() is False
+    fake.refreshed = True
+    assert source.refresh() is True
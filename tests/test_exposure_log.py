@@ -0,0 +1,137 @@
+import json
+import os
+import pytest
+from printer.exposure_log import (EXPOSURE_REPORT_VERSION, ExposureLog, exposure_report_path,
+                                  percentile)
+from printer.motion import LayerCycleResult
+
+
+def cycle(requested, uv_on_ms, uv_off_ms, host_on=None):
+    # Ciclo cronometrado por la placa (ms); host_on en segundos del PC
+    result = LayerCycleResult(0, uv_on_ms, uv_off_ms)
+    result.exposure = requested
+    result.host_on = host_on
+    result.host_off = host_on + (uv_off_ms - uv_on_ms) / 1000 if host_on is not None else None
+    return result
+
+
+def pc_cycle(requested, actual, host_on):
+    # Ciclo cronometrado en el PC (sin placa), con errores de fracciones de ms
+    result = LayerCycleResult(0, None, None, clock="PC")
+    result.exposure = requested
+    result.host_on, result.host_off = host_on, host_on + actual
+    return result
+
+
+def make_log(errors_ms, requested=2.0):
+    log = ExposureLog()
+    for layer, error in enumerate(errors_ms):
+        log.add(layer, pc_cycle(requested, requested + error / 1000, 10.0 * layer))
+    return log
+
+
+def test_percentile_empty_and_single():
+    assert percentile([], 0.5) is None
+    assert percentile([7], 0.0) == 7
+    assert percentile([7], 0.5) == 7
+    assert percentile([7], 1.0) == 7
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 21))
+    # Rango = techo(p * n): p50 de 20 valores es el 10.º, p95 el 19.º
+    assert percentile(values, 0.5) == 10
+    assert percentile(values, 0.95) == 19
+    assert percentile(values, 0.951) == 20
+    assert percentile(values, 1.0) == 20
+    # Rango mínimo 1 y sin interpolar entre valores
+    assert percentile(values, 0.0) == 1
+    assert percentile([1, 100], 0.5) == 1
+    assert percentile([1, 100], 0.51) == 100
+    # 0.07 * 100 no es exacto en coma flotante
+    assert percentile(list(range(1, 101)), 0.07) == 7
+
+
+def test_stats():
+    assert ExposureLog().stats() is None
+    assert ExposureLog().mean_error() is None
+    assert ExposureLog().summary() == "sin capas expuestas"
+    log = make_log([1, -3, 2, 0])
+    # Error absoluto ordenado: 0, 1, 2, 3
+    assert log.stats() == pytest.approx((1, 3, 3))
+    assert log.mean_error() == pytest.approx(0)
+    assert len(log) == 4
+
+
+def test_add_skips_layers_without_exposure():
+    log = ExposureLog()
+    # UV sin apagar (impresión cancelada) o sin tiempo pedido
+    assert log.add(0, cycle(2.0, 1000, None)) is None
+    result = cycle(2.0, 1000, 3000)
+    result.exposure = None
+    assert log.add(1, result) is None
+    assert len(log) == 0
+
+
+def test_histogram_bins():
+    log = make_log([0, 0.4, 0.999, 1, 1.5, -0.2, -1, -2.5, 3])
+    # Barras de 1 ms por su inicio; los negativos redondean hacia abajo
+    assert log.histogram() == {-3: 1, -1: 2, 0: 3, 1: 2, 3: 1}
+    assert log.histogram(2) == {-4: 1, -2: 2, 0: 5, 2: 1}
+    assert list(log.histogram()) == sorted(log.histogram())
+    assert ExposureLog().histogram() == {}
+
+
+def test_histogram_float_noise():
+    # 2.3 - 2.0 s = 0.2999999999999998 s: sigue cayendo en la barra de 300 ms
+    log = ExposureLog()
+    log.add(0, pc_cycle(2.0, 2.3, 10.0))
+    assert log.histogram(100) == {300: 1}
+
+
+def test_latency_stats():
+    log = ExposureLog()
+    assert log.latency_stats() is None
+    log.add(0, cycle(2.0, 0, 2000, host_on=10.0), presented=9.99)
+    log.add(1, cycle(2.0, 0, 2000, host_on=20.0), presented=None)
+    log.add(2, cycle(2.0, 0, 2000, host_on=30.0), presented=29.97)
+    assert log.latency_stats() == pytest.approx((10, 30, 30))
+    assert "imagen a UV p50 10.0 ms" in log.summary()
+
+
+def test_save_round_trip(tmp_path):
+    log = make_log([0.5, -1.25, 2])
+    log.add(3, cycle(2.0, 0, 2001, host_on=5.0), presented=4.995)
+    path = exposure_report_path(str(tmp_path / "pieza") + os.sep)
+    assert path == str(tmp_path / "pieza.exposure.json")
+    log.save(path, "pieza")
+    assert not os.path.exists(path + ".tmp")
+
+    with open(path) as f:
+        data = json.load(f)
+    assert data["version"] == EXPOSURE_REPORT_VERSION
+    assert data["job"] == "pieza"
+    assert data["layers"] == 4
+    assert (data["p50_ms"], data["p95_ms"], data["max_ms"]) == (1, 2, 2)
+    assert data["mean_ms"] == pytest.approx(0.5625, abs=1e-3)
+    assert data["latency_p50_ms"] == data["latency_max_ms"] == pytest.approx(5)
+    # Las claves JSON son texto; al leerlas vuelven al histograma original
+    assert {int(start): count for start, count in data["histogram"].items()} == log.histogram()
+    assert data["histogram_bin_ms"] == 1
+    records = data["records"]
+    assert [record["layer"] for record in records] == [0, 1, 2, 3]
+    for saved, record in zip(records, log.records):
+        assert saved == {"layer": record.layer, "requested": record.requested,
+                         "actual": record.actual, "clock": record.clock,
+                         "host_on": record.host_on, "host_off": record.host_off,
+                         "presented": record.presented}
+
+
+def test_save_empty_log(tmp_path):
+    path = str(tmp_path / "vacio.exposure.json")
+    ExposureLog().save(path, "vacio")
+    with open(path) as f:
+        data = json.load(f)
+    assert data["layers"] == 0
+    assert data["p50_ms"] is None and data["latency_max_ms"] is None
+    assert data["histogram"] == {} and data["records"] == []
@@ -0,0 +1,62 @@
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QImage
+from ui.frame_decoder import ProcessFrameDecoder
+from ui.layer_prefetcher import LayerPrefetcher
+
+# Capa 1 repetida en 2-7 (no se decodifican, como con el análisis de capas) y
+# después más capas distintas que ranuras: la imagen de la capa 1 sigue en
+# pantalla mientras se decodifican
+VALUES = [10, 20, 20, 20, 20, 20, 20, 20, 30, 40, 50, 60, 70, 80]
+REPEATED = {index for index in range(1, len(VALUES)) if VALUES[index] == VALUES[index - 1]}
+SIZE = QSize(16, 8)
+DEPTH = 2
+
+
+def write_layers(folder):
+    for index, value in enumerate(VALUES):
+        image = QImage(SIZE, QImage.Format.Format_Grayscale8)
+        image.fill(value)
+        image.save(str(folder / f"layer{index + 1:04d}.png"))
+
+
+def wait_prefetch(prefetcher):
+    for future in list(prefetcher._frames.values()):
+        future.result()
+
+
+def test_shown_slot_not_reused_with_repeated_layers(tmp_path):
+    write_layers(tmp_path)
+    decoder = ProcessFrameDecoder(str(tmp_path), SIZE, True, workers=2, slots=DEPTH + 2)
+    prefetcher = LayerPrefetcher(decoder.load, len(VALUES), DEPTH, workers=2,
+                                 skip=lambda index: index in REPEATED)
+    try:
+        prefetcher.prefetch(0)
+        shown, shown_value = None, None
+        for index, value in enumerate(VALUES):
+            if index not in REPEATED:
+                frame = prefetcher.get(index)
+                decoder.pin(index)
+                shown, shown_value = frame, value
+            prefetcher.prefetch(index + 1)
+            wait_prefetch(prefetcher)
+            # La capa en pantalla no ha cambiado aunque se hayan decodificado otras
+            assert shown.pixelColor(0, 0).red() == shown_value
+            assert shown.pixelColor(SIZE.width() - 1, SIZE.height() - 1).red() == shown_value
+    finally:
+        prefetcher.shutdown()
+        del shown, frame
+        decoder.shutdown()
+
+
+def test_pinned_slot_survives_more_decodes_than_slots(tmp_path):
+    write_layers(tmp_path)
+    decoder = ProcessFrameDecoder(str(tmp_path), SIZE, True, workers=2, slots=DEPTH + 2)
+    try:
+        shown = decoder.load(1)
+        decoder.pin(1)
+        for index in range(8, len(VALUES)):
+            assert decoder.load(index).pixelColor(0, 0).red() == VALUES[index]
+            assert shown.pixelColor(0, 0).red() == VALUES[1]
+    finally:
+        del shown
+        decoder.shutdown()
@@ -0,0 +1,65 @@
+import os
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QImage
+from ui import layer_cache
+from ui.layer_cache import LayerCache, evict
+
+SIZE = QSize(64, 16)
+FRAME_BYTES = 64 * 16
+
+
+def frame(value):
+    image = QImage(SIZE, QImage.Format.Format_Grayscale8)
+    image.fill(value)
+    return image
+
+
+def disk_usage(directory):
+    return sum(os.path.getsize(os.path.join(directory, name))
+               for name in os.listdir(directory) if name.endswith(".frames"))
+
+
+def test_index_written_while_filling(tmp_path, monkeypatch):
+    # Sin close(): como si el programa se cerrase de golpe
+    monkeypatch.setattr(layer_cache, "INDEX_INTERVAL", 4)
+    cache = LayerCache(str(tmp_path), "job", 100 * FRAME_BYTES)
+    for index in range(10):
+        cache.put(index, frame(index))
+    assert (tmp_path / "job.json").exists()
+
+    reopened = LayerCache(str(tmp_path), "job", 100 * FRAME_BYTES)
+    assert len(reopened) == 8
+    assert reopened.get(7).pixelColor(0, 0).red() == 7
+    cache.close()
+    reopened.close()
+
+
+def test_orphan_frames_are_swept(tmp_path):
+    (tmp_path / "crashed.frames").write_bytes(b"\0" * FRAME_BYTES)
+    LayerCache(str(tmp_path), "job", 100 * FRAME_BYTES).close()
+    assert not (tmp_path / "crashed.frames").exists()
+
+
+def test_put_keeps_total_disk_usage_within_budget(tmp_path):
+    budget = 6 * FRAME_BYTES
+    old = LayerCache(str(tmp_path), "old", budget)
+    for index in range(5):
+        old.put(index, frame(index))
+    old.close()
+
+    cache = LayerCache(str(tmp_path), "new", budget)
+    for index in range(5):
+        cache.put(index, frame(index))
+        cache._writer.flush()
+        assert disk_usage(str(tmp_path)) <= budget
+    cache.close()
+    # La entrada antigua se borró para hacer sitio a la nueva
+    assert len(LayerCache(str(tmp_path), "new", budget)) == 5
+    assert not (tmp_path / "old.json").exists()
+
+
+def test_evict_returns_usage_of_other_entries(tmp_path):
+    for key in ("a", "b"):
+        (tmp_path / f"{key}.json").write_text("{}")
+        (tmp_path / f"{key}.frames").write_bytes(b"\0" * 100)
+    assert evict(str(tmp_path), 1000, keep="a") == 100
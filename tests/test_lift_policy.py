@@ -0,0 +1,81 @@
+import pytest
+from printer.lift_policy import DEFAULT_RULES, LiftPolicy, parse_rules
+from printer.planner import ProfileSettings
+
+
+def as_tuples(rules):
+    return [(rule.max_fraction, rule.distance, rule.speed) for rule in rules]
+
+
+def test_default_rules():
+    assert as_tuples(parse_rules(DEFAULT_RULES)) == [(0.05, 3, 6), (0.2, 5, 4), (1.0, 8, 2)]
+
+
+def test_rules_sorted_by_area():
+    rules = parse_rules("100: 8 @ 2; 5: 3 @ 6 , 20:5@4,")
+    assert as_tuples(rules) == [(0.05, 3, 6), (0.2, 5, 4), (1.0, 8, 2)]
+    # repr vuelve a dar el formato de entrada
+    assert [repr(rule) for rule in rules] == ["5: 3 @ 6", "20: 5 @ 4", "100: 8 @ 2"]
+    assert as_tuples(parse_rules(", ".join(map(repr, rules)))) == as_tuples(rules)
+
+
+def test_optional_percent_and_decimals():
+    assert as_tuples(parse_rules("2.5%: 1.5 @ 7.5")) == [(0.025, 1.5, 7.5)]
+
+
+def test_first_matching_threshold_applies():
+    peel = ProfileSettings(3, 20, jerk=100, start_speed=0.4)
+    policy = LiftPolicy(parse_rules("20: 5 @ 4, 5: 3 @ 6"), 10, peel)
+    # El límite es inclusivo: el 5 % exacto usa aún la primera regla
+    assert policy.select(0.05)[0] == 3
+    assert policy.select(0.06)[0] == 5
+    distance, profile = policy.select(0.01)
+    assert (distance, profile.max_speed) == (3, 6)
+    assert (profile.accel, profile.jerk, profile.start_speed) == (20, 100, 0.4)
+    # Por encima de la última regla o sin análisis: la elevación fija
+    assert policy.select(0.5) == (10, peel)
+    assert policy.select(None) == (10, peel)
+
+
+def test_repeated_threshold():
+    with pytest.raises(ValueError, match="Área repetida: '20: 3 @ 6'"):
+        parse_rules("20: 5 @ 4, 20: 3 @ 6")
+    with pytest.raises(ValueError, match="Área repetida"):
+        parse_rules("20: 5 @ 4, 20%: 5 @ 4")
+
+
+@pytest.mark.parametrize("text", [
+    "5 3 @ 6",
+    "5: 3 6",
+    "5: 3 @ 6 @ 2",
+    "5: 3: 6",
+    "cinco: 3 @ 6",
+    "5: 3 @ rápido",
+    "5: @ 6",
+])
+def test_malformed_rule(text):
+    with pytest.raises(ValueError, match="Regla no válida") as error:
+        parse_rules(f"20: 5 @ 4, {text}")
+    # El mensaje señala la regla que falla
+    assert f"'{text}'" in str(error.value)
+
+
+@pytest.mark.parametrize("text", [
+    "0: 3 @ 6",
+    "101: 3 @ 6",
+    "-5: 3 @ 6",
+    "5: 0 @ 6",
+    "5: 3 @ -1",
+    "nan: 3 @ 6",
+    "5: inf @ 6",
+    "5: 3 @ inf",
+])
+def test_rule_out_of_range(text):
+    with pytest.raises(ValueError, match="Regla fuera de rango"):
+        parse_rules(text)
+
+
+@pytest.mark.parametrize("text", ["", " ", ",;, "])
+def test_no_rules(text):
+    with pytest.raises(ValueError, match="No hay reglas"):
+        parse_rules(text)
@@ -0,0 +1,39 @@
+import time
+import pytest
+from printer import limits
+from printer.limits import LimitSwitches
+
+
+class FakeBoard:
+    # Como pymata4: valor 0 y marca de tiempo 0 hasta el primer informe
+    def __init__(self, values, report_after):
+        self.values = values
+        self.report_at = time.monotonic() + report_after
+        self.callbacks = {}
+
+    def set_pin_mode_digital_input_pullup(self, pin, callback=None):
+        self.callbacks[pin] = callback
+
+    def digital_read(self, pin):
+        if time.monotonic() < self.report_at:
+            return [0, 0]
+        return [self.values[pin], time.time()]
+
+
+def test_waits_for_first_report_before_reading_state():
+    # Sensores libres (nivel alto): no deben verse activos por el 0 inicial
+    switches = LimitSwitches(FakeBoard({4: 1, 5: 1}, 0.05), 4, 5)
+    assert not switches.home.is_set()
+    assert not switches.end.is_set()
+
+
+def test_active_sensor_after_first_report():
+    switches = LimitSwitches(FakeBoard({4: 0, 5: 1}, 0.0), 4, 5)
+    assert switches.active(0)
+    assert not switches.active(1)
+
+
+def test_no_report_is_an_error(monkeypatch):
+    monkeypatch.setattr(limits, "REPORT_TIMEOUT", 0.05)
+    with pytest.raises(RuntimeError):
+        LimitSwitches(FakeBoard({4: 1, 5: 1}, 10), 4, 5)
@@ -0,0 +1,88 @@
+import pytest
+from printer.planner import RAMP_SEGMENTS, ProfileSettings, constant_profile, plan_move
+
+# Cola de segmentos del firmware ZMotion
+QUEUE = 16
+
+STEPS_PER_MM = 400
+TRAPEZOID = ProfileSettings(8, 40)
+S_CURVE = ProfileSettings(8, 40, jerk=400)
+
+
+# Desde movimientos de pocos pasos (tramos de rampa vacíos) hasta con crucero
+MOVES = [(settings, steps) for settings in (TRAPEZOID, S_CURVE)
+         for steps in (1, 3, 4, 5, 9, 17, 40, 123, 1000, 4000, 20000)]
+
+
+@pytest.mark.parametrize("settings, steps", MOVES)
+def test_profile_fits_firmware_queue(settings, steps):
+    profile = settings.plan_steps(steps, STEPS_PER_MM)
+    assert len(profile.segments) <= 2 * RAMP_SEGMENTS + 1 < QUEUE
+
+
+@pytest.mark.parametrize("settings, steps", MOVES)
+def test_segments_sum_to_request(settings, steps):
+    profile = settings.plan_steps(steps, STEPS_PER_MM)
+    assert profile.steps == steps
+    assert all(count > 0 for count, _, _ in profile.segments)
+
+
+@pytest.mark.parametrize("settings, steps", MOVES)
+def test_velocity_continuous_between_segments(settings, steps):
+    segments = settings.plan_steps(steps, STEPS_PER_MM).segments
+    start_rate = settings.start_speed * STEPS_PER_MM
+    assert segments[0][1] == pytest.approx(start_rate)
+    assert segments[-1][2] == pytest.approx(start_rate)
+    for previous, following in zip(segments, segments[1:]):
+        assert following[1] == pytest.approx(previous[2])
+
+
+def test_short_moves_never_reach_cruise():
+    # 0,5 mm no basta para llegar a 8 mm/s con ninguno de los dos perfiles
+    trapezoid = TRAPEZOID.plan(0.5, STEPS_PER_MM)
+    s_curve = S_CURVE.plan(0.5, STEPS_PER_MM)
+    max_rate = 8 * STEPS_PER_MM
+    for profile in (trapezoid, s_curve):
+        assert profile.steps == 200
+        peak = max(segment[2] for segment in profile.segments)
+        assert peak < max_rate
+        # Rampas simétricas sin crucero: como mucho el resto del redondeo a
+        # pasos queda en el centro a la velocidad pico
+        flat = [index for index, (_, start, end) in enumerate(profile.segments) if start == end]
+        assert flat in ([], [len(profile.segments) // 2])
+        assert all(profile.segments[index][0] <= 2 for index in flat)
+        assert [count for count, _, _ in profile.segments] == \
+            [count for count, _, _ in reversed(profile.segments)]
+
+    # El jerk limita la aceleración: la curva en S llega a menos velocidad,
+    # tarda más y empieza con un cambio de velocidad más suave
+    def peak(profile):
+        return max(segment[2] for segment in profile.segments)
+
+    def first_accel(profile):
+        count, start, end = profile.segments[0]
+        return (end - start) / count
+
+    assert peak(s_curve) < peak(trapezoid)
+    assert s_curve.duration > trapezoid.duration
+    assert first_accel(s_curve) < first_accel(trapezoid)
+
+
+def test_long_move_cruises_at_max_speed():
+    profile = TRAPEZOID.plan(10, STEPS_PER_MM)
+    cruise = [segment for segment in profile.segments if segment[1] == segment[2]]
+    assert cruise == [(cruise[0][0], 8 * STEPS_PER_MM, 8 * STEPS_PER_MM)]
+    assert len(profile.segments) == 2 * RAMP_SEGMENTS + 1
+    # Duración: el crucero a 3200 pasos/s más las dos rampas
+    assert profile.duration > cruise[0][0] / (8 * STEPS_PER_MM)
+    assert profile.duration < 4000 / STEPS_PER_MM
+
+
+def test_degenerate_moves():
+    assert plan_move(0, 1000, 100).segments == []
+    # Sin aceleración o con velocidad máxima por debajo de la inicial: constante
+    assert plan_move(50, 1000, 0, start_rate=200).segments == [(50, 200, 200)]
+    assert plan_move(50, 100, 500, start_rate=200).segments == [(50, 100, 100)]
+    assert constant_profile(-20, 300).segments == [(20, 300, 300)]
+    # Las distancias se redondean al paso más cercano
+    assert TRAPEZOID.plan(-0.29, 100).steps == 29
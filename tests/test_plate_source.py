@@ -0,0 +1,130 @@
+import pytest
+from PyQt6.QtCore import QRect
+from PyQt6.QtGui import QImage, QColor, QPainter
+from slices import sources
+from slices.analysis import AnalysisThread, LayerAnalysis
+from slices.plate_source import PlateJob, save_plate
+
+JOB_SIZE = (40, 30)
+
+
+def make_job(folder, layers):
+    # layers: lista de rectángulos (x, y, ancho, alto) iluminados por capa
+    folder.mkdir()
+    for number, rects in enumerate(layers, 1):
+        image = QImage(*JOB_SIZE, QImage.Format.Format_Grayscale8)
+        image.fill(0)
+        painter = QPainter(image)
+        for rect in rects:
+            painter.fillRect(QRect(*rect), QColor("white"))
+        painter.end()
+        image.save(str(folder / f"layer{number:04d}.png"))
+    return str(folder)
+
+
+def make_plate(tmp_path, jobs, layer_height=0.05, width=100, height=60):
+    path = str(tmp_path / "bandeja.plate")
+    save_plate(path, jobs, layer_height, width, height)
+    return sources.open_slice_source(path)
+
+
+def analyse(path):
+    source = sources.open_slice_source(path)
+    analysis = LayerAnalysis(source.fingerprint(), len(source))
+    source.close()
+    AnalysisThread(path, analysis).run()
+
+
+SQUARE = [[(0, 0, 10, 10)]] * 2
+
+
+def test_job_inside_plate(tmp_path):
+    job = make_job(tmp_path / "a", SQUARE)
+    plate = make_plate(tmp_path, [PlateJob(job, 60, 30)])
+    assert len(plate) == 2
+    plate.close()
+
+
+@pytest.mark.parametrize("x, y", [(61, 0), (0, 31), (-1, 0), (0, -5)])
+def test_job_outside_plate(tmp_path, x, y):
+    job = make_job(tmp_path / "a", SQUARE)
+    with pytest.raises(ValueError, match="se sale de la bandeja"):
+        make_plate(tmp_path, [PlateJob(job, x, y)])
+
+
+def test_offset_jobs_without_overlap(tmp_path):
+    a = make_job(tmp_path / "a", SQUARE)
+    b = make_job(tmp_path / "b", SQUARE)
+    # Las imágenes se solapan pero las piezas no
+    plate = make_plate(tmp_path, [PlateJob(a, 0, 0), PlateJob(b, 10, 5)])
+    assert plate.collisions() == []
+    canvas = plate.decode(0)
+    assert canvas[5:15, 10:20].all() and canvas[0:10, 0:10].all()
+    assert canvas.sum() == 2 * 100 * 255
+    plate.close()
+
+
+def test_offset_jobs_with_overlap(tmp_path):
+    a = make_job(tmp_path / "a", SQUARE)
+    b = make_job(tmp_path / "b", SQUARE)
+    plate = make_plate(tmp_path, [PlateJob(a, 0, 0), PlateJob(b, 6, 7)])
+    assert plate.collisions() == ["a y b se solapan en 12 píxeles"]
+    plate.close()
+
+
+def test_overlap_across_layer_heights(tmp_path):
+    # a: 4 capas de 0.05 mm; b: 2 capas de 0.1 mm con la pieza solo en la segunda
+    a = make_job(tmp_path / "a", [[(0, 0, 10, 10)]] * 4)
+    b = make_job(tmp_path / "b", [[], [(0, 0, 5, 5)]])
+    plate = make_plate(tmp_path, [PlateJob(a, 0, 0, 0.05), PlateJob(b, 8, 8, 0.1)])
+    assert len(plate) == 4
+    assert [plate.job_layer(1, index) for index in range(4)] == [0, 0, 1, 1]
+    assert plate.collisions() == ["a y b se solapan en 4 píxeles"]
+    assert plate.decode(1)[8:13, 8:13].sum() == 4 * 255
+    assert plate.decode(2)[8:13, 8:13].sum() == 25 * 255
+    plate.close()
+
+
+def test_shorter_job_ends_early(tmp_path):
+    a = make_job(tmp_path / "a", [[(0, 0, 10, 10)]] * 2)
+    b = make_job(tmp_path / "b", [[(0, 0, 10, 10)]] * 2)
+    plate = make_plate(tmp_path, [PlateJob(a, 0, 0, 0.05), PlateJob(b, 50, 0, 0.1)],
+                       layer_height=0.05)
+    assert len(plate) == 4
+    assert plate.job_layer(0, 2) is None
+    assert plate.decode(3)[0:10, 0:10].sum() == 0
+    plate.close()
+
+
+def test_saved_analysis_avoids_decoding(tmp_path):
+    a = make_job(tmp_path / "a", SQUARE)
+    b = make_job(tmp_path / "b", SQUARE)
+    analyse(a)
+    analyse(b)
+    calls = []
+    plate = make_plate(tmp_path, [PlateJob(a, 0, 0), PlateJob(b, 20, 0)])
+    assert plate.collisions(lambda done, total: calls.append(total)) == []
+    assert calls == []
+    plate.close()
+
+
+def test_saved_analysis_boxes_overlap_but_parts_do_not(tmp_path):
+    # Piezas en L encajadas: las cajas envolventes se solapan, las siluetas no
+    a = make_job(tmp_path / "a", [[(0, 0, 20, 4), (0, 0, 4, 20)]])
+    b = make_job(tmp_path / "b", [[(16, 0, 4, 20), (0, 16, 20, 4)]])
+    analyse(a)
+    analyse(b)
+    progress = []
+    plate = make_plate(tmp_path, [PlateJob(a, 0, 0), PlateJob(b, 6, 6)])
+    assert plate.collisions(lambda done, total: progress.append((done, total))) == []
+    # Solo entonces se decodificaron las capas de ambos trabajos
+    assert progress[-1] == (2, 2)
+    plate.close()
+
+
+def test_collisions_cancelled(tmp_path):
+    a = make_job(tmp_path / "a", SQUARE)
+    b = make_job(tmp_path / "b", SQUARE)
+    plate = make_plate(tmp_path, [PlateJob(a, 0, 0), PlateJob(b, 50, 0)])
+    assert plate.collisions(cancelled=lambda: True) is None
+    plate.close()
@@ -0,0 +1,225 @@
+from printer.print_job import (PrintJob, IDLE, PREFLIGHT, HOMING, SETTLING, EXPOSING, PEELING,
+                               PAUSED, FINISHED, ABORTED)
+
+
+class FakeDriver:
+    # Registra las llamadas; los temporizadores se disparan a mano con fire()
+    def __init__(self, skip=None, fail_on=None):
+        self.skip = skip or {}
+        self.fail_on = fail_on
+        self.calls = []
+        self.states = []
+        self.timers = []
+        self.now = 0.0
+        self.aborted = None
+        self.finished = False
+
+    def clock(self):
+        return self.now
+
+    def fire(self):
+        timers, self.timers = self.timers, []
+        for delay, callback in timers:
+            self.now += delay
+            callback()
+
+    def job_preflight(self):
+        self.calls.append(("preflight",))
+
+    def job_home(self):
+        self.calls.append(("home",))
+
+    def job_skip(self, layer):
+        return self.skip.get(layer, 0)
+
+    def job_present(self, layer):
+        if layer == self.fail_on:
+            raise RuntimeError("imagen no válida")
+        self.calls.append(("present", layer))
+        return self.now
+
+    def job_expose(self, layer):
+        self.calls.append(("expose", layer))
+
+    def job_prepare(self, layer):
+        self.calls.append(("prepare", layer))
+
+    def job_schedule(self, delay, callback):
+        self.timers.append((delay, callback))
+
+    def job_state_changed(self, state):
+        self.states.append(state)
+
+    def job_finished(self):
+        self.finished = True
+
+    def job_aborted(self, message):
+        self.aborted = message
+
+
+def make_job(driver, total=2, **kwargs):
+    return PrintJob(driver, total, settle_time=0.5, clock=driver.clock, **kwargs)
+
+
+def run_layer(job, driver):
+    # Estabilización, fin de la exposición y fin del ciclo de una capa
+    driver.fire()
+    assert job.state == EXPOSING
+    job.exposed()
+    assert job.state == PEELING
+    job.layer_done()
+
+
+def test_full_print():
+    driver = FakeDriver()
+    job = make_job(driver, preflight=True)
+    assert job.state == IDLE
+    job.start()
+    assert job.state == PREFLIGHT
+    job.preflight_done()
+    assert job.state == HOMING
+    job.homed()
+    assert job.state == SETTLING
+    run_layer(job, driver)
+    run_layer(job, driver)
+    assert job.state == FINISHED and driver.finished
+    assert [call for call in driver.calls if call[0] != "home"] == [
+        ("preflight",), ("present", 0), ("expose", 0), ("prepare", 1),
+        ("present", 1), ("expose", 1), ("prepare", 2)]
+
+
+def test_peeling_waits_for_exposure_report():
+    # Sin aviso de UV apagado no hay despegue, pase el tiempo que pase
+    driver = FakeDriver()
+    job = make_job(driver)
+    job.start()
+    job.homed()
+    driver.fire()
+    assert job.state == EXPOSING
+    assert driver.timers == []
+    driver.now += 100
+    assert job.state == EXPOSING
+    job.exposed()
+    assert job.state == PEELING
+    # Un aviso repetido no vuelve a entrar en el despegue
+    job.exposed()
+    assert driver.calls.count(("prepare", 1)) == 1
+
+
+def test_exposure_report_outside_exposing_is_ignored():
+    driver = FakeDriver()
+    job = make_job(driver)
+    job.start()
+    job.exposed()
+    assert job.state == HOMING
+    job.homed()
+    job.exposed()
+    assert job.state == SETTLING
+
+
+def test_skipped_layers_advance_without_exposure():
+    driver = FakeDriver(skip={1: 2})
+    job = make_job(driver, total=4)
+    job.start()
+    job.homed()
+    run_layer(job, driver)
+    assert job.state == PEELING and job.cycle_skipped and job.cycle_layers == 2
+    job.layer_done()
+    assert job.layer == 3 and not job.cycle_skipped
+    assert ("present", 1) not in driver.calls
+
+
+def test_pause_and_resume():
+    driver = FakeDriver()
+    job = make_job(driver, total=3)
+    job.start()
+    job.homed()
+    job.pause()
+    # Termina la capa en curso antes de pararse
+    run_layer(job, driver)
+    assert job.state == PAUSED and job.layer == 1
+    job.resume()
+    assert job.state == SETTLING
+    run_layer(job, driver)
+    run_layer(job, driver)
+    assert job.state == FINISHED
+
+
+def test_cancel():
+    driver = FakeDriver()
+    job = make_job(driver)
+    job.start()
+    job.homed()
+    job.abort()
+    assert job.state == ABORTED and not job.active
+    assert driver.aborted is None
+    # Ni el temporizador pendiente ni los avisos posteriores reanudan la impresión
+    driver.fire()
+    job.exposed()
+    job.layer_done()
+    assert job.state == ABORTED
+    assert ("expose", 0) not in driver.calls
+
+
+def test_cancel_while_paused():
+    driver = FakeDriver()
+    job = make_job(driver)
+    job.start()
+    job.homed()
+    job.pause()
+    run_layer(job, driver)
+    assert job.state == PAUSED
+    job.abort()
+    assert job.state == ABORTED
+
+
+def test_driver_error_aborts_with_message():
+    driver = FakeDriver(fail_on=1)
+    job = make_job(driver)
+    job.start()
+    job.homed()
+    run_layer(job, driver)
+    assert job.state == ABORTED
+    assert driver.aborted == "Error en capa 2: imagen no válida"
+
+
+def test_resume_from_layer():
+    driver = FakeDriver()
+    job = make_job(driver, total=5, first_layer=3)
+    job.start()
+    job.homed()
+    assert ("present", 3) in driver.calls
+    run_layer(job, driver)
+    run_layer(job, driver)
+    assert job.state == FINISHED
+    assert ("present", 0) not in driver.calls
+
+
+def test_stale_settle_timer_is_ignored():
+    # Un temporizador de una capa anterior no expone la capa actual
+    driver = FakeDriver()
+    job = make_job(driver, total=3)
+    job.start()
+    job.homed()
+    stale = driver.timers[0]
+    driver.fire()
+    job.exposed()
+    job.layer_done()
+    assert job.state == SETTLING
+    stale[1]()
+    assert job.state == SETTLING
+    driver.fire()
+    assert job.state == EXPOSING
+
+
+def test_state_times_accumulate():
+    driver = FakeDriver()
+    job = make_job(driver, total=1)
+    job.start()
+    job.homed()
+    driver.fire()
+    driver.now += 2.0
+    job.exposed()
+    job.layer_done()
+    assert job.state_times[SETTLING] == 0.5
+    assert job.state_times[EXPOSING] == 2.0
@@ -0,0 +1,39 @@
+from printer.print_journal import PrintJournal, journal_path, read_journal
+
+HEADER = {"fingerprint": "abc", "total_layers": 10, "layer_height": 0.05}
+
+
+def write_journal(tmp_path, status=None):
+    path = journal_path(str(tmp_path / "job"))
+    journal = PrintJournal(path, HEADER)
+    journal.layer(0, 1, 0.05, exposure=8, lift=5)
+    journal.layer(1, 3, 0.15, exposure=0, lift=0)
+    if status:
+        journal.close(status)
+    else:
+        # Cierre inesperado: sin registro "close"
+        journal._executor.shutdown(wait=True)
+        journal._file.close()
+    return read_journal(path)
+
+
+def test_interrupted_print_is_resumable(tmp_path):
+    state = write_journal(tmp_path)
+    assert state.next_layer == 3
+    assert state.z == 0.15
+    assert state.resumable("abc", 10, 0.05)
+
+
+def test_failed_print_is_resumable(tmp_path):
+    assert write_journal(tmp_path, "failed").resumable("abc", 10, 0.05)
+
+
+def test_finished_or_cancelled_print_is_not_resumable(tmp_path):
+    assert not write_journal(tmp_path, "finished").resumable("abc", 10, 0.05)
+    assert not write_journal(tmp_path, "cancelled").resumable("abc", 10, 0.05)
+
+
+def test_other_job_version_is_not_resumable(tmp_path):
+    state = write_journal(tmp_path)
+    assert not state.resumable("otro", 10, 0.05)
+    assert not state.resumable("abc", 12, 0.05)
@@ -0,0 +1,51 @@
+import os
+from slices.slice_index import SliceIndex
+
+
+def write_layers(folder, count):
+    for number in range(1, count + 1):
+        (folder / f"layer{number:04d}.png").write_bytes(b"png")
+
+
+def keep_folder_mtime(folder, mtime):
+    # Sobrescribir una capa no cambia la fecha de la carpeta
+    os.utime(folder, ns=(mtime, mtime))
+
+
+def test_refresh_only_rescans_when_folder_changes(tmp_path):
+    write_layers(tmp_path, 3)
+    index = SliceIndex(str(tmp_path))
+    assert index.scans == 1
+    assert not index.refresh()
+    (tmp_path / "layer0004.png").write_bytes(b"png")
+    assert index.refresh()
+    assert len(index) == 4 and index.scans == 2
+
+
+def test_fingerprint_detects_layer_overwritten_in_place(tmp_path):
+    write_layers(tmp_path, 3)
+    index = SliceIndex(str(tmp_path))
+    fingerprint = index.fingerprint()
+    folder_mtime = os.stat(tmp_path).st_mtime_ns
+
+    path = tmp_path / "layer0002.png"
+    path.write_bytes(b"png, otra version")
+    keep_folder_mtime(tmp_path, folder_mtime)
+    assert not index.refresh()
+    assert index.fingerprint() != fingerprint
+    assert index.layers[1].size == path.stat().st_size
+    assert index.scans == 1
+
+
+def test_fingerprint_detects_same_size_rewrite(tmp_path):
+    write_layers(tmp_path, 2)
+    index = SliceIndex(str(tmp_path))
+    fingerprint = index.fingerprint()
+    folder_mtime = os.stat(tmp_path).st_mtime_ns
+    path = tmp_path / "layer0001.png"
+    stat = path.stat()
+    path.write_bytes(b"PNG")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+    keep_folder_mtime(tmp_path, folder_mtime)
+    assert index.fingerprint() != fingerprint
+    assert index.fingerprint() == index.fingerprint()
@@ -0,0 +1,189 @@
+import numpy as np
+import pytest
+from slices.vendor_source import (MAGIC_CBDDLP, MAGIC_CTB, VendorSource, _HEADER, _HEADER_FIELDS,
+                                  _LAYER, _PARAMS, _decode_header, decode_bits, decode_ctb,
+                                  decrypt_ctb)
+
+
+def header(**values):
+    fields = dict.fromkeys(_HEADER_FIELDS, 0)
+    fields.update(magic=MAGIC_CTB, version=2, layer_height=0.05, exposure_time=2.5,
+                  bottom_exposure_time=30.0, bottom_layers=3, resolution_x=4, resolution_y=2)
+    fields.update(values)
+    return _HEADER.pack(*fields.values())
+
+
+def write_job(path, planes, params=None, pages=None, **values):
+    # planes: datos RLE de cada entrada de la tabla de capas (en orden de la tabla)
+    table_offset = _HEADER.size
+    params_offset = table_offset + _LAYER.size * len(planes)
+    data_offset = params_offset + (_PARAMS.size if params else 0)
+    table = b""
+    offset = data_offset
+    for index, data in enumerate(planes):
+        page = pages[index] if pages else 0
+        table += _LAYER.pack(0.05 * (index + 1), 2.5, 1.0, offset, len(data), page)
+        offset += len(data)
+    values.setdefault("layer_count", len(planes))
+    head = header(layers_offset=table_offset, params_offset=params_offset if params else 0,
+                  **values)
+    with open(path, "wb") as file:
+        file.write(head + table + (_PARAMS.pack(*params) if params else b"") + b"".join(planes))
+    return str(path)
+
+
+def reference_ctb(data):
+    # Lectura tramo a tramo como la describe el formato (referencia para comparar)
+    values, lengths, n = [], [], 0
+    while n < len(data):
+        code, n = data[n], n + 1
+        length = 1
+        if code & 0x80:
+            code &= 0x7F
+            extra = 1 if data[n] < 0x80 else 2 if data[n] < 0xC0 else 3 if data[n] < 0xE0 else 4
+            length = int.from_bytes(data[n:n + extra], "big") & (0x7F, 0x3FFF, 0x1FFFFF, 0x0FFFFFFF)[extra - 1]
+            n += extra
+        values.append((code << 1) | 1 if code else 0)
+        lengths.append(length)
+    return np.repeat(np.array(values, dtype=np.uint8), lengths)
+
+
+def test_decode_bits():
+    # 3 negros, 2 blancos, 1 negro, 2 blancos
+    data = bytes([0x03, 0x82, 0x01, 0x82])
+    assert decode_bits(data, 8).tolist() == [0, 0, 0, 1, 1, 0, 1, 1]
+    # Las capas cortas se completan con negro y las largas se recortan
+    assert decode_bits(data, 10).tolist()[-2:] == [0, 0]
+    assert decode_bits(data, 4).tolist() == [0, 0, 0, 1]
+
+
+def test_decode_ctb_single_and_short_runs():
+    # Sin bit 7: un píxel; gris de 7 bits a 8 (127 -> 255, 1 -> 3, 0 -> 0)
+    data = bytes([0x7F, 0x01, 0x00, 0xFF, 0x03])
+    assert decode_ctb(data, 6).tolist() == [255, 3, 0, 255, 255, 255]
+
+
+@pytest.mark.parametrize("prefix, length", [
+    (bytes([0x7F]), 0x7F),
+    (bytes([0x81, 0x02]), 0x0102),
+    (bytes([0xC1, 0x00, 0x03]), 0x010003),
+    (bytes([0xE0, 0x10, 0x00, 0x01]), 0x100001),
+])
+def test_decode_ctb_length_encodings(prefix, length):
+    # Un tramo largo de gris 0x10 entre dos píxeles sueltos
+    data = bytes([0x7F, 0x90]) + prefix + bytes([0x01])
+    gray = decode_ctb(data, length + 2)
+    assert gray.size == length + 2
+    assert gray[0] == 255 and gray[-1] == 3
+    assert (gray[1:-1] == 0x21).all()
+
+
+def test_decode_ctb_length_bytes_look_like_codes():
+    # Los bytes de longitud (0x85, 0xC0...) no deben leerse como códigos
+    data = bytes([0x85, 0x85, 0x85, 0x81, 0xC0, 0x00, 0x02, 0x7F])
+    expected = reference_ctb(data)
+    assert expected.size == 0x0585 + 2 + 1
+    assert decode_ctb(data, expected.size).tolist() == expected.tolist()
+
+
+@pytest.mark.parametrize("data", [
+    bytes([0x01, 0x85, 0xF0, 0x00]),    # prefijo 1111xxxx no válido
+    bytes([0x01, 0x85, 0xFF]),
+    bytes([0x01, 0x85]),                # longitud cortada al final
+    bytes([0x01, 0x85, 0xC0, 0x00]),
+])
+def test_decode_ctb_invalid_length(data):
+    with pytest.raises(ValueError, match="Longitud RLE no válida"):
+        decode_ctb(data, 100)
+
+
+def test_decode_ctb_matches_reference():
+    # Muchos tramos de todas las longitudes (la lectura se hace por bloques)
+    rng = np.random.default_rng(3)
+    data = bytearray()
+    for length in rng.choice([1, 1, 1, 5, 0x7F, 0x80, 0x3FFF, 0x4000, 0x20000], 3000).tolist():
+        code = int(rng.integers(0, 128))
+        if length == 1:
+            data.append(code)
+            continue
+        extra = 1 if length < 0x80 else 2 if length < 0x4000 else 3 if length < 0x200000 else 4
+        word = length | (0, 0, 0x8000, 0xC00000, 0xE0000000)[extra]
+        data += bytes([code | 0x80]) + word.to_bytes(extra, "big")
+    expected = reference_ctb(bytes(data))
+    assert np.array_equal(decode_ctb(bytes(data), expected.size), expected)
+
+
+def test_decrypt_ctb():
+    data = bytes(range(6))
+    assert decrypt_ctb(data, 0, 3) is data
+    encrypted = decrypt_ctb(data, 0x1234, 3)
+    assert encrypted == bytes.fromhex("dc0cc452eb25")
+    # Es un XOR: aplicarlo dos veces devuelve los datos originales
+    assert decrypt_ctb(encrypted, 0x1234, 3) == data
+    # Cada capa usa su propio flujo de clave
+    assert decrypt_ctb(data, 0x1234, 4) != encrypted
+
+
+def test_decode_header():
+    values = _decode_header(header(layer_count=7, encryption_key=9))
+    assert values["magic"] == MAGIC_CTB
+    assert values["layer_count"] == 7
+    assert values["encryption_key"] == 9
+    assert values["resolution_x"] == 4 and values["resolution_y"] == 2
+    assert values["exposure_time"] == 2.5
+    with pytest.raises(ValueError, match="demasiado corto"):
+        _decode_header(b"\x00" * (_HEADER.size - 1))
+
+
+def test_ctb_layer_table(tmp_path):
+    layers = [bytes([0x87, 0x08]), bytes([0x80, 0x04, 0xFF, 0x03, 0x7F])]
+    path = write_job(tmp_path / "pieza.ctb", layers, params=(5.0, 60.0, 6.0, 120.0, 180.0))
+    source = VendorSource(path)
+    assert len(source) == 2
+    assert source.layers[1][0] == pytest.approx(0.1)
+    assert source.layers[1][2] == [(_HEADER.size + _LAYER.size * 2 + _PARAMS.size + 2, 5)]
+    assert source.settings == {"layer_height": 0.05, "primary_layers": 3, "primary_time": 30.0,
+                               "normal_time": 2.5, "lift_distance": 6.0, "lift_speed": 2.0,
+                               "return_speed": 3.0}
+    assert source.decode(0).tolist() == [[15] * 4, [15] * 4]
+    assert source.decode(1).tolist() == [[0] * 4, [255] * 4]
+    source.close()
+
+
+def test_ctb_encrypted(tmp_path):
+    plain = bytes([0x87, 0x08])
+    path = write_job(tmp_path / "pieza.ctb", [decrypt_ctb(plain, 77, 0)], encryption_key=77)
+    source = VendorSource(path)
+    assert source.decode(0).tolist() == [[15] * 4, [15] * 4]
+    source.close()
+
+
+def test_cbddlp_antialias_levels(tmp_path):
+    # Dos niveles: una tabla por nivel; el gris es la media de los planos
+    planes = [bytes([0x84, 0x04]), bytes([0x82, 0x06])]
+    path = write_job(tmp_path / "pieza.cbddlp", planes, magic=MAGIC_CBDDLP, antialias=2,
+                     layer_count=1)
+    source = VendorSource(path)
+    assert source.levels == 2 and len(source) == 1
+    assert source.decode(0).tolist() == [[255, 255, 127, 127], [0, 0, 0, 0]]
+    assert source.inspect(0)[:3] == (4, 2, 8)
+    source.close()
+
+
+def test_layer_table_pages(tmp_path):
+    # La dirección de los datos suma la página (bloques de 4 GB)
+    path = write_job(tmp_path / "pieza.ctb", [b"\x00", b"\x00"], pages=[0, 1])
+    source = VendorSource(path)
+    first, second = (source.layers[index][2][0] for index in range(2))
+    assert second == (first[0] + 1 + (1 << 32), 1)
+    source.close()
+
+
+def test_invalid_files(tmp_path):
+    path = tmp_path / "pieza.ctb"
+    path.write_bytes(header(magic=0x1234))
+    with pytest.raises(ValueError, match="Firma desconocida"):
+        VendorSource(str(path))
+    path.write_bytes(header(layers_offset=_HEADER.size, layer_count=3) + b"\x00" * _LAYER.size)
+    with pytest.raises(ValueError, match="incompleta"):
+        VendorSource(str(path))
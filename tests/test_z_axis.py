@@ -0,0 +1,52 @@
+from printer.motion import MoveResult, MOVE_OK, MOVE_LIMIT
+from printer.planner import ProfileSettings
+from printer.z_axis import ZAxis
+
+
+class FakeMotion:
+    # Ejecuta todos los pasos del perfil salvo que se indique un límite
+    def __init__(self, limit_after=None):
+        self.limit_after = limit_after
+        self.moves = []
+
+    def run(self, profile, direction):
+        self.moves.append((profile.steps, direction))
+        if self.limit_after is not None and profile.steps > self.limit_after:
+            return MoveResult(self.limit_after, MOVE_LIMIT)
+        return MoveResult(profile.steps, MOVE_OK)
+
+
+PROFILE = ProfileSettings(5, 50)
+
+
+def test_move_to_plans_exact_steps():
+    # 29 pasos a 100 pasos/mm: pasando por mm int() daría 28
+    axis = ZAxis(FakeMotion(), 100, 10)
+    axis.position = 0
+    axis.move_to(29, PROFILE)
+    assert axis.motion.moves == [(29, 1)]
+    assert axis.position == 29
+
+
+def test_plan_rounds_distance_to_nearest_step():
+    assert PROFILE.plan(0.29, 100).steps == 29
+
+
+def test_move_to_clamps_to_measured_end():
+    # El sensor END se encontró más allá del recorrido nominal
+    axis = ZAxis(FakeMotion(), 100, 10)
+    axis.position = 0
+    axis.end_position = 1030
+    axis.move_to(2000, PROFILE)
+    assert axis.position == 1030
+    axis.end_position = None
+    axis.move_to(2000, PROFILE)
+    assert axis.position == 1000
+
+
+def test_position_follows_executed_steps():
+    axis = ZAxis(FakeMotion(limit_after=12), 100, 10)
+    axis.position = 0
+    result = axis.move_to(50, PROFILE)
+    assert result.reason == MOVE_LIMIT
+    assert axis.position == axis.end_position == 12
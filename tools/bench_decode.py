@@ -0,0 +1,79 @@
+"""Compara el rendimiento de decodificación de capas (capas/s) con 1/2/4/8
+trabajadores usando hilos (LayerPrefetcher) y procesos con entrega por
+memoria compartida (ProcessFrameDecoder), sobre slices PNG de 8K.
+
+Uso: python tools/bench_decode.py [--size 7680x4320] [--layers 16] [--workers 1,2,4,8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from PyQt6.QtCore import QSize, QRect, QPoint
+from PyQt6.QtGui import QImage, QPainter, QColor
+from slices.slice_index import SliceIndex
+from ui.layer_prefetcher import load_native_frame
+from ui.frame_decoder import ProcessFrameDecoder
+
+
+def make_slices(folder, size, count):
+    for i in range(count):
+        image = QImage(size, QImage.Format.Format_Grayscale8)
+        image.fill(0)
+        painter = QPainter(image)
+        painter.setBrush(QColor("white"))
+        # Varias piezas con bordes curvos para que el PNG no sea trivial
+        for j in range(12):
+            center = QPoint(size.width() * (j % 4 + 1) // 5, size.height() * (j // 4 + 1) // 4)
+            radius = size.height() // 10 + i * 3
+            painter.drawEllipse(center, radius, radius)
+        painter.fillRect(QRect(0, size.height() // 2 + i, size.width(), 4), QColor("white"))
+        painter.end()
+        image.save(os.path.join(folder, f"{i + 1}.png"))
+
+
+def measure(load, count, workers):
+    # Una pasada de calentamiento (arranque de procesos, imports) y otra medida
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(load, range(min(count, workers))))
+        start = time.perf_counter()
+        for frame in pool.map(load, range(count)):
+            pass
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="7680x4320")
+    parser.add_argument("--layers", type=int, default=16)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+    width, height = (int(value) for value in args.size.split("x"))
+    size = QSize(width, height)
+    counts = [int(value) for value in args.workers.split(",")]
+
+    print(f"CPUs: {os.cpu_count()}  capas: {args.layers}  tamaño: {args.size}")
+    with tempfile.TemporaryDirectory() as folder:
+        make_slices(folder, size, args.layers)
+        source = SliceIndex(folder)
+
+        for workers in counts:
+            threads = measure(lambda index: load_native_frame(source, index, size),
+                              args.layers, workers)
+
+            decoder = ProcessFrameDecoder(folder, size, True, workers, slots=workers * 2)
+            processes = measure(decoder.load, args.layers, workers)
+            decoder.shutdown()
+
+            print(f"{workers} trabajadores: hilos {threads:6.2f} capas/s  "
+                  f"procesos {processes:6.2f} capas/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Mide la latencia de la parada de emergencia sobre la placa simulada:
+tiempo desde la pulsación hasta apagar el UV y hasta el último pulso STEP.
+
+Uso: python tools/bench_estop.py [--trials N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from PyQt6.QtCore import QCoreApplication, Qt
+from printer.controller import PrinterController
+from printer.planner import ProfileSettings
+from printer.sim_board import SimulatedBoard, SIMULATOR_PORT
+
+PINS = {"step": 2, "dir": 3, "home": 4, "end": 5, "uv": 6}
+STEPS_PER_MM = 80
+TRAVEL_MM = 200
+LIMIT_MS = 50
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_trials(firmware, trials):
+    boards = []
+
+    def factory(port, pins, travel_steps):
+        board = SimulatedBoard(pins, travel_steps, firmware=firmware)
+        boards.append(board)
+        return board
+
+    controller = PrinterController(factory)
+    finished = threading.Event()
+    direct = Qt.ConnectionType.DirectConnection
+    controller.command_done.connect(lambda name, result: finished.set(), direct)
+    controller.command_failed.connect(lambda name, message: finished.set(), direct)
+    controller.command_cancelled.connect(lambda name: finished.set(), direct)
+    controller.start()
+
+    controller.submit("connect", SIMULATOR_PORT, PINS, STEPS_PER_MM, TRAVEL_MM)
+    finished.wait(5)
+    board = boards[0]
+
+    peel = ProfileSettings(5, 20)
+    retract = ProfileSettings(8, 40)
+    uv_latencies = []
+    step_latencies = []
+
+    for _ in range(trials):
+        finished.clear()
+        board.uv_off_time = None
+        controller.submit("layer", 0.2, 5, 0.05, peel, retract)
+
+        # Parar durante la exposición o en mitad de la elevación/retorno,
+        # siempre desde un hilo distinto al del controlador
+        time.sleep(random.uniform(0.05, 1.5))
+        press_time = time.monotonic()
+        threading.Thread(target=controller.emergency_stop).start()
+
+        finished.wait(5)
+        time.sleep(0.1)
+        uv_latencies.append((board.uv_off_time - press_time) * 1000)
+        last_step = board.last_step_time or press_time
+        step_latencies.append(max(0.0, last_step - press_time) * 1000)
+
+    controller.shutdown()
+    return uv_latencies, step_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    ok = True
+    for firmware in (False, True):
+        uv, steps = run_trials(firmware, args.trials)
+        name = "firmware" if firmware else "host"
+        for label, values in (("UV apagado", uv), ("último paso", steps)):
+            worst = max(values)
+            ok = ok and worst < LIMIT_MS
+            print(f"{name:8s} {label:12s} p50 {percentile(values, 0.5):6.2f} ms  "
+                  f"p95 {percentile(values, 0.95):6.2f} ms  máx {worst:6.2f} ms")
+
+    print("OK" if ok else f"FALLO: latencia por encima de {LIMIT_MS} ms")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Compara el tiempo de presentación de una capa en la ventana de proyección:
+  - original: decodificar el PNG y escalarlo en el hilo GUI
+  - label: QImage ya escalado por el prefetcher mostrado en el QLabel
+  - nativo: QImage a resolución nativa pintado 1:1 en paintEvent
+
+Uso: python tools/bench_present.py [--size 3840x2400] [--frames 20]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt, QSize, QRect
+from PyQt6.QtGui import QImage, QPainter, QColor, QPixmap
+from ui.projection_window import ProjectionWindow
+from ui.layer_prefetcher import load_scaled_frame, load_native_frame
+from slices.slice_index import SliceIndex
+
+
+def make_slices(folder, size, count):
+    paths = []
+    for i in range(count):
+        image = QImage(size, QImage.Format.Format_Grayscale8)
+        image.fill(0)
+        painter = QPainter(image)
+        painter.fillRect(QRect(size.width() // 4 + i, size.height() // 4,
+                               size.width() // 2, size.height() // 2), QColor("white"))
+        painter.end()
+        path = os.path.join(folder, f"{i + 1}.png")
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def measure(window, show, items):
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        show(item)
+        times.append((time.perf_counter() - start) * 1000)
+    return sum(times) / len(times), max(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="3840x2400")
+    parser.add_argument("--frames", type=int, default=20)
+    args = parser.parse_args()
+    width, height = (int(value) for value in args.size.split("x"))
+    size = QSize(width, height)
+
+    app = QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as folder:
+        paths = make_slices(folder, size, args.frames)
+
+        window = ProjectionWindow()
+        window.resize(size)
+        window.show()
+        app.processEvents()
+
+        def show_original(path):
+            # Camino original: decodificar y escalar el PNG en el hilo GUI
+            pixmap = QPixmap(path).scaled(window.size(), Qt.AspectRatioMode.KeepAspectRatio,
+                                          Qt.TransformationMode.SmoothTransformation)
+            window.image_label.setPixmap(pixmap)
+            window.image_label.setGeometry(0, 0, window.width(), window.height())
+            window.image_label.repaint()
+
+        results = [("original", measure(window, show_original, paths))]
+
+        source = SliceIndex(folder)
+        frames = [load_scaled_frame(source, i, window.size()) for i in range(len(source))]
+        results.append(("label", measure(window, window.show_frame, frames)))
+        window.close()
+
+        native_window = ProjectionWindow(native=True)
+        native_window.resize(size)
+        native_window.show()
+        app.processEvents()
+        frames = [load_native_frame(source, i, native_window.native_size()) for i in range(len(source))]
+        results.append(("nativo", measure(native_window, native_window.show_frame, frames)))
+        native_window.close()
+
+    for name, (mean, worst) in results:
+        print(f"{name:12s} media {mean:8.2f} ms  máx {worst:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()